@@ -1,51 +1,34 @@
-from PySide6.QtWidgets import (QWidget, QGridLayout, QPushButton)
-from PySide6.QtCore import Signal
+from PySide6.QtCore import QObject, Signal
 
 from data_classes.image_item_container import ImageItemContainer
 
 
-class EditConfigItemContainer(QWidget):
+class EditConfigItemContainer(QObject):
     """Adds additional functionality to a provided ImageItemContainer,
-    related to adding and removing from Configuration Files."""
-    item_added = Signal(str, QWidget)
-    item_removed = Signal(str, QWidget)
+    related to adding and removing from Configuration Files.
+    The image grid shows an add or remove button below the image, which calls toggle_visible."""
+    item_added = Signal(str, QObject)
+    item_removed = Signal(str, QObject)
 
     def __init__(self, image_item_container: ImageItemContainer, is_in_current_config):
         super().__init__()
         self.image_item_container = image_item_container
-        self.layout = QGridLayout()
         self.is_in_current_config = is_in_current_config
-
-        # Buttons
-        self.add_button = QPushButton("Add")
-        self.add_button.setStyleSheet("background-color: green; color: white;")
-        self.add_button.pressed.connect(self.toggle_visible)
-        self.remove_button = QPushButton("Remove")
-        self.remove_button.setStyleSheet("background-color: red; color: white;")
-        self.remove_button.pressed.connect(self.toggle_visible)
-
-        if self.is_in_current_config:
-            self.add_button.setHidden(True)
-        else:
-            self.remove_button.setHidden(True)
-
-        self.layout.addWidget(self.image_item_container, 0, 0)
-        self.layout.addWidget(self.add_button, 1, 0)
-        self.layout.addWidget(self.remove_button, 1, 0)
-
-        self.setLayout(self.layout)
+        self.img_path = image_item_container.img_path
 
     def toggle_visible(self):
-        """Changes which button, add or remove, is visible. Also updates internal value of "is_in_current_config."""
-        self.add_button.setVisible(not self.add_button.isVisible())
-        self.remove_button.setVisible(not self.remove_button.isVisible())
+        """Changes which button, add or remove, is shown. Also updates internal value of "is_in_current_config."""
+        # Changed before the signal is emitted, so the grid shows the new button when it is redrawn.
+        self.is_in_current_config = not self.is_in_current_config
 
         if self.is_in_current_config:
-            self.item_removed.emit(self.image_item_container.get_label_text, self)
+            self.item_added.emit(self.get_label_text(), self)
         else:
-            self.item_added.emit(self.image_item_container.get_label_text, self)
+            self.item_removed.emit(self.get_label_text(), self)
 
-        self.is_in_current_config = not self.is_in_current_config
+    def open(self):
+        """Opens the image in the detailed view."""
+        self.image_item_container.open()
 
     def to_string(self) -> str:
         """Returns image name."""
@@ -1,6 +1,5 @@
 import json
 import os
-from PySide6.QtGui import QPixmap
 
 
 class ModelInfo:
@@ -8,7 +7,10 @@ class ModelInfo:
     def __init__(self, name, model, date_time_trained, total_training_time, number_of_images, path="", epoch="",
                  box_loss="", cls_loss="", mAP_50="", mAP_50_95="", precision="", recall="",
                  dataset_config="", starting_model="", folder_name="", metamorphic_test_result="",
-                 differential_test_result="", fuzzing_test_result=""):
+                 differential_test_result="", fuzzing_test_result="", exported_models=None, quantize=False,
+                 quantization_tolerance=0.01, quantization_result="", quantization_metrics=None,
+                 evaluation_result="", evaluation_metrics=None, metamorphic_test_details=None,
+                 fuzzing_test_details=None, reshuffle_dataset=False):
         self.name = name
         self.model = model
         self.date_time_trained = date_time_trained
@@ -28,6 +30,22 @@ class ModelInfo:
         self.metamorphic_test_result = metamorphic_test_result
         self.differential_test_result = differential_test_result
         self.fuzzing_test_result = fuzzing_test_result
+        # Percentage of boxes matched after each metamorphic transform.
+        self.metamorphic_test_details = metamorphic_test_details if metamorphic_test_details is not None else {}
+        # Failure and latency statistics for each fuzzing mutation.
+        self.fuzzing_test_details = fuzzing_test_details if fuzzing_test_details is not None else {}
+        # Exported versions of the weights, mapping the export format to the path relative to the model folder.
+        self.exported_models = exported_models if exported_models is not None else {}
+        # INT8 quantization is optional. The quantized model is only kept if its mAP50 drops by less than the tolerance.
+        self.quantize = quantize
+        self.quantization_tolerance = quantization_tolerance
+        self.quantization_result = quantization_result
+        self.quantization_metrics = quantization_metrics if quantization_metrics is not None else {}
+        # Precision, recall and mAP over the whole validation set, calculated after training.
+        self.evaluation_result = evaluation_result
+        self.evaluation_metrics = evaluation_metrics if evaluation_metrics is not None else {}
+        # Images keep their train/val split between training runs, unless the dataset is reshuffled.
+        self.reshuffle_dataset = reshuffle_dataset
 
     @classmethod
     def fromPath(cls, file_path):
@@ -67,7 +85,17 @@ class ModelInfo:
             "folder_name": self.folder_name,
             "metamorphic_test_result": self.metamorphic_test_result,
             "differential_test_result": self.differential_test_result,
-            "fuzzing_test_result": self.fuzzing_test_result
+            "fuzzing_test_result": self.fuzzing_test_result,
+            "exported_models": self.exported_models,
+            "quantize": self.quantize,
+            "quantization_tolerance": self.quantization_tolerance,
+            "quantization_result": self.quantization_result,
+            "quantization_metrics": self.quantization_metrics,
+            "evaluation_result": self.evaluation_result,
+            "evaluation_metrics": self.evaluation_metrics,
+            "metamorphic_test_details": self.metamorphic_test_details,
+            "fuzzing_test_details": self.fuzzing_test_details,
+            "reshuffle_dataset": self.reshuffle_dataset
         }
 
     def to_json(self):
@@ -86,11 +114,19 @@ class ModelInfo:
 
         print(f"Configuration saved to {file_path}")
 
-    def get_results_png(self) -> QPixmap:
+    def get_results_png(self):
         """Gets the results png"""
+        # Imported here so model information can be read without loading Qt, e.g. by the command line tools.
+        from PySide6.QtGui import QPixmap
         return QPixmap(self.path + "/results.png")
 
     def get_best_pt_path(self) -> str:
         """Gets the location of the best trained weights for the model"""
         valid_path = os.path.join(self.path, "weights", "best.pt")
         return valid_path
+
+    def get_exported_model_path(self, export_format) -> str:
+        """Gets the location of the exported weights in the provided format, or an empty string if there are none."""
+        if export_format not in self.exported_models:
+            return ""
+        return os.path.join(self.path, self.exported_models[export_format])
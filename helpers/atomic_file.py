@@ -0,0 +1,32 @@
+import os
+import threading
+from contextlib import contextmanager
+
+"""
+Atomic_File writes files so that other readers only ever see the old file or the complete new file.
+The contents are written to a temporary file next to the destination, which then replaces it in a single step.
+It deliberately does not import Qt, so it can be used by the command line and the inference server.
+"""
+
+
+def temp_path_for(path):
+    """ Returns the temporary file used while writing the path. It is unique to the process and thread, so writers
+        of the same file at the same time never write to the same temporary file. """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding=None, newline=None):
+    """ Opens a temporary file for writing, which replaces the file at path once it has been written and closed.
+        If an error occurs while writing, the temporary file is deleted and the original file is left unchanged. """
+    temp_path = temp_path_for(path)
+    try:
+        with open(temp_path, mode, encoding=encoding, newline=newline) as file:
+            yield file
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
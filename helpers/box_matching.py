@@ -0,0 +1,77 @@
+import numpy as np
+
+"""
+Box_Matching compares two sets of bounding boxes, e.g. a model's predictions and the correct annotations.
+Every pair of boxes is compared at once with NumPy, and each box can only be matched to one other box, so a single
+correct box cannot be counted as found by several predictions.
+"""
+
+
+def yolo_to_corners(boxes):
+    """ Converts YOLO (class, x centre, y centre, width, height) boxes into an array of (x1, y1, x2, y2) corners.
+        Boxes without a class, (x centre, y centre, width, height), are also accepted. """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if boxes.size == 0:
+        return np.zeros((0, 4))
+
+    boxes = boxes.reshape(len(boxes), -1)[:, -4:]
+    half_sizes = boxes[:, 2:4] / 2
+    return np.concatenate([boxes[:, 0:2] - half_sizes, boxes[:, 0:2] + half_sizes], axis=1)
+
+
+def iou_matrix(corners1, corners2):
+    """ Returns the intersection over union of every pair of (x1, y1, x2, y2) boxes, as an N x M array. """
+    corners1 = np.asarray(corners1, dtype=np.float64).reshape(-1, 4)
+    corners2 = np.asarray(corners2, dtype=np.float64).reshape(-1, 4)
+
+    top_left = np.maximum(corners1[:, None, :2], corners2[None, :, :2])
+    bottom_right = np.minimum(corners1[:, None, 2:], corners2[None, :, 2:])
+    inter_area = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+
+    area1 = np.prod(corners1[:, 2:] - corners1[:, :2], axis=1)
+    area2 = np.prod(corners2[:, 2:] - corners2[:, :2], axis=1)
+    union = area1[:, None] + area2[None, :] - inter_area
+
+    return np.divide(inter_area, union, out=np.zeros_like(inter_area), where=union > 0)
+
+
+def match_boxes(corners1, corners2, iou_threshold=0.5, scores=None):
+    """ Matches each box in the first set to at most one box in the second set, and vice versa.
+        If scores (e.g. confidences) are provided for the first set, boxes are matched from the highest score down,
+        each to the unmatched box it overlaps most. Otherwise, the most overlapping pairs are matched first.
+        Returns the matched (first index, second index, iou) tuples. """
+    return match_iou_matrix(iou_matrix(corners1, corners2), iou_threshold, scores)
+
+
+def match_iou_matrix(ious, iou_threshold=0.5, scores=None):
+    """ Matches boxes in the same way as match_boxes, using an already calculated IoU matrix.
+        This allows the same matrix to be matched at several thresholds. """
+    if ious.size == 0:
+        return []
+
+    matches = []
+    if scores is not None:
+        available = np.ones(ious.shape[1], dtype=bool)
+        for first_index in np.argsort(-np.asarray(scores), kind="stable"):
+            candidate_ious = np.where(available, ious[first_index], -1)
+            second_index = int(np.argmax(candidate_ious))
+            if candidate_ious[second_index] >= iou_threshold:
+                available[second_index] = False
+                matches.append((int(first_index), second_index, float(ious[first_index, second_index])))
+        return matches
+
+    first_indices, second_indices = np.nonzero(ious >= iou_threshold)
+    order = np.argsort(-ious[first_indices, second_indices], kind="stable")
+    matched_first, matched_second = set(), set()
+    for first_index, second_index in zip(first_indices[order], second_indices[order]):
+        if first_index in matched_first or second_index in matched_second:
+            continue
+        matched_first.add(first_index)
+        matched_second.add(second_index)
+        matches.append((int(first_index), int(second_index), float(ious[first_index, second_index])))
+    return matches
+
+
+def count_matches(boxes1, boxes2, iou_threshold=0.5):
+    """ Returns the number of YOLO format boxes in the first set matched one to one with a box in the second set. """
+    return len(match_boxes(yolo_to_corners(boxes1), yolo_to_corners(boxes2), iou_threshold))
@@ -0,0 +1,385 @@
+import os
+import sqlite3
+import time
+from helpers.atomic_file import atomic_write
+from helpers.dataset_index import normalise_name
+from helpers.result_cache import hash_file
+
+"""
+Catalog keeps a SQLite database of the stored training images and the dataset configs they belong to, so images can be
+listed and configs edited without scanning folders or rewriting every config file.
+Each image's annotation statistics are stored when it is added or changed. Its dimensions and hash are slower to
+read, so they are filled in by update_details when they are missing or the image has changed. The hash is also used by
+Dataset_Sync, so each image is only hashed once.
+The images and annotations folders are only read again when their modification time changes, i.e. when files are
+added, removed or renamed. Images and annotations changed through the program are updated with add_image.
+The .txt config files are still used by the rest of the system and can be edited outside the program, so each config
+is imported again whenever its file changes, and exported whenever it is changed through the catalog.
+Config entries naming an image are matched by its file name. Other entries, such as an annotation's name, are matched
+by the normalised name (see Dataset_Index).
+"""
+
+CATALOG_FILENAME = "catalog.db"
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.PNG', '.JPG')
+# The catalog only mirrors the files on disk, so a catalog with an older schema is rebuilt rather than migrated.
+SCHEMA_VERSION = 2
+# A folder changed this recently may change again without its modification time changing, as the time is only updated
+# every few milliseconds on some file systems. Its time is not recorded, so it is read again next time.
+RECENT_CHANGE_NS = 2 * 1000 * 1000 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    name TEXT PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    label_size INTEGER,
+    label_mtime_ns INTEGER,
+    width INTEGER,
+    height INTEGER,
+    hash TEXT,
+    label_count INTEGER,
+    mean_box_width REAL,
+    mean_box_height REAL
+);
+CREATE INDEX IF NOT EXISTS images_name_key ON images (name_key);
+CREATE INDEX IF NOT EXISTS images_stem ON images (stem);
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS configs (
+    name TEXT PRIMARY KEY,
+    file_size INTEGER,
+    file_mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS config_images (
+    config TEXT NOT NULL REFERENCES configs (name) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (config, key)
+);
+CREATE INDEX IF NOT EXISTS config_images_key ON config_images (key);
+"""
+
+DETAIL_COLUMNS = ["width", "height", "hash", "label_count", "mean_box_width", "mean_box_height"]
+
+
+def _file_stat(path):
+    """ Returns the size and modification time of the file, or (None, None) if it does not exist. """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None, None
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+def image_key(image_name):
+    """ Returns the lower case file name an image is matched to config entries by. """
+    return os.path.basename(image_name.strip()).lower()
+
+
+def config_key(entry):
+    """ Returns the name a config entry is matched to images by. Entries naming an image match that image only, so
+        a.png and a.jpg are different images. Other entries, e.g. the annotation a.txt, match by normalised name. """
+    name = image_key(entry)
+    return name if name.endswith(tuple(extension.lower() for extension in IMAGE_EXTENSIONS)) else normalise_name(name)
+
+
+def _scan(folder, extensions):
+    """ Returns the size and modification time of each file in the folder with one of the extensions. """
+    if not os.path.isdir(folder):
+        return {}
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(extensions):
+                stat_result = entry.stat()
+                files[entry.name] = (stat_result.st_size, stat_result.st_mtime_ns)
+    return files
+
+
+def image_size(image_path):
+    """ Returns the width and height of the image, reading only its header if Pillow is installed. """
+    try:
+        from PIL import Image
+    except ImportError:
+        import cv2
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Unable to read image: {image_path}")
+        return image.shape[1], image.shape[0]
+
+    with Image.open(image_path) as image:
+        return image.size
+
+
+def label_statistics(label_path):
+    """ Returns the number of boxes in the annotation file, and their mean normalised width and height. """
+    widths = []
+    heights = []
+    if os.path.isfile(label_path):
+        with open(label_path, "r", encoding="utf-8") as file:
+            for line in file:
+                values = line.split()
+                if len(values) >= 5:
+                    widths.append(float(values[3]))
+                    heights.append(float(values[4]))
+    if not widths:
+        return 0, None, None
+    return len(widths), sum(widths) / len(widths), sum(heights) / len(heights)
+
+
+class Catalog:
+    """ The catalog of a stored training images folder. Each thread should open its own catalog. """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.image_dir = os.path.join(root_dir, "images", "raw")
+        self.label_dir = os.path.join(root_dir, "labels", "raw")
+        self.config_dir = os.path.join(root_dir, "datasets")
+        self.connection = sqlite3.connect(os.path.join(root_dir, CATALOG_FILENAME))
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        # Allows the catalog to be read while another thread, e.g. the training pipeline, is updating it.
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.connection.executescript("DROP TABLE IF EXISTS config_images; DROP TABLE IF EXISTS configs; "
+                                          "DROP TABLE IF EXISTS folders; DROP TABLE IF EXISTS images;")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def label_path(self, image_name):
+        return os.path.join(self.label_dir, os.path.splitext(image_name)[0] + ".txt")
+
+    def config_path(self, config_name):
+        return os.path.join(self.config_dir, config_name + ".txt")
+
+    # Images
+
+    def refresh(self):
+        """ Updates the catalog to match the images, annotations and configs on disk.
+            The images and annotations folders are only read if their modification time has changed. The details of
+            new or changed images are cleared so update_details can fill them in. Annotation statistics are updated
+            straight away. """
+        # Read before the folders are, so changes made while they are being read are found next time.
+        folder_mtimes = {folder: _file_stat(folder)[1] for folder in (self.image_dir, self.label_dir)}
+        stored_mtimes = dict(self.connection.execute("SELECT path, mtime_ns FROM folders"))
+        if any(mtime_ns is None or stored_mtimes.get(folder) != mtime_ns
+               for folder, mtime_ns in folder_mtimes.items()):
+            self._scan_images()
+            recent = time.time_ns() - RECENT_CHANGE_NS
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO folders (path, mtime_ns) VALUES (?, ?)",
+                    [(folder, mtime_ns if mtime_ns is not None and mtime_ns < recent else None)
+                     for folder, mtime_ns in folder_mtimes.items()])
+        self.import_configs()
+
+    def _scan_images(self):
+        images = _scan(self.image_dir, IMAGE_EXTENSIONS)
+        labels = _scan(self.label_dir, (".txt",))
+        stored = {row[0]: row[1:] for row in self.connection.execute(
+            "SELECT name, size, mtime_ns, label_size, label_mtime_ns FROM images")}
+
+        with self.connection:
+            self.connection.executemany("DELETE FROM images WHERE name = ?",
+                                        [(name,) for name in stored if name not in images])
+            for name, image_stat in images.items():
+                label_stat = labels.get(os.path.splitext(name)[0] + ".txt", (None, None))
+                if stored.get(name) != (*image_stat, *label_stat):
+                    self._store_image(name, image_stat, label_stat)
+
+    def add_image(self, image_name):
+        """ Adds a new image, or updates a changed image or annotation, in the images folder. """
+        with self.connection:
+            self._store_image(image_name, _file_stat(os.path.join(self.image_dir, image_name)),
+                              _file_stat(self.label_path(image_name)))
+
+    def _store_image(self, name, image_stat, label_stat):
+        # Annotations are small, so their statistics are read straight away, unlike the image's details.
+        self.connection.execute(
+            "INSERT OR REPLACE INTO images (name, name_key, stem, size, mtime_ns, label_size, label_mtime_ns, "
+            "label_count, mean_box_width, mean_box_height) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, image_key(name), normalise_name(name), *image_stat, *label_stat,
+             *label_statistics(self.label_path(name))))
+
+    def remove_image(self, image_name):
+        """ Removes the image and its membership of every config, only rewriting the configs that contained it.
+            Returns the names of those configs. """
+        with self.connection:
+            configs = self._remove_from_configs(image_name)
+            self.connection.execute("DELETE FROM images WHERE name = ?", (image_name,))
+        for config in configs:
+            self.export_config(config)
+        return configs
+
+    def _remove_from_configs(self, image_name, config_name=None):
+        """ Removes the image's entries from the config, or every config if no config is provided, and returns the
+            names of the configs changed. An entry matching other images by normalised name, e.g. a.txt for a.png
+            and a.jpg, is replaced by the file names of the other images, so they stay in the config. """
+        keys = (image_key(image_name), normalise_name(image_name))
+        query = "SELECT config, key FROM config_images WHERE key IN (?, ?)"
+        parameters = keys
+        if config_name is not None:
+            query += " AND config = ?"
+            parameters = (*keys, config_name)
+        removed = self.connection.execute(query, parameters).fetchall()
+        others = [row[0] for row in self.connection.execute(
+            "SELECT name FROM images WHERE stem = ? AND name != ?", (keys[1], image_name))]
+
+        for config, key in removed:
+            self.connection.execute("DELETE FROM config_images WHERE config = ? AND key = ?", (config, key))
+            if key == keys[1]:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO config_images (config, key, entry) VALUES (?, ?, ?)",
+                    [(config, image_key(other), other) for other in others])
+        return list(dict.fromkeys(config for config, _ in removed))
+
+    def image_names(self):
+        """ Returns the names of every image, in name order. """
+        return [row[0] for row in self.connection.execute("SELECT name FROM images ORDER BY name")]
+
+    def image_hashes(self):
+        """ Returns the (size, modification time, hash) recorded for each image that has been hashed, by image name.
+            The hash is only valid while the image's size and modification time are unchanged. """
+        return {row[0]: tuple(row[1:]) for row in self.connection.execute(
+            "SELECT name, size, mtime_ns, hash FROM images WHERE hash IS NOT NULL")}
+
+    def update_details(self, batch_size=500):
+        """ Fills in the dimensions, hash and annotation statistics of images that are missing them.
+            Returns the number of images updated. """
+        missing = [row[0] for row in self.connection.execute("SELECT name FROM images WHERE hash IS NULL")]
+        for start in range(0, len(missing), batch_size):
+            rows = []
+            for name in missing[start:start + batch_size]:
+                image_path = os.path.join(self.image_dir, name)
+                try:
+                    width, height = image_size(image_path)
+                    image_hash = hash_file(image_path)
+                except (OSError, ValueError):
+                    continue
+                rows.append((width, height, image_hash, *label_statistics(self.label_path(name)), name))
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE images SET width = ?, height = ?, hash = ?, label_count = ?, mean_box_width = ?, "
+                    "mean_box_height = ? WHERE name = ?", rows)
+        return len(missing)
+
+    def all_image_details(self):
+        """ Returns the stored details of every image, by image name. """
+        return {row[0]: dict(zip(DETAIL_COLUMNS, row[1:])) for row in self.connection.execute(
+            f"SELECT name, {', '.join(DETAIL_COLUMNS)} FROM images")}
+
+    def image_details(self, image_name):
+        """ Returns the stored details of the image, or None if it is not in the catalog. """
+        row = self.connection.execute(f"SELECT {', '.join(DETAIL_COLUMNS)} FROM images WHERE name = ?",
+                                      (image_name,)).fetchone()
+        return dict(zip(DETAIL_COLUMNS, row)) if row is not None else None
+
+    # Configs
+
+    def config_names(self):
+        """ Returns the name of every config, in name order. """
+        return [row[0] for row in self.connection.execute("SELECT name FROM configs ORDER BY name")]
+
+    def config_image_names(self, config_name):
+        """ Returns the names of the images in the config, in name order. """
+        return [row[0] for row in self.connection.execute(
+            "SELECT name FROM images WHERE name_key IN (SELECT key FROM config_images WHERE config = ?) "
+            "OR stem IN (SELECT key FROM config_images WHERE config = ?) ORDER BY name", (config_name, config_name))]
+
+    def is_in_config(self, config_name, image_name):
+        return self.connection.execute("SELECT 1 FROM config_images WHERE config = ? AND key IN (?, ?)",
+                                       (config_name, image_key(image_name),
+                                        normalise_name(image_name))).fetchone() is not None
+
+    def import_configs(self):
+        """ Imports every config file that is new or has changed since it was last imported or exported,
+            and removes configs whose files have been deleted. """
+        files = {os.path.splitext(name)[0]: file_stat
+                 for name, file_stat in _scan(self.config_dir, (".txt",)).items()}
+        stored = {row[0]: row[1:] for row in self.connection.execute(
+            "SELECT name, file_size, file_mtime_ns FROM configs")}
+
+        with self.connection:
+            self.connection.executemany("DELETE FROM configs WHERE name = ?",
+                                        [(name,) for name in stored if name not in files])
+            for name, file_stat in files.items():
+                if stored.get(name) == file_stat:
+                    continue
+                with open(self.config_path(name), "r", encoding="utf-8") as file:
+                    entries = [line.strip() for line in file if line.strip()]
+                self._replace_config(name, entries)
+                self.connection.execute("UPDATE configs SET file_size = ?, file_mtime_ns = ? WHERE name = ?",
+                                        (*file_stat, name))
+
+    def _replace_config(self, config_name, entries):
+        self.connection.execute("INSERT OR IGNORE INTO configs (name) VALUES (?)", (config_name,))
+        self.connection.execute("DELETE FROM config_images WHERE config = ?", (config_name,))
+        self.connection.executemany("INSERT OR IGNORE INTO config_images (config, key, entry) VALUES (?, ?, ?)",
+                                    [(config_name, config_key(entry), entry) for entry in entries])
+
+    def set_config_images(self, config_name, entries):
+        """ Replaces the contents of the config, creating it if it does not exist, and exports it. """
+        with self.connection:
+            self._replace_config(config_name, entries)
+        self.export_config(config_name)
+
+    def add_to_config(self, config_name, entry):
+        """ Adds an image to the config. The entry is appended to the config file, rather than rewriting it. """
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO configs (name) VALUES (?)", (config_name,))
+            added = self.connection.execute(
+                "INSERT OR IGNORE INTO config_images (config, key, entry) VALUES (?, ?, ?)",
+                (config_name, config_key(entry), entry)).rowcount
+        if not added:
+            return
+
+        path = self.config_path(config_name)
+        size, _ = _file_stat(path)
+        with open(path, "ab+") as file:
+            # Starts a new line if the file does not end with one.
+            if size:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+            file.write(entry.encode("utf-8") + b"\n")
+        self._record_config_file(config_name)
+
+    def remove_from_config(self, config_name, image_name):
+        with self.connection:
+            removed = self._remove_from_configs(image_name, config_name)
+        if removed:
+            self.export_config(config_name)
+
+    def delete_config(self, config_name):
+        """ Deletes the config and its file. """
+        with self.connection:
+            self.connection.execute("DELETE FROM configs WHERE name = ?", (config_name,))
+        if os.path.exists(self.config_path(config_name)):
+            os.remove(self.config_path(config_name))
+
+    def export_config(self, config_name):
+        """ Writes the config's entries to its config file, in the order they were added. """
+        entries = [row[0] for row in self.connection.execute(
+            "SELECT entry FROM config_images WHERE config = ? ORDER BY rowid", (config_name,))]
+        path = self.config_path(config_name)
+        with atomic_write(path, encoding="utf-8") as file:
+            file.write("\n".join(entries) + ("\n" if entries else ""))
+        self._record_config_file(config_name)
+
+    def _record_config_file(self, config_name):
+        """ Records the config file's size and modification time, so the catalog's own changes are not imported. """
+        with self.connection:
+            self.connection.execute("UPDATE configs SET file_size = ?, file_mtime_ns = ? WHERE name = ?",
+                                    (*_file_stat(self.config_path(config_name)), config_name))
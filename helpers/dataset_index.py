@@ -0,0 +1,38 @@
+import os
+
+"""
+Dataset_Index decides which images belong to a dataset config.
+Configs list images by file name, and images added with a new annotation are listed by the annotation's name instead,
+e.g. image_1.txt for image_1.png. Both are reduced to the same normalised name (the lower case name without its folder
+or extension), so membership is an exact set lookup rather than a search through every entry.
+"""
+
+
+def normalise_name(filename):
+    """ Returns the name used to match an image to a config entry. """
+    return os.path.splitext(os.path.basename(filename.strip()))[0].lower()
+
+
+class DatasetConfigIndex:
+    """ The normalised names of the images in a dataset config. """
+
+    def __init__(self, entries):
+        self.names = {normalise_name(entry) for entry in entries if entry.strip()}
+
+    @classmethod
+    def from_file(cls, config_path):
+        """ Loads the index from a config file. A missing config contains no images. """
+        if not os.path.exists(config_path):
+            return cls([])
+        with open(config_path, "r", encoding="utf-8") as file:
+            return cls(file)
+
+    def filter(self, items, key=None):
+        """ Returns the items in the config, in their original order. key returns each item's file name. """
+        return [item for item in items if normalise_name(key(item) if key is not None else item) in self.names]
+
+    def __contains__(self, filename):
+        return normalise_name(filename) in self.names
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,198 @@
+import glob
+import hashlib
+import json
+import os
+import random
+from helpers.atomic_file import atomic_write
+from helpers.file_helpers import link_or_copy
+from helpers.result_cache import hash_file
+
+"""
+Dataset_Sync keeps the training data folder (data/images and data/labels) up to date with the stored training images,
+without rebuilding it for every training run.
+A manifest records the size, modification time, hash and split (train or val) of each image, and the size and
+modification time of its annotation. Only images that were added, removed or changed since the last sync are linked or
+removed, so retraining on a mostly unchanged dataset skips almost all file operations.
+Each image keeps its split between runs. New images are split using a hash of their name, so the split does not
+depend on the order they were added in. The whole dataset is only split again if a reshuffle is requested.
+"""
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+SPLITS = ("train", "val")
+DEFAULT_VAL_FRACTION = 0.1
+
+
+def stable_split_score(filename):
+    """ Returns a number between 0 and 1 for the filename, which is the same every time. """
+    return int(hashlib.sha256(filename.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+
+
+def _stat(path):
+    """ Returns the size and modification time of the file, or None if it does not exist. """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return [stat_result.st_size, stat_result.st_mtime_ns]
+
+
+def _remove(path):
+    if os.path.lexists(path):
+        os.remove(path)
+
+
+class DatasetSync:
+    """ Syncs the selected images and their annotations into the train and val folders of the data folder. """
+
+    def __init__(self, img_src_dir, label_src_dir, data_dir, val_fraction=DEFAULT_VAL_FRACTION):
+        self.img_src_dir = img_src_dir
+        self.label_src_dir = label_src_dir
+        self.data_dir = data_dir
+        self.val_fraction = val_fraction
+        self.manifest_path = os.path.join(data_dir, MANIFEST_FILENAME)
+
+    def image_dir(self, split):
+        return os.path.join(self.data_dir, "images", split)
+
+    def label_dir(self, split):
+        return os.path.join(self.data_dir, "labels", split)
+
+    def load_manifest(self):
+        """ Returns the manifest's entries, or no entries if it is missing or from a different version. """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest.get("files", {})
+
+    def save_manifest(self, entries):
+        with atomic_write(self.manifest_path, encoding="utf-8") as file:
+            json.dump({"version": MANIFEST_VERSION, "files": entries}, file)
+
+    def assign_splits(self, filenames, entries, reshuffle=False):
+        """ Returns the split of each image. Images keep their previous split unless reshuffle is True. """
+        if reshuffle:
+            shuffled = list(filenames)
+            random.shuffle(shuffled)
+            split_index = int(len(shuffled) * (1 - self.val_fraction))
+            return {filename: "train" if index < split_index else "val" for index, filename in enumerate(shuffled)}
+
+        splits = {}
+        for filename in filenames:
+            entry = entries.get(filename)
+            if entry is not None and entry.get("split") in SPLITS:
+                splits[filename] = entry["split"]
+            else:
+                splits[filename] = "val" if stable_split_score(filename) < self.val_fraction else "train"
+
+        # Training needs at least one validation image.
+        if len(splits) > 1 and "val" not in splits.values():
+            splits[min(splits, key=stable_split_score)] = "val"
+        return splits
+
+    def sync(self, filenames, reshuffle=False, known_hashes=None):
+        """ Makes the data folder contain exactly the provided images and their annotations.
+            known_hashes can provide the (size, modification time, hash) of images already hashed, e.g. by the
+            catalog, so they are not hashed again. Returns the number of images added, replaced, removed and
+            unchanged. """
+        known_hashes = known_hashes or {}
+        for split in SPLITS:
+            if not os.path.isdir(self.image_dir(split)) or not os.path.isdir(self.label_dir(split)):
+                raise ValueError("File Structure Corrupt")
+
+        previous_entries = self.load_manifest()
+        filenames = [filename for filename in dict.fromkeys(filenames)
+                     if os.path.isfile(os.path.join(self.img_src_dir, filename))]
+        splits = self.assign_splits(filenames, previous_entries, reshuffle)
+        counts = {"added": 0, "replaced": 0, "removed": 0, "unchanged": 0}
+        changed = False
+        entries = {}
+
+        for filename in filenames:
+            entry, image_changed, label_changed = self.sync_image(filename, splits[filename],
+                                                                  previous_entries.get(filename),
+                                                                  known_hashes.get(filename))
+            entries[filename] = entry
+            if filename not in previous_entries:
+                counts["added"] += 1
+            elif image_changed or label_changed:
+                counts["replaced"] += 1
+            else:
+                counts["unchanged"] += 1
+            changed = changed or image_changed or label_changed
+
+        for filename, entry in previous_entries.items():
+            if filename not in entries:
+                self.remove_image(filename, entry.get("split"))
+                counts["removed"] += 1
+                changed = True
+
+        # Files not in the manifest, e.g. left by an older version or an interrupted sync, are removed.
+        expected = {split: set() for split in SPLITS}
+        for filename, entry in entries.items():
+            expected[entry["split"]].update([filename, os.path.splitext(filename)[0] + ".txt"])
+        for split in SPLITS:
+            for folder in (self.image_dir(split), self.label_dir(split)):
+                for name in os.listdir(folder):
+                    if name != ".gitignore" and name not in expected[split]:
+                        _remove(os.path.join(folder, name))
+                        changed = True
+
+        # YOLO caches the labels next to the label folders. It does not notice every change, so the cache is removed
+        # if anything changed.
+        if changed:
+            for cache_path in glob.glob(os.path.join(self.data_dir, "labels", "*.cache")):
+                _remove(cache_path)
+
+        self.save_manifest(entries)
+        return counts
+
+    def sync_image(self, filename, split, entry, known_hash=None):
+        """ Links the image and its annotation into the split's folders, unless they are already up to date.
+            Returns the new manifest entry, and if the image and annotation changed. """
+        image_path = os.path.join(self.img_src_dir, filename)
+        label_name = os.path.splitext(filename)[0] + ".txt"
+        label_path = os.path.join(self.label_src_dir, label_name)
+        image_dest = os.path.join(self.image_dir(split), filename)
+        label_dest = os.path.join(self.label_dir(split), label_name)
+
+        if entry is not None and entry.get("split") != split:
+            self.remove_image(filename, entry.get("split"))
+            entry = None
+
+        image_stat = _stat(image_path)
+        label_stat = _stat(label_path)
+
+        # The hash is only calculated if the size or modification time changed, so touched files are not replaced.
+        image_hash = entry.get("hash") if entry is not None else None
+        if entry is None or [entry.get("size"), entry.get("mtime_ns")] != image_stat:
+            if known_hash is not None and list(known_hash[:2]) == image_stat:
+                image_hash = known_hash[2]
+            else:
+                image_hash = hash_file(image_path)
+        image_changed = entry is None or image_hash != entry.get("hash") or not os.path.lexists(image_dest)
+        if image_changed:
+            link_or_copy(image_path, image_dest)
+
+        label_synced = os.path.lexists(label_dest) == (label_stat is not None)
+        label_changed = entry is None or entry.get("label") != label_stat or not label_synced
+        if label_changed:
+            if label_stat is not None:
+                link_or_copy(label_path, label_dest)
+            else:
+                _remove(label_dest)
+
+        entry = {"size": image_stat[0], "mtime_ns": image_stat[1], "hash": image_hash, "split": split,
+                 "label": label_stat}
+        return entry, image_changed, label_changed
+
+    def remove_image(self, filename, split):
+        """ Removes the image and its annotation from the split's folders. """
+        if split not in SPLITS:
+            return
+        _remove(os.path.join(self.image_dir(split), filename))
+        _remove(os.path.join(self.label_dir(split), os.path.splitext(filename)[0] + ".txt"))
@@ -0,0 +1,83 @@
+import os
+import threading
+from contextlib import contextmanager
+from helpers.atomic_file import atomic_write
+
+"""
+Disk_Cache keeps a folder of cached files within a size limit, deleting the least recently used files first.
+Files record when they were last used in their modification time, which is updated whenever a file is read from the
+cache. The combined size of the files is counted when the cache is first written to, then kept up to date, so the
+folder is only listed again when files need to be deleted.
+It is shared by the result cache and the thumbnail cache, which decide what is stored in each file.
+"""
+
+
+class DiskCache:
+    """ A size limited folder of cached files with the provided extension, which can be in subfolders. """
+
+    def __init__(self, cache_dir, extension, max_bytes):
+        self.cache_dir = cache_dir
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def touch(self, path):
+        """ Marks the cached file as used, so it is kept over files which have not been used for longer. """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @contextmanager
+    def write(self, path, mode="wb"):
+        """ Opens the cached file for writing. It replaces any existing file once it has been written, then the least
+            recently used files are deleted if the cache is full. """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replaced_size = os.path.getsize(path) if os.path.exists(path) else 0
+        with atomic_write(path, mode) as file:
+            yield file
+
+        with self._lock:
+            # If the same file is written twice at once this can overcount, which only makes the next eviction
+            # happen sooner, and the eviction counts the files again.
+            if self._total_bytes is not None:
+                self._total_bytes += os.path.getsize(path) - replaced_size
+            is_full = self._total_bytes is None or self._total_bytes > self.max_bytes
+        if is_full:
+            self.evict()
+
+    def _cached_paths(self):
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(self.extension):
+                    yield os.path.join(dirpath, filename)
+
+    def evict(self):
+        """ Deletes the least recently used files until the cache is within its size limit. """
+        with self._lock:
+            entries = []
+            for path in self._cached_paths():
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat_result.st_mtime_ns, stat_result.st_size, path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total_bytes -= size
+                except OSError:
+                    pass
+            self._total_bytes = total_bytes
+
+    def clear(self):
+        """ Deletes every cached file. """
+        with self._lock:
+            for path in list(self._cached_paths()):
+                os.remove(path)
+            self._total_bytes = 0
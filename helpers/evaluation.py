@@ -0,0 +1,271 @@
+import csv
+import os
+from contextlib import nullcontext
+import numpy as np
+from helpers import box_matching
+from helpers.inference_pipeline import InferencePipeline, LoadError, decode_image
+
+"""
+Evaluation measures how accurately a model finds the annotated boxes in a set of images, e.g. the validation split.
+Images are analysed in batches and each image's results are added to running totals and then discarded, so memory use
+does not depend on the number of images. The totals are counts of correct and incorrect boxes in fine confidence bins,
+which is enough to calculate precision, recall and mAP at any confidence threshold.
+Images that cannot be read are skipped and counted, as YOLO does when training, rather than stopping the evaluation.
+"""
+
+IOU_THRESHOLDS = np.round(np.linspace(0.5, 0.95, 10), 2)
+CONFIDENCE_BINS = 1000
+SWEEP_CONFIDENCES = np.round(np.arange(0.05, 1.0, 0.05), 2)
+DEFAULT_CONFIDENCE = 0.25
+# The model is run at a very low confidence, so the whole precision recall curve can be calculated.
+EVALUATION_CONFIDENCE = 0.001
+PER_IMAGE_FIELDS = ["image", "annotated_boxes", "predicted_boxes", "true_positives", "false_positives",
+                    "false_negatives"]
+
+
+def read_annotations(annotation_path):
+    """ Returns the YOLO (class, x centre, y centre, width, height) boxes in an annotation file as an N x 5 array.
+        A missing annotation file means the image contains no boxes. """
+    if not os.path.isfile(annotation_path):
+        return np.zeros((0, 5))
+    with open(annotation_path, "r") as file:
+        boxes = [list(map(float, line.split())) for line in file if line.strip()]
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 5)
+
+
+def normalised_detections(result):
+    """ Returns the result's boxes as an N x 6 array of (x1, y1, x2, y2, confidence, class),
+        with the corners as fractions of the image's size. """
+    from helpers.inference import result_detections
+
+    detections = result_detections(result).astype(np.float64)
+    height, width = result.orig_shape[:2]
+    detections[:, [0, 2]] /= width
+    detections[:, [1, 3]] /= height
+    return detections
+
+
+class DetectionEvaluator:
+    """ Accumulates the results of a model over many images and calculates its precision, recall and mAP. """
+
+    def __init__(self, iou_thresholds=IOU_THRESHOLDS, confidence_threshold=DEFAULT_CONFIDENCE,
+                 confidence_bins=CONFIDENCE_BINS, per_image_file=None):
+        self.iou_thresholds = np.asarray(iou_thresholds, dtype=np.float64)
+        self.confidence_threshold = confidence_threshold
+        self.confidence_bins = confidence_bins
+        self.image_count = 0
+        self.skipped_count = 0  # Images that could not be read
+        # For each class: the number of annotated boxes, and the number of correct and incorrect predictions
+        # in each confidence bin at each IoU threshold.
+        self.annotated_counts = {}
+        self.true_positive_counts = {}
+        self.false_positive_counts = {}
+
+        self.per_image_writer = None
+        if per_image_file is not None:
+            self.per_image_writer = csv.DictWriter(per_image_file, fieldnames=PER_IMAGE_FIELDS)
+            self.per_image_writer.writeheader()
+
+    def _class_counts(self, class_id):
+        if class_id not in self.annotated_counts:
+            shape = (self.confidence_bins, len(self.iou_thresholds))
+            self.annotated_counts[class_id] = 0
+            self.true_positive_counts[class_id] = np.zeros(shape, dtype=np.int64)
+            self.false_positive_counts[class_id] = np.zeros(shape, dtype=np.int64)
+        return self.true_positive_counts[class_id], self.false_positive_counts[class_id]
+
+    def add(self, image_name, detections, annotations):
+        """ Adds a single image's results. Detections are normalised (x1, y1, x2, y2, confidence, class) boxes and
+            annotations are YOLO (class, x centre, y centre, width, height) boxes. """
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+        annotations = np.asarray(annotations, dtype=np.float64).reshape(-1, 5)
+        annotation_corners = box_matching.yolo_to_corners(annotations)
+        correct = np.zeros((len(detections), len(self.iou_thresholds)), dtype=bool)
+
+        # Boxes can only match boxes of the same class.
+        for class_id in np.union1d(detections[:, 5], annotations[:, 0]).astype(int):
+            detection_indices = np.nonzero(detections[:, 5] == class_id)[0]
+            annotation_indices = np.nonzero(annotations[:, 0] == class_id)[0]
+            self._class_counts(int(class_id))
+            self.annotated_counts[int(class_id)] += len(annotation_indices)
+
+            if len(detection_indices) == 0 or len(annotation_indices) == 0:
+                continue
+            ious = box_matching.iou_matrix(detections[detection_indices, :4], annotation_corners[annotation_indices])
+            scores = detections[detection_indices, 4]
+            for threshold_index, threshold in enumerate(self.iou_thresholds):
+                for detection_index, _, _ in box_matching.match_iou_matrix(ious, threshold, scores):
+                    correct[detection_indices[detection_index], threshold_index] = True
+
+        bins = np.minimum((detections[:, 4] * self.confidence_bins).astype(int), self.confidence_bins - 1)
+        for class_id in np.unique(detections[:, 5]).astype(int):
+            in_class = detections[:, 5] == class_id
+            true_positives, false_positives = self._class_counts(int(class_id))
+            np.add.at(true_positives, bins[in_class], correct[in_class].astype(np.int64))
+            np.add.at(false_positives, bins[in_class], (~correct[in_class]).astype(np.int64))
+
+        self.image_count += 1
+        if self.per_image_writer is not None:
+            confident = detections[:, 4] >= self.confidence_threshold
+            true_positives = int(np.count_nonzero(correct[confident, 0]))
+            self.per_image_writer.writerow({
+                "image": image_name,
+                "annotated_boxes": len(annotations),
+                "predicted_boxes": int(np.count_nonzero(confident)),
+                "true_positives": true_positives,
+                "false_positives": int(np.count_nonzero(confident)) - true_positives,
+                "false_negatives": len(annotations) - true_positives
+            })
+
+    def skip(self):
+        """ Records an image that could not be read, which is left out of the results. """
+        self.skipped_count += 1
+
+    def precision_recall_at(self, confidence, iou_index=0):
+        """ Returns the precision and recall of boxes at or above the confidence, over every class. """
+        first_bin = min(int(confidence * self.confidence_bins), self.confidence_bins - 1)
+        true_positives = sum(int(counts[first_bin:, iou_index].sum()) for counts in self.true_positive_counts.values())
+        false_positives = sum(int(counts[first_bin:, iou_index].sum())
+                              for counts in self.false_positive_counts.values())
+        annotated = sum(self.annotated_counts.values())
+
+        precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 0.0
+        recall = true_positives / annotated if annotated else 0.0
+        return precision, recall
+
+    def average_precisions(self):
+        """ Returns the average precision of each class with annotated boxes, at each IoU threshold,
+            using 101 point interpolation. """
+        recall_points = np.linspace(0, 1, 101)
+        average_precisions = {}
+        for class_id, annotated in self.annotated_counts.items():
+            if annotated == 0:
+                continue
+
+            # Counts from the most confident bin down, giving a point on the curve for each confidence.
+            true_positives = np.cumsum(self.true_positive_counts[class_id][::-1], axis=0)
+            false_positives = np.cumsum(self.false_positive_counts[class_id][::-1], axis=0)
+            recall = true_positives / annotated
+            predicted = true_positives + false_positives
+            precision = np.divide(true_positives, predicted, out=np.zeros(predicted.shape), where=predicted > 0)
+            # Each precision is replaced by the best precision at the same or a higher recall.
+            precision = np.flip(np.maximum.accumulate(np.flip(precision, axis=0), axis=0), axis=0)
+
+            class_average_precisions = []
+            for threshold_index in range(len(self.iou_thresholds)):
+                indices = np.searchsorted(recall[:, threshold_index], recall_points, side="left")
+                valid = indices < len(recall)
+                interpolated = np.zeros(len(recall_points))
+                interpolated[valid] = precision[indices[valid], threshold_index]
+                class_average_precisions.append(interpolated.mean())
+            average_precisions[class_id] = np.asarray(class_average_precisions)
+
+        return average_precisions
+
+    def summary(self):
+        """ Returns the precision, recall, mAP50, mAP50-95 and a sweep of precision and recall over confidence
+            thresholds, as a dictionary that can be saved as JSON. """
+        average_precisions = self.average_precisions()
+        if average_precisions:
+            mean_average_precision = np.mean(list(average_precisions.values()), axis=0)
+        else:
+            mean_average_precision = np.zeros(len(self.iou_thresholds))
+        precision, recall = self.precision_recall_at(self.confidence_threshold)
+
+        sweep = []
+        for confidence in SWEEP_CONFIDENCES:
+            sweep_precision, sweep_recall = self.precision_recall_at(confidence)
+            f1 = (2 * sweep_precision * sweep_recall / (sweep_precision + sweep_recall)
+                  if sweep_precision + sweep_recall else 0.0)
+            sweep.append({"confidence": float(confidence), "precision": round(sweep_precision, 4),
+                          "recall": round(sweep_recall, 4), "f1": round(f1, 4)})
+        best = max(sweep, key=lambda point: point["f1"])
+
+        return {
+            "images": self.image_count,
+            "skipped_images": self.skipped_count,
+            "annotated_boxes": sum(self.annotated_counts.values()),
+            "confidence": self.confidence_threshold,
+            "precision": round(precision, 4),
+            "recall": round(recall, 4),
+            "mAP_50": round(float(mean_average_precision[0]), 4),
+            "mAP_50_95": round(float(mean_average_precision.mean()), 4),
+            "best_f1_confidence": best["confidence"],
+            "confidence_sweep": sweep
+        }
+
+
+def evaluate_models(models, image_paths, labels_dir, batch_size=8, per_image_csv_paths=None, progress_callback=None,
+                    model_lock=None, image_cache=None):
+    """ Evaluates each of the models on the provided images, with each image only decoded once.
+        A model can be a loaded model, or a PredictionStore, in which case only the images without stored
+        predictions are analysed (and the model is only loaded if there are any), and the new predictions are saved.
+        Annotations are read from labels_dir, matching each image's name. Per image statistics are written to the
+        CSV path at the same position as the model, if one is provided.
+        Images that cannot be read are skipped, and counted in each summary's skipped_images.
+        progress_callback is called with the number of images evaluated. If a model_lock is provided, it is held
+        while the models are analysing images, so the models can be shared with other threads. If an ImageCache is
+        provided, images, their hashes and annotations are taken from it, so files used by other tests are not read
+        again. Returns a summary for each model. """
+    from helpers.prediction_store import PredictionStore
+    from helpers.result_cache import hash_file
+
+    stores = [model if isinstance(model, PredictionStore) else None for model in models]
+    per_image_csv_paths = list(per_image_csv_paths or [])
+    per_image_csv_paths += [None] * (len(models) - len(per_image_csv_paths))
+    files = [open(path, "w", newline="", encoding="utf-8") if path else None for path in per_image_csv_paths]
+    try:
+        evaluators = [DetectionEvaluator(per_image_file=file) for file in files]
+
+        read = image_cache.annotations if image_cache is not None else read_annotations
+        hash_image = image_cache.file_hash if image_cache is not None else hash_file
+        decode = image_cache.image if image_cache is not None else decode_image
+
+        def load(image_path):
+            name = os.path.splitext(os.path.basename(image_path))[0]
+            annotations = read(os.path.join(labels_dir, name + ".txt"))
+            image_hash = hash_image(image_path) if any(store is not None for store in stores) else None
+            stored = [store.get(image_hash) if store is not None else None for store in stores]
+            # The image is only decoded if a model needs to analyse it.
+            image = decode(image_path) if any(detections is None for detections in stored) else None
+            return image, image_hash, stored, annotations
+
+        def predict(loaded):
+            all_detections = [list(stored) for _, _, stored, _ in loaded]
+            for model_index, (model, store) in enumerate(zip(models, stores)):
+                missing = [index for index, detections in enumerate(all_detections) if detections[model_index] is None]
+                if not missing:
+                    continue
+
+                with model_lock or nullcontext():
+                    model = store.model() if store is not None else model
+                    results = model([loaded[index][0] for index in missing], conf=EVALUATION_CONFIDENCE,
+                                    verbose=False)
+                for index, result in zip(missing, results):
+                    all_detections[index][model_index] = normalised_detections(result)
+                    if store is not None:
+                        store.put(loaded[index][1], all_detections[index][model_index])
+
+            return [(detections, annotations) for detections, (_, _, _, annotations) in zip(all_detections, loaded)]
+
+        pipeline = InferencePipeline(load, predict, batch_size, yield_load_errors=True)
+        for evaluated, (image_path, result) in enumerate(pipeline.run(image_paths), start=1):
+            if isinstance(result, LoadError):
+                for evaluator in evaluators:
+                    evaluator.skip()
+            else:
+                detections, annotations = result
+                for evaluator, model_detections in zip(evaluators, detections):
+                    evaluator.add(os.path.basename(image_path), model_detections, annotations)
+            if progress_callback is not None:
+                progress_callback(evaluated)
+
+        for store in stores:
+            if store is not None:
+                store.save()
+
+        return [evaluator.summary() for evaluator in evaluators]
+    finally:
+        for file in files:
+            if file is not None:
+                file.close()
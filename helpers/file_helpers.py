@@ -1,5 +1,5 @@
-import random
 import shutil
+import sys
 from PySide6.QtWidgets import QFileDialog
 import os
 from data_classes.model_info import ModelInfo
@@ -19,6 +19,15 @@ def browse_file(self, opendir, fileConstraints):
         return ""
 
 
+def browse_folder(self, opendir):
+    """Allows the user to select a folder."""
+    folder_path = QFileDialog.getExistingDirectory(self, "Select a Folder", opendir)
+    if folder_path:
+        return folder_path
+    else:
+        return ""
+
+
 def delete_file(file_path):
     """Deletes the provided file path's file"""
     if os.path.exists(file_path):
@@ -60,39 +69,6 @@ def move_file(source_path, destination_path):
     shutil.copy(source_path, destination_path)
 
 
-def read_config_file(file_path):
-    """Reads a config file and returns its contents as a list."""
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as file:
-            paths = [line.strip() for line in file if line.strip()]  # Remove empty lines
-        return paths
-    return []
-
-
-def add_new_img(file_path, new_img):
-    """Adds a new image name to a provided file."""
-    try:
-        with open(file_path, "r+", encoding="utf-8") as file:
-            lines = file.readlines()
-
-            # If a file contains a blank line, the image is added, otherwise,
-            # a blankline is added and the image is added.
-            for i, line in enumerate(lines):
-                if line.strip() == "":  # Found a blank line
-                    lines[i] = new_img + "\n"
-                    break
-            else:
-                # No blank line found, append at the end
-                lines.append(new_img + "\n")
-
-            # Move cursor to the beginning and write updated content
-            file.seek(0)
-            file.writelines(lines)
-            file.truncate()  # Ensure no extra old content remains
-    except Exception as e:
-        print(f"Error: {e}")
-
-
 def create_file_empty_txt(file_path):
     """Creates a new empty text file. Returns a bool, if the name is unique. If not, the file will not be created."""
     if os.path.exists(file_path):
@@ -139,75 +115,46 @@ def count_image_files_in_directory(file_path):
     return 0
 
 
-def reset_training_data(train_data_dir, train_labels_dir):
-    """Deletes the contents of the provided training data folders."""
-    delete_contents_of_folder(train_data_dir)
-    delete_contents_of_folder(train_labels_dir)
-
-
-def delete_contents_of_folder(dir):
-    """Recursively deletes contents contained in the provided folder, but does not delete file structure."""
-    for dirpath, dirnames, filenames in os.walk(dir):
-        for filename in filenames:
-            if filename != ".gitignore":
-                file_path = os.path.join(dirpath, filename)
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Failed to delete {file_path}: {e}")
-
-
-def load_training_images(list_of_images, img_src_dir, label_src_dir, root_train_ai_dir):
-    """Loads new training images into the training directory to be used in training a new model."""
-    random.shuffle(list_of_images)
-    split_index = int(len(list_of_images) * 0.9)
-    train_images = list_of_images[:split_index]
-    test_images = list_of_images[split_index:]
-
-    image_train_dir = os.path.join(root_train_ai_dir, "images", "train")
-    image_test_dir = os.path.join(root_train_ai_dir, "images", "val")
-    label_train_dir = os.path.join(root_train_ai_dir, "labels", "train")
-    label_test_dir = os.path.join(root_train_ai_dir, "labels", "val")
-
-    # Make sure all dirs exist
-    for folder in [image_train_dir, image_test_dir, label_train_dir, label_test_dir]:
-        if not os.path.exists(folder):
-            raise ValueError("File Structure Corrupt")
+# Linux ioctl that makes a file share the contents of another on copy on write filesystems, e.g. Btrfs and XFS.
+FICLONE = 0x40049409
 
-    # Copy train and test sets
-    copy_img_and_label(train_images, img_src_dir, label_src_dir, image_train_dir, label_train_dir)
-    copy_img_and_label(test_images, img_src_dir, label_src_dir, image_test_dir, label_test_dir)
 
+def _reflink(source_path, destination_path):
+    """ Creates a copy on write clone of the file, which fails if the filesystem does not support it. """
+    if not sys.platform.startswith("linux"):
+        raise OSError("Reflinks are only supported on Linux.")
+    import fcntl
 
-def copy_img_and_label(filenames, img_src_dir, label_src_dir, img_dest, lbl_dest):
-    """Copies a provided file and its associated annotation file to a new directory."""
-    for filename in filenames:
-        image_path = os.path.join(img_src_dir, filename)
-        label_name = os.path.splitext(filename)[0] + ".txt"
-        label_path = os.path.join(label_src_dir, label_name)
-
-        if os.path.isfile(image_path):
-            shutil.copy2(image_path, img_dest)
-
-        if os.path.isfile(label_path):
-            shutil.copy2(label_path, lbl_dest)
-
-
-def remove_filename_from_configs(target_filename, config_dir):
-    """Checks each config for the file to be deleted and removes it."""
-    for filename in os.listdir(config_dir):
-        filepath = os.path.join(config_dir, filename)
-
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
-
-        # Remove the target filename if it exists
-        new_lines = [line.strip() for line in lines if line.strip() != target_filename]
+    with open(source_path, "rb") as source, open(destination_path, "wb") as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+        except OSError:
+            destination.close()
+            os.remove(destination_path)
+            raise
+    shutil.copystat(source_path, destination_path)
+
+
+def link_or_copy(source_path, destination):
+    """ Makes the file available at the destination without copying its contents where possible.
+        A hardlink is tried first, then a reflink, then a symlink, and the file is only copied if none are
+        supported, e.g. when the destination is on a different drive.
+        As with shutil.copy2, the destination can be a folder. Returns the method used. """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source_path))
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    for method, create in (("hardlink", os.link), ("reflink", _reflink),
+                           ("symlink", lambda source, dest: os.symlink(os.path.abspath(source), dest))):
+        try:
+            create(source_path, destination)
+            return method
+        except (OSError, NotImplementedError):
+            pass
 
-        # Only rewrite the file if something changed
-        if len(new_lines) != len(lines):
-            with open(filepath, 'w') as f:
-                f.write('\n'.join(new_lines) + '\n')  # Ensures exactly one newline at the end
+    shutil.copy2(source_path, destination)
+    return "copy"
 
 
 def delete_folder(provided_path):
@@ -253,21 +200,28 @@ def get_folder_name_from_path(path):
 
 def get_model_for_comparison(path):
     """ Returns the second most recent model for comparison. """
+    models = get_models_for_comparison(path, 1)
+
+    # No comparison possible
+    if len(models) == 0:
+        return ""
+
+    return models[0]
+
+
+def get_models_for_comparison(path, count):
+    """ Returns the weights of up to count models for comparison, newest first, excluding the most recent model. """
     # Get all folder names
     folders = [
         f for f in os.listdir(path)
         if os.path.isdir(os.path.join(path, f)) and f != '.gitignore'
     ]
 
-    # No comparison possible
-    if len(folders) < 2:
-        return ""
-
-    # Sort so the second most recent can be retrieved
+    # Sort so the most recent model can be skipped
     folders.sort(reverse=True)
 
-    model_info = ModelInfo.fromPath(os.path.join(path, folders[1], "info.json"))
-    return model_info.get_best_pt_path()
+    return [ModelInfo.fromPath(os.path.join(path, folder, "info.json")).get_best_pt_path()
+            for folder in folders[1:count + 1]]
 
 
 def get_annotation_for_image(image_path, annotation_folder):
@@ -0,0 +1,409 @@
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+"""
+Fuzzing tests how a model copes with corrupted and unusual images, without risking the rest of the program.
+Corrupted versions of the test images are generated in a small pool of threads (OpenCV and numpy release the GIL) and
+saved to a temporary folder. Very large mutations, such as huge_dimensions, are only created inside the worker that
+analyses them, so they are never written to disk.
+Each version is then analysed in a separate worker process, which has a time limit for each image and a memory limit.
+The memory limit is enforced by measuring the worker's memory use while it is busy (with psutil, or /proc on Linux)
+and stopping it if it uses too much, so it works on every operating system.
+If a worker crashes, uses too much memory or takes too long, only that image is marked as failed and a new worker is
+started, so a fault in the model cannot take down the program.
+"""
+
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_STARTUP_TIMEOUT_SECONDS = 300
+DEFAULT_MEMORY_LIMIT_BYTES = 8 * 1024 * 1024 * 1024  # 8 GB
+DEFAULT_GENERATION_WORKERS = 2
+MEMORY_CHECK_SECONDS = 0.1
+HUGE_IMAGE_SIZE = 8000
+
+# Outcomes of analysing a single fuzzed image.
+COMPLETED = "completed"
+ERROR = "error"
+CRASH = "crash"
+TIMEOUT = "timeout"
+
+
+def _channel_swap(image, rng):
+    if image.ndim < 3:
+        raise ValueError("The image has no colour channels to swap.")
+    return image[:, :, rng.permutation(image.shape[2])]
+
+
+def _gaussian_noise(image, rng):
+    noise = rng.normal(0, 25, image.shape)
+    return np.clip(image.astype(np.float64) + noise, 0, 255).astype(np.uint8)
+
+
+def _occlusion(image, rng):
+    image = image.copy()
+    h, w = image.shape[:2]
+    x1 = int(rng.integers(0, max(1, w // 2)))
+    y1 = int(rng.integers(0, max(1, h // 2)))
+    image[y1:y1 + int(rng.integers(1, max(2, h // 2))), x1:x1 + int(rng.integers(1, max(2, w // 2)))] = 0
+    return image
+
+
+def _combined(image, rng):
+    """ The original fuzzing test: swapped channels, noise and a hidden area. """
+    return _occlusion(_gaussian_noise(_channel_swap(image, rng), rng), rng)
+
+
+def _extreme_aspect_ratio(image, rng):
+    import cv2
+    width = int(rng.integers(2000, 4000))
+    return cv2.resize(image, (width, 8), interpolation=cv2.INTER_AREA)
+
+
+def _sixteen_bit(image, rng):
+    return image.astype(np.uint16) * 257
+
+
+def _grayscale(image, rng):
+    import cv2
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _huge_dimensions(image, rng):
+    import cv2
+    return cv2.resize(image, (HUGE_IMAGE_SIZE, HUGE_IMAGE_SIZE), interpolation=cv2.INTER_NEAREST)
+
+
+# Name -> function creating the corrupted image. truncated_file is handled separately, as it corrupts the file.
+MUTATIONS = {
+    "combined": _combined,
+    "channel_swap": _channel_swap,
+    "gaussian_noise": _gaussian_noise,
+    "occlusion": _occlusion,
+    "truncated_file": None,
+    "extreme_aspect_ratio": _extreme_aspect_ratio,
+    "sixteen_bit": _sixteen_bit,
+    "grayscale": _grayscale,
+    "huge_dimensions": _huge_dimensions
+}
+
+DEFAULT_MUTATIONS = list(MUTATIONS)
+
+# A clear error is the correct response to these mutations, so an error is counted as a pass.
+REJECTION_EXPECTED = {"truncated_file"}
+
+# These mutations are applied by the worker after reading the original image, rather than being saved to disk.
+APPLIED_IN_WORKER = {"huge_dimensions"}
+
+
+def generate_variant(image_path, mutation, seed, output_dir, image=None):
+    """ Creates the mutated version of the image in the output folder, and returns its path.
+        Mutations applied in the worker are saved unchanged, and mutated by load_variant instead.
+        If the decoded image is provided, the file is not read again. Run in the generation thread pool. """
+    import cv2
+
+    name = f"{os.path.splitext(os.path.basename(image_path))[0]}_{mutation}_{seed}.png"
+    variant_path = os.path.join(output_dir, name)
+
+    if mutation == "truncated_file":
+        if image is not None:
+            _, encoded = cv2.imencode(".png", image)
+            data = encoded.tobytes()
+        else:
+            with open(image_path, "rb") as file:
+                data = file.read()
+        with open(variant_path, "wb") as file:
+            file.write(data[:max(1, len(data) // 3)])
+        return variant_path
+
+    if image is None:
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Unable to read image: {image_path}")
+    if mutation not in APPLIED_IN_WORKER:
+        image = MUTATIONS[mutation](image, np.random.default_rng(seed))
+    # PNG keeps 16 bit and single channel images exactly as they were created.
+    if not cv2.imwrite(variant_path, image):
+        raise ValueError(f"Unable to save the {mutation} image.")
+    return variant_path
+
+
+def load_variant(variant_path, mutation, seed):
+    """ Reads a mutated image inside the worker process, applying the mutation if it is applied in the worker.
+        Returns None if the file cannot be decoded. """
+    import cv2
+
+    image = cv2.imread(variant_path, cv2.IMREAD_UNCHANGED)
+    if image is not None and mutation in APPLIED_IN_WORKER:
+        image = MUTATIONS[mutation](image, np.random.default_rng(seed))
+    return image
+
+
+def load_fuzzing_model(weights_path):
+    """ Loads the model inside a worker process. """
+    from helpers.model_cache import get_model
+    return get_model(weights_path)
+
+
+def process_memory_bytes(pid):
+    """ Returns the memory the process is using (its resident set size), or None if it cannot be measured.
+        psutil is used where it is installed, otherwise it is read from /proc on Linux. """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+
+    try:
+        with open(f"/proc/{pid}/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def memory_limit_supported():
+    """ Returns True if the memory use of the workers can be measured, so the memory limit can be enforced. """
+    return process_memory_bytes(os.getpid()) is not None
+
+
+def _worker_main(connection, loader, loader_args):
+    """ Runs in the worker process. Loads the model, then analyses each (image path, mutation, seed) it is sent until
+        it receives None. Files that cannot be decoded are passed to the model as paths, so it reports them in its
+        usual way. """
+    try:
+        model = loader(*loader_args)
+    except Exception as e:
+        connection.send((ERROR, 0.0, f"Unable to load model - {type(e).__name__}: {e}"))
+        return
+    connection.send((COMPLETED, 0.0, ""))
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            return
+
+        variant_path, mutation, seed = task
+        start = time.perf_counter()
+        try:
+            image = load_variant(variant_path, mutation, seed)
+            model(image if image is not None else variant_path, device="cpu", verbose=False)
+            connection.send((COMPLETED, time.perf_counter() - start, ""))
+        except Exception as e:
+            connection.send((ERROR, time.perf_counter() - start, f"{type(e).__name__}: {e}"))
+
+
+class IsolatedWorker:
+    """ A process that analyses images one at a time, restarted whenever it crashes or takes too long. """
+
+    def __init__(self, context, loader, loader_args, memory_limit_bytes=None,
+                 startup_timeout=DEFAULT_STARTUP_TIMEOUT_SECONDS):
+        self.context = context
+        self.loader = loader
+        self.loader_args = loader_args
+        self.memory_limit_bytes = memory_limit_bytes
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.connection = None
+
+    def start(self):
+        """ Starts the process and waits for the model to load. """
+        self.connection, child_connection = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_main, daemon=True,
+                                            args=(child_connection, self.loader, self.loader_args))
+        self.process.start()
+        child_connection.close()
+
+        failure = self._wait_for_reply(self.startup_timeout)
+        if failure is not None:
+            self.stop()
+            outcome, message = failure
+            raise RuntimeError("The fuzzing worker did not load the model in time." if outcome == TIMEOUT
+                               else message)
+        try:
+            outcome, _, message = self.connection.recv()
+        except EOFError:
+            outcome, message = CRASH, "The fuzzing worker crashed while loading the model."
+        if outcome != COMPLETED:
+            self.stop()
+            raise RuntimeError(message)
+
+    def analyse(self, variant_path, timeout, mutation=None, seed=0):
+        """ Analyses the image, applying the mutation first if it is applied in the worker.
+            Returns (outcome, seconds taken, error message). """
+        if self.process is None or not self.process.is_alive():
+            self.start()
+
+        start = time.perf_counter()
+        self.connection.send((variant_path, mutation, seed))
+        failure = self._wait_for_reply(timeout)
+        if failure is not None:
+            self.stop()
+            return failure[0], time.perf_counter() - start, failure[1]
+
+        try:
+            return self.connection.recv()
+        except EOFError:
+            # The process ended without replying, e.g. a segmentation fault or running out of memory.
+            self.process.join(5)
+            exit_code = self.process.exitcode
+            self.stop()
+            return CRASH, time.perf_counter() - start, f"Worker process ended with exit code {exit_code}."
+
+    def _wait_for_reply(self, timeout):
+        """ Waits for the worker to reply, checking its memory use while it is busy.
+            Returns None once it has replied (or ended), otherwise the (outcome, message) of the failure. """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return TIMEOUT, f"No result after {timeout} seconds."
+            if self.connection.poll(min(remaining, MEMORY_CHECK_SECONDS) if self.memory_limit_bytes else remaining):
+                return None
+
+            used = process_memory_bytes(self.process.pid) if self.memory_limit_bytes else None
+            if used is not None and used > self.memory_limit_bytes:
+                return CRASH, (f"Worker process used {used // (1024 * 1024)} MB, more than the "
+                               f"{self.memory_limit_bytes // (1024 * 1024)} MB memory limit.")
+
+    def stop(self):
+        if self.process is not None:
+            if self.process.is_alive():
+                try:
+                    self.connection.send(None)
+                except (OSError, BrokenPipeError):
+                    pass
+                self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        if self.connection is not None:
+            self.connection.close()
+        self.process = None
+        self.connection = None
+
+
+def summarise_outcomes(outcomes):
+    """ Summarises (mutation, outcome, seconds, message) tuples into failure and latency statistics per mutation. """
+    report = {}
+    for mutation, outcome, seconds, message in outcomes:
+        stats = report.setdefault(mutation, {"tests": 0, "passed": 0, COMPLETED: 0, ERROR: 0, CRASH: 0, TIMEOUT: 0,
+                                             "latencies": [], "errors": []})
+        stats["tests"] += 1
+        stats[outcome] += 1
+        if outcome == COMPLETED or (outcome == ERROR and mutation in REJECTION_EXPECTED):
+            stats["passed"] += 1
+        if outcome in (COMPLETED, ERROR):
+            stats["latencies"].append(seconds * 1000)
+        if message and message not in stats["errors"]:
+            stats["errors"].append(message)
+
+    for stats in report.values():
+        latencies = stats.pop("latencies")
+        stats["mean_latency_ms"] = round(float(np.mean(latencies)), 1) if latencies else 0.0
+        stats["max_latency_ms"] = round(float(np.max(latencies)), 1) if latencies else 0.0
+        stats["errors"] = stats["errors"][:5]
+    return report
+
+
+class FuzzingHarness:
+    """ Generates mutated versions of images and analyses them in isolated worker processes. """
+
+    def __init__(self, weights_path, mutations=DEFAULT_MUTATIONS, workers=2,
+                 generation_workers=DEFAULT_GENERATION_WORKERS,
+                 timeout=DEFAULT_TIMEOUT_SECONDS, memory_limit_bytes=DEFAULT_MEMORY_LIMIT_BYTES,
+                 loader=load_fuzzing_model, seed=None):
+        self.weights_path = weights_path
+        self.mutations = list(mutations)
+        self.workers = max(1, workers)
+        self.generation_workers = max(1, generation_workers)
+        self.timeout = timeout
+        self.memory_limit_bytes = memory_limit_bytes
+        # Without psutil, e.g. on Windows, the workers' memory use cannot be measured, so the limit is not enforced.
+        self.memory_limit_enforced = bool(memory_limit_bytes) and memory_limit_supported()
+        self.loader = loader
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        # Processes are started fresh, rather than copying this process, so they do not inherit Qt or CUDA state.
+        self.context = multiprocessing.get_context("spawn")
+
+    def run(self, image_paths, progress_callback=None, load_image=None):
+        """ Fuzzes every image with every mutation. progress_callback is called with the number of tests completed
+            and the total. If load_image is provided, it is used to decode each image, e.g. from an ImageCache,
+            instead of each generation thread reading the file. Returns the statistics for each mutation. """
+        output_dir = tempfile.mkdtemp(prefix="fuzzing_")
+        outcomes = []
+        try:
+            tasks = self.generate_variants(image_paths, output_dir, outcomes, load_image)
+            self.analyse_variants(tasks, outcomes, len(tasks) + len(outcomes), progress_callback)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        return summarise_outcomes(outcomes)
+
+    def generate_variants(self, image_paths, output_dir, outcomes, load_image=None):
+        """ Creates the mutated images in a thread pool. Returns the (mutation, path, seed) of each one created, and
+            adds a failed outcome for any that could not be created. """
+        tasks = []
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.generation_workers) as executor:
+            for index, image_path in enumerate(image_paths):
+                image = None
+                if load_image is not None:
+                    try:
+                        image = load_image(image_path)
+                    except ValueError:
+                        # Left for the generation thread, which reports the file as unreadable.
+                        pass
+                futures.extend(
+                    (mutation, self.seed + index,
+                     executor.submit(generate_variant, image_path, mutation, self.seed + index, output_dir, image))
+                    for mutation in self.mutations
+                )
+            for mutation, seed, future in futures:
+                try:
+                    tasks.append((mutation, future.result(), seed))
+                except Exception as e:
+                    outcomes.append((mutation, ERROR, 0.0, f"Unable to create image - {type(e).__name__}: {e}"))
+        return tasks
+
+    def analyse_variants(self, tasks, outcomes, total, progress_callback=None):
+        """ Analyses the mutated images, sharing them between the worker processes. """
+        task_queue = queue.Queue()
+        for task in tasks:
+            task_queue.put(task)
+        lock = threading.Lock()
+
+        def work():
+            worker = IsolatedWorker(self.context, self.loader, (self.weights_path,), self.memory_limit_bytes)
+            try:
+                while True:
+                    try:
+                        mutation, variant_path, seed = task_queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        outcome = worker.analyse(variant_path, self.timeout, mutation, seed)
+                    except RuntimeError as e:
+                        outcome = (CRASH, 0.0, str(e))
+                    with lock:
+                        outcomes.append((mutation, *outcome))
+                        completed = len(outcomes)
+                    if progress_callback is not None:
+                        progress_callback(completed, total)
+            finally:
+                worker.stop()
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(min(self.workers, len(tasks)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
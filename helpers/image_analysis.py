@@ -1,17 +1,114 @@
+import datetime
+import os
+import time
+import numpy as np
 from PySide6.QtCore import QThread, Signal
-from ultralytics import YOLO
+from helpers import inference
+from helpers.model_cache import get_model, fastest_weights_path
+from helpers.result_cache import result_cache
+from helpers.tiled_inference import detection_settings
 
 
 class ImageAnalysisWorker(QThread):
-    """A worker class to analyse a provided image using YOLO."""
+    """A worker class to analyse a provided image using YOLO.
+    If tile settings are provided, the image is analysed in tiles at its native resolution.
+    Results are stored in the result cache, so analysing the same image with the same model again is instant."""
     finished_signal = Signal(object)
 
-    def __init__(self, model_path, image_path):
+    def __init__(self, model_path, image_path, tile_settings=None):
         super().__init__()
         self.model_path = model_path
         self.image_path = image_path
+        self.tile_settings = tile_settings
 
     def run(self):
-        model = YOLO(self.model_path)
-        results = model(self.image_path)
+        weights_path = fastest_weights_path(self.model_path)
+        cache_key = result_cache.key(self.image_path, weights_path,
+                                     {"tile_settings": detection_settings(self.tile_settings)})
+
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            detections, orig_shape, names = cached
+            # The results page reads the image from its path, so the image does not need decoding again.
+            # An empty image of the same size is provided, as only its shape is used by the result.
+            placeholder_image = np.empty((*orig_shape, 0), dtype=np.uint8)
+            results = [inference.build_result(placeholder_image, self.image_path, names, detections)]
+            self.finished_signal.emit(results)
+            return
+
+        model = get_model(weights_path, prefer_fastest=False)
+        if self.tile_settings is not None:
+            results = [inference.analyse_image_tiled(model, self.image_path, **self.tile_settings)]
+        else:
+            results = model(self.image_path)
+
+        result_cache.put(cache_key, inference.result_detections(results[0]), results[0].orig_shape, model.names)
         self.finished_signal.emit(results)
+
+
+class BatchImageAnalysisWorker(QThread):
+    """A worker class to analyse every image in a folder using a single loaded model.
+    Progress is reported after each batch, and a verdict summary is written to a CSV file in the folder.
+    Images that cannot be read are listed in the summary with an error verdict. If the analysis is cancelled with stop,
+    or stops because of an error, the summaries of the images already analysed are still saved, and any error is
+    provided when finished."""
+    progress_signal = Signal(int, int, float)  # Images analysed, total images, images per second
+    finished_signal = Signal(str, object, str)  # Summary CSV path, list of summaries, error message or ""
+
+    def __init__(self, model_path, folder_path, batch_size=8, tile_settings=None):
+        super().__init__()
+        self.model_path = model_path
+        self.folder_path = folder_path
+        self.batch_size = batch_size
+        self.tile_settings = tile_settings
+        self._is_running = True
+
+    def run(self):
+        summaries = []
+        error = ""
+        try:
+            self.analyse_folder(summaries)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        summary_path = ""
+        if summaries:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            summary_path = os.path.join(self.folder_path, f"analysis_summary_{timestamp}.csv")
+            try:
+                inference.write_summary_csv(summaries, summary_path)
+            except OSError as e:
+                summary_path = ""
+                error = error or f"Unable to save the summary: {e}"
+
+        self.finished_signal.emit(summary_path, summaries, error)
+
+    def analyse_folder(self, summaries):
+        """ Analyses each image in the folder, adding its verdict summary to the provided list. """
+        image_paths = inference.list_images(self.folder_path)
+        total = len(image_paths)
+
+        model = get_model(self.model_path)
+        if not self._is_running:
+            return
+        start_time = time.perf_counter()
+        self.progress_signal.emit(0, total, 0.0)
+
+        results = inference.analyse_images(model, image_paths, self.batch_size, self.tile_settings)
+        for image_path, result in results:
+            if not self._is_running:
+                break
+
+            summaries.append(inference.summarise_result(os.path.basename(image_path), result))
+
+            # Progress is only reported at the end of each batch, to avoid flooding the GUI with updates.
+            if len(summaries) % self.batch_size == 0 or len(summaries) == total:
+                elapsed = time.perf_counter() - start_time
+                self.progress_signal.emit(len(summaries), total, len(summaries) / elapsed if elapsed else 0.0)
+
+    def stop(self):
+        """ Stops the analysis after the current batch. """
+        self._is_running = False
+
+    def is_cancelled(self):
+        return not self._is_running
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+"""
+Image_Cache keeps decoded images and parsed annotations in memory while a set of images is used by several tests,
+so each file is only read from disk and decoded once. The file's hash is calculated from the same read, so stored
+predictions can be looked up without reading the file again.
+Images are kept until the cache's memory limit is reached, after which the least recently used images are removed.
+Cached images are shared between threads, so they are read only. Any changes must be made to a copy.
+"""
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB of decoded images
+
+
+def _entry_bytes(entry):
+    return entry.nbytes if isinstance(entry, np.ndarray) else len(entry)
+
+
+class ImageCache:
+    """ A thread safe, least recently used cache of decoded images, limited by the memory they use. """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.read_count = 0
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        self._entries = OrderedDict()  # path -> file contents, or the decoded image once it has been decoded
+        self._bytes = 0
+        self._hashes = {}
+        self._annotations = {}
+
+    def _path_lock(self, path):
+        """ Returns the lock for a single file, so two threads requesting the same file only read it once,
+            while different files can be read at the same time. """
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def _cached(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+            return entry
+
+    def _store(self, path, entry):
+        with self._lock:
+            if path in self._entries:
+                self._bytes -= _entry_bytes(self._entries[path])
+            self._entries[path] = entry
+            self._bytes += _entry_bytes(entry)
+            self._entries.move_to_end(path)
+            self._evict()
+
+    def _read(self, path):
+        """ Reads the file's contents, and records its hash. """
+        with open(path, "rb") as file:
+            data = file.read()
+        with self._lock:
+            self.read_count += 1
+            self._hashes[path] = hashlib.sha256(data).hexdigest()
+        return data
+
+    def image(self, image_path):
+        """ Returns the decoded BGR image, raising an error if it cannot be read. """
+        import cv2
+
+        path = os.path.abspath(image_path)
+        with self._path_lock(path):
+            entry = self._cached(path)
+            if isinstance(entry, np.ndarray):
+                return entry
+
+            data = entry if entry is not None else self._read(path)
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Unable to read image: {image_path}")
+            image.flags.writeable = False
+            self._store(path, image)
+            return image
+
+    def file_hash(self, image_path):
+        """ Returns the SHA-256 hash of the file's contents, matching result_cache.hash_file.
+            If the file has to be read, its contents are kept until the image is decoded. """
+        path = os.path.abspath(image_path)
+        with self._path_lock(path):
+            with self._lock:
+                if path in self._hashes:
+                    return self._hashes[path]
+            self._store(path, self._read(path))
+            return self._hashes[path]
+
+    def annotations(self, annotation_path):
+        """ Returns the YOLO boxes in the annotation file, as read by evaluation.read_annotations. """
+        from helpers.evaluation import read_annotations
+
+        path = os.path.abspath(annotation_path)
+        with self._path_lock(path):
+            if path not in self._annotations:
+                boxes = read_annotations(path)
+                boxes.flags.writeable = False
+                self._annotations[path] = boxes
+            return self._annotations[path]
+
+    def _evict(self):
+        """ Removes the least recently used images until the cache is within its memory limit.
+            The most recently used image is always kept, even if it is larger than the limit. """
+        while len(self._entries) > 1 and self._bytes > self.max_bytes:
+            self._bytes -= _entry_bytes(self._entries.popitem(last=False)[1])
+
+    def total_bytes(self):
+        """ Returns the memory used by the cached images and file contents. """
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hashes.clear()
+            self._annotations.clear()
+
+    def __contains__(self, image_path):
+        return os.path.abspath(image_path) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,162 @@
+import csv
+import glob
+import os
+
+"""
+Inference contains the functions used to run a model over one or more images and summarise the results.
+It deliberately does not import Qt, so it can be shared by the GUI workers and any headless tools.
+"""
+
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.PNG', '.JPG')
+SUMMARY_FIELDS = ["image", "verdict", "box_count", "max_confidence"]
+
+
+def list_images(folder):
+    """Returns the sorted paths of every image file directly inside the provided folder."""
+    return sorted(
+        os.path.join(folder, f) for f in os.listdir(folder)
+        if os.path.isfile(os.path.join(folder, f)) and f.endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def collect_images(inputs):
+    """Expands the provided files, glob patterns and directories into a sorted list of unique image paths."""
+    image_paths = set()
+    for provided in inputs:
+        if os.path.isdir(provided):
+            image_paths.update(list_images(provided))
+            continue
+
+        matches = glob.glob(provided, recursive=True) if glob.has_magic(provided) else [provided]
+        image_paths.update(path for path in matches if os.path.isfile(path) and path.endswith(IMAGE_EXTENSIONS))
+
+    return sorted(image_paths)
+
+
+def resolve_weights_path(model, models_dir="trained_models"):
+    """Returns the weights path for the provided model. The model can be a weights file, a trained model's folder
+    or the name of a folder in the trained models directory."""
+    from data_classes.model_info import ModelInfo
+
+    if os.path.isfile(model):
+        return model
+
+    for folder in (model, os.path.join(models_dir, model)):
+        info_path = os.path.join(folder, "info.json")
+        if os.path.isfile(info_path):
+            return ModelInfo.fromPath(info_path).get_best_pt_path()
+
+    raise FileNotFoundError(f"Model not found: {model}")
+
+
+def batch_items(items, batch_size):
+    """Splits the provided items into lists of at most batch_size items."""
+    batch_size = max(1, int(batch_size))
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def analyse_images(model, image_paths, batch_size=8, tile_settings=None, workers=None, timings=None):
+    """Runs the model over the provided images, batch_size images at a time.
+    Images are decoded by a pool of threads while the model analyses the previous batch.
+    If tile_settings are provided, each image is instead analysed in tiles, using the settings' tile batch size.
+    Per stage timings are recorded in the provided StageTimings, if any.
+    Yields a tuple of (image_path, result) for each image, in the order provided. Images that cannot be read do not
+    stop the analysis, and have a LoadError as their result."""
+    from helpers.inference_pipeline import InferencePipeline, LoadError, decode_image
+    from helpers.tiled_inference import tiled_predict
+
+    if tile_settings is not None:
+        def predict(images):
+            return [tiled_predict(model, image, **tile_settings) for image in images]
+        pipeline = InferencePipeline(decode_image, predict, batch_size=1, workers=workers, timings=timings,
+                                     yield_load_errors=True)
+    else:
+        def predict(images):
+            return model(images, verbose=False)
+        pipeline = InferencePipeline(decode_image, predict, batch_size, workers=workers, timings=timings,
+                                     yield_load_errors=True)
+
+    for image_path, result in pipeline.run(image_paths):
+        if not isinstance(result, LoadError):
+            # Results created from decoded images do not know which file they came from.
+            result.path = image_path
+        yield image_path, result
+
+
+def analyse_image_tiled(model, image_path, **tile_settings):
+    """Decodes the image at its native resolution and analyses it in overlapping tiles."""
+    from helpers.inference_pipeline import decode_image
+    from helpers.tiled_inference import tiled_predict
+
+    return tiled_predict(model, decode_image(image_path), path=image_path, **tile_settings)
+
+
+def build_result(orig_img, path, names, detections):
+    """Creates a YOLO result from (x1, y1, x2, y2, confidence, class) pixel detections,
+    so results created outside of the model can be displayed in the same way as the model's own results."""
+    import torch
+    from ultralytics.engine.results import Results
+
+    boxes = torch.as_tensor(detections, dtype=torch.float32).reshape(-1, 6)
+    return Results(orig_img=orig_img, path=path, names=names, boxes=boxes)
+
+
+def result_detections(result):
+    """Returns the result's boxes as an array of (x1, y1, x2, y2, confidence, class) pixel detections."""
+    return result.boxes.data.cpu().numpy().reshape(-1, 6)
+
+
+def summarise_result(image_path, result):
+    """Creates the verdict summary for a single image's result.
+    Images that could not be read have an error as their verdict, so they are still listed in the summary."""
+    from helpers.inference_pipeline import LoadError
+
+    if isinstance(result, LoadError):
+        return {"image": image_path, "verdict": f"Error: {result}", "box_count": 0, "max_confidence": 0.0}
+
+    confidences = [float(conf) for conf in result.boxes.conf]
+    return {
+        "image": image_path,
+        "verdict": "Fault Detected" if confidences else "No Fault Detected",
+        "box_count": len(confidences),
+        "max_confidence": round(max(confidences), 4) if confidences else 0.0
+    }
+
+
+def result_to_dict(image_path, result):
+    """Converts a result into a dictionary containing its verdict summary and every box found.
+    Box positions are normalised YOLO (x centre, y centre, width, height) values."""
+    from helpers.inference_pipeline import LoadError
+
+    summary = summarise_result(image_path, result)
+    if isinstance(result, LoadError):
+        summary["boxes"] = []
+        return summary
+
+    summary["boxes"] = [
+        {
+            "class_id": int(class_id),
+            "confidence": round(float(conf), 4),
+            "x_center": round(float(xywhn[0]), 6),
+            "y_center": round(float(xywhn[1]), 6),
+            "width": round(float(xywhn[2]), 6),
+            "height": round(float(xywhn[3]), 6)
+        }
+        for class_id, conf, xywhn in zip(result.boxes.cls.tolist(), result.boxes.conf.tolist(),
+                                         result.boxes.xywhn.tolist())
+    ]
+    return summary
+
+
+def write_summary_csv(summaries, csv_path):
+    """Writes the per image verdict summaries to a CSV file."""
+    with open(csv_path, "w", newline="", encoding="utf-8") as file:
+        write_summary_rows(summaries, file)
+
+
+def write_summary_rows(summaries, file):
+    """Writes the per image verdict summaries as CSV rows to an open file."""
+    writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(summaries)
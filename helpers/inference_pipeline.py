@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+Inference_Pipeline overlaps image decoding and preprocessing with model inference for bulk analysis.
+Images are loaded by a pool of worker threads (OpenCV releases the GIL while decoding) while the model is analysing
+the previous batch, so the CPU cores are kept busy instead of waiting on each stage in turn.
+Only a limited number of images are loaded ahead of the model, so memory use does not grow with the number of images.
+"""
+
+MAX_DEFAULT_WORKERS = 4
+
+
+def default_workers():
+    """ Returns the number of loading threads to use, leaving a core free for the model where possible. """
+    return max(1, min(MAX_DEFAULT_WORKERS, (os.cpu_count() or 2) - 1))
+
+
+class StageTimings:
+    """ Records the total time spent in each stage of the pipeline. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.load_seconds = 0.0  # Summed across the loading threads
+        self.infer_seconds = 0.0
+        self.wait_seconds = 0.0  # Time the model spent waiting for loaded images
+        self.total_seconds = 0.0
+        self.items = 0
+        self.batches = 0
+
+    def add_load(self, seconds):
+        with self._lock:
+            self.load_seconds += seconds
+
+    def summary(self):
+        """ Returns the timings as a dictionary, including the overall throughput. """
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "load_seconds": round(self.load_seconds, 4),
+            "infer_seconds": round(self.infer_seconds, 4),
+            "wait_seconds": round(self.wait_seconds, 4),
+            "total_seconds": round(self.total_seconds, 4),
+            "items_per_second": round(self.items / self.total_seconds, 4) if self.total_seconds else 0.0
+        }
+
+
+class LoadError:
+    """ The result of an item that could not be loaded, holding the error raised while loading it. """
+
+    def __init__(self, error):
+        self.error = error
+
+    def __str__(self):
+        return str(self.error)
+
+
+class InferencePipeline:
+    """ Streams items through a load stage and an inference stage.
+
+        load(item) is run in a thread pool and returns the model input for the item (e.g. a decoded image).
+        predict(list of inputs) is run on the calling thread and returns one result per input.
+        Results are yielded as (item, result) pairs in the same order as the items were provided.
+        If an item fails to load, the error is raised, unless yield_load_errors is True, in which case the item is
+        not analysed and a LoadError is yielded as its result. """
+
+    def __init__(self, load, predict, batch_size=8, workers=None, prefetch_batches=2, timings=None,
+                 yield_load_errors=False):
+        self.load = load
+        self.predict = predict
+        self.batch_size = max(1, int(batch_size))
+        self.workers = max(1, int(workers or default_workers()))
+        # The most loaded items waiting for the model. Loading pauses when this is reached (backpressure).
+        self.max_pending = self.batch_size * max(1, int(prefetch_batches))
+        self.timings = timings if timings is not None else StageTimings()
+        self.yield_load_errors = yield_load_errors
+
+    def _timed_load(self, item):
+        start = time.perf_counter()
+        try:
+            return self.load(item)
+        finally:
+            self.timings.add_load(time.perf_counter() - start)
+
+    def _loaded(self, future):
+        """ Returns the loaded item, or a LoadError if it could not be loaded and errors are yielded. """
+        try:
+            return future.result()
+        except Exception as e:
+            if not self.yield_load_errors:
+                raise
+            return LoadError(e)
+
+    def run(self, items):
+        """ Yields (item, result) for each of the provided items, in order. """
+        start_time = time.perf_counter()
+        pending = queue.Queue(maxsize=self.max_pending)
+        stop_event = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def submit_items():
+                # Futures are queued in order. The queue blocks when full, so no more than max_pending items
+                # are loaded ahead of the model.
+                for item in items:
+                    if stop_event.is_set():
+                        break
+                    future = executor.submit(self._timed_load, item)
+                    while not stop_event.is_set():
+                        try:
+                            pending.put((item, future), timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                pending.put(None)
+
+            submitter = threading.Thread(target=submit_items, daemon=True)
+            submitter.start()
+
+            try:
+                finished = False
+                while not finished:
+                    batch_items, batch_inputs = [], []
+                    wait_start = time.perf_counter()
+                    while len(batch_items) < self.batch_size:
+                        entry = pending.get()
+                        if entry is None:
+                            finished = True
+                            break
+                        item, future = entry
+                        batch_items.append(item)
+                        batch_inputs.append(self._loaded(future))
+                    self.timings.wait_seconds += time.perf_counter() - wait_start
+
+                    if not batch_items:
+                        break
+
+                    # Items that could not be loaded are left out of the batch, and keep their LoadError.
+                    loaded_inputs = [value for value in batch_inputs if not isinstance(value, LoadError)]
+                    results = []
+                    if loaded_inputs:
+                        infer_start = time.perf_counter()
+                        results = self.predict(loaded_inputs)
+                        self.timings.infer_seconds += time.perf_counter() - infer_start
+                        self.timings.batches += 1
+                    self.timings.items += len(batch_items)
+
+                    results = iter(results)
+                    for item, value in zip(batch_items, batch_inputs):
+                        yield item, value if isinstance(value, LoadError) else next(results)
+            finally:
+                # Stops loading further items if the consumer stops early or an error occurs.
+                stop_event.set()
+                while submitter.is_alive():
+                    try:
+                        pending.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                self.timings.total_seconds = time.perf_counter() - start_time
+
+
+def decode_image(image_path):
+    """ Decodes an image from disk into a BGR array, raising an error if it cannot be read. """
+    import cv2
+
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Unable to read image: {image_path}")
+    return image
@@ -0,0 +1,229 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from helpers import inference
+from helpers.model_cache import get_model
+
+"""
+Inference_Server provides a small local HTTP service that analyses uploaded images.
+Models are kept loaded by the model cache, and requests that arrive at the same time are combined into a single
+batch, so several inspection stations can share one computer without reloading the weights for every image.
+
+Endpoints:
+    GET  /health              Returns {"status": "ok"}.
+    GET  /models              Returns the names of the trained models that can be used.
+    POST /analyse?model=NAME  The request body is the raw bytes of a jpg or png image.
+                              Returns the verdict and boxes found, in the same format as the command line.
+"""
+
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT_MS = 20
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+
+
+class MicroBatcher:
+    """ Combines requests made within a short window into batches.
+        A single worker thread collects requests until either the batch is full or the oldest request has waited
+        max_wait_ms, then runs each model once over all the images requested for it. """
+
+    def __init__(self, predict, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        """ predict is called with (model_key, list of images) and must return one result per image. """
+        self.predict = predict
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._requests = queue.Queue()
+        self._is_running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, model_key, image):
+        """ Queues an image to be analysed. Returns a Future which will contain the result. """
+        future = Future()
+        self._requests.put((model_key, image, future))
+        return future
+
+    def stop(self):
+        """ Stops the worker thread once the current batch has finished. """
+        self._is_running = False
+        self._requests.put(None)
+        self._thread.join()
+
+    def _collect_batch(self):
+        """ Waits for a request, then collects further requests until the batch is full or the window closes. """
+        first = self._requests.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._is_running = False
+                break
+            batch.append(request)
+
+        return batch
+
+    def _run(self):
+        while self._is_running:
+            batch = self._collect_batch()
+
+            # Requests for different models are in the same window, so each model is run once for its images.
+            requests_by_model = {}
+            for model_key, image, future in batch:
+                requests_by_model.setdefault(model_key, []).append((image, future))
+
+            for model_key, requests in requests_by_model.items():
+                try:
+                    results = self.predict(model_key, [image for image, _ in requests])
+                    for (_, future), result in zip(requests, results):
+                        future.set_result(result)
+                except Exception as e:
+                    for _, future in requests:
+                        future.set_exception(e)
+
+
+class InferenceServer(ThreadingHTTPServer):
+    """ HTTP server that analyses uploaded images using the trained models. """
+    daemon_threads = True
+
+    def __init__(self, address, models_dir="trained_models", max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, default_model=""):
+        super().__init__(address, InferenceRequestHandler)
+        self.models_dir = models_dir
+        self.default_model = default_model
+        self.batcher = MicroBatcher(self.predict, max_batch_size, max_wait_ms)
+
+    def predict(self, weights_path, images):
+        """ Runs the model over a batch of decoded images. """
+        model = get_model(weights_path)
+        return model(images, verbose=False)
+
+    def list_models(self):
+        """ Returns the names of the trained models available to the server. """
+        if not os.path.isdir(self.models_dir):
+            return []
+        return sorted(
+            folder for folder in os.listdir(self.models_dir)
+            if os.path.isfile(os.path.join(self.models_dir, folder, "info.json"))
+        )
+
+    def weights_path(self, model):
+        """ Returns the weights path of the named trained model. Only the names of folders in the models directory
+            are accepted, so requests cannot load files from elsewhere on the computer.
+            Raises ValueError if the name is not a plain folder name, and FileNotFoundError if it is not a model. """
+        is_folder_name = model not in ("", ".", "..") and not any(separator in model for separator in "/\\:")
+        if not is_folder_name or os.path.isabs(model):
+            raise ValueError(f"Invalid model name: {model}")
+        if model not in self.list_models():
+            raise FileNotFoundError(f"Model not found: {model}")
+        return inference.resolve_weights_path(os.path.join(self.models_dir, model), self.models_dir)
+
+    def server_close(self):
+        self.batcher.stop()
+        super().server_close()
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """ Handles a single HTTP request to the inference server. """
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif path == "/models":
+            self.send_json(200, {"models": self.server.list_models()})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/analyse":
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        # Checked before anything is read, so a bad or oversized upload is rejected without reading the body.
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length > MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            self.send_json(413, {"error": f"The image must be no larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"})
+            return
+        if length <= 0:
+            self.close_connection = True
+            self.send_json(400, {"error": "An image must be provided as the request body"})
+            return
+
+        models = parse_qs(url.query).get("model")
+        if models is None and self.server.default_model == "":
+            self.send_json(400, {"error": "No model provided"})
+            return
+
+        try:
+            if models is None:
+                # The default model is chosen by whoever started the server, so it can also be a weights file.
+                weights_path = inference.resolve_weights_path(self.server.default_model, self.server.models_dir)
+            else:
+                weights_path = self.server.weights_path(models[0])
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except FileNotFoundError as e:
+            self.send_json(404, {"error": str(e)})
+            return
+
+        image = decode_image(self.rfile.read(length))
+        if image is None:
+            self.send_json(400, {"error": "The uploaded file is not a valid image"})
+            return
+
+        try:
+            result = self.server.batcher.submit(weights_path, image).result()
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+            return
+
+        self.send_json(200, inference.result_to_dict(self.headers.get("X-Filename", ""), result))
+
+    def send_json(self, status, data):
+        """ Sends the provided data as a JSON response. """
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def decode_image(data):
+    """ Decodes the uploaded bytes into a BGR image, returning None if they are not a valid image. """
+    import cv2
+    import numpy as np
+
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def serve(host="127.0.0.1", port=8000, **server_settings):
+    """ Starts the inference server and handles requests until interrupted. """
+    server = InferenceServer((host, port), **server_settings)
+    print(f"Inference server running on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping inference server...")
+    finally:
+        server.server_close()
@@ -0,0 +1,81 @@
+import numpy as np
+
+"""
+Metamorphic contains the image transformations used to test if a model finds the same faults in different versions of
+the same image. Each transformation changes the image, and has a matching function that maps boxes found in the
+changed image back to their position in the original image, so the two sets of boxes can be compared directly.
+Boxes are YOLO (class, x centre, y centre, width, height) values, normalised to the size of the image.
+"""
+
+
+def rotate_boxes_90_clockwise(boxes):
+    """ Returns the boxes' positions after the image is rotated by 90 degrees clockwise. """
+    boxes = _as_box_array(boxes)
+    return np.column_stack([boxes[:, 0], 1 - boxes[:, 2], boxes[:, 1], boxes[:, 4], boxes[:, 3]])
+
+
+def rotate_boxes_90_anticlockwise(boxes):
+    """ Returns the boxes' positions after the image is rotated by 90 degrees anticlockwise. """
+    boxes = _as_box_array(boxes)
+    return np.column_stack([boxes[:, 0], boxes[:, 2], 1 - boxes[:, 1], boxes[:, 4], boxes[:, 3]])
+
+
+def flip_boxes(boxes, horizontal=True, vertical=False):
+    """ Returns the boxes' positions after the image is mirrored horizontally and/or vertically. """
+    boxes = _as_box_array(boxes).copy()
+    if horizontal:
+        boxes[:, 1] = 1 - boxes[:, 1]
+    if vertical:
+        boxes[:, 2] = 1 - boxes[:, 2]
+    return boxes
+
+
+def _as_box_array(boxes):
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 5)
+
+
+def _adjust_brightness_contrast(image, alpha=1.0, beta=0.0):
+    import cv2
+    return cv2.convertScaleAbs(image, alpha=alpha, beta=beta)
+
+
+def _resize(image, scale):
+    import cv2
+    height, width = image.shape[:2]
+    return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+
+
+def _rotate(image, rotate_code_name):
+    import cv2
+    return cv2.rotate(image, getattr(cv2, rotate_code_name))
+
+
+# Name -> (function that changes the image, function that maps boxes in the changed image back to the original).
+# Brightness, contrast and scale changes do not move anything, so their boxes are unchanged.
+TRANSFORMS = {
+    "rotate_90": (lambda image: _rotate(image, "ROTATE_90_CLOCKWISE"), rotate_boxes_90_anticlockwise),
+    "rotate_180": (lambda image: _rotate(image, "ROTATE_180"),
+                   lambda boxes: flip_boxes(boxes, horizontal=True, vertical=True)),
+    "rotate_270": (lambda image: _rotate(image, "ROTATE_90_COUNTERCLOCKWISE"), rotate_boxes_90_clockwise),
+    "flip_horizontal": (lambda image: image[:, ::-1], lambda boxes: flip_boxes(boxes, horizontal=True)),
+    "flip_vertical": (lambda image: image[::-1], lambda boxes: flip_boxes(boxes, horizontal=False, vertical=True)),
+    "brighter": (lambda image: _adjust_brightness_contrast(image, beta=40), _as_box_array),
+    "darker": (lambda image: _adjust_brightness_contrast(image, beta=-40), _as_box_array),
+    "higher_contrast": (lambda image: _adjust_brightness_contrast(image, alpha=1.3, beta=-38), _as_box_array),
+    "lower_contrast": (lambda image: _adjust_brightness_contrast(image, alpha=0.7, beta=38), _as_box_array),
+    "scale_down": (lambda image: _resize(image, 0.75), _as_box_array),
+    "scale_up": (lambda image: _resize(image, 1.25), _as_box_array)
+}
+
+DEFAULT_TRANSFORMS = list(TRANSFORMS)
+
+
+def create_variants(image, transform_names=DEFAULT_TRANSFORMS):
+    """ Returns the transformed versions of the image, in the same order as the transform names. """
+    return [np.ascontiguousarray(TRANSFORMS[name][0](image)) for name in transform_names]
+
+
+def boxes_to_original(transform_name, boxes):
+    """ Maps boxes found in an image changed by the named transform back to their position in the original image. """
+    return TRANSFORMS[transform_name][1](boxes).tolist()
@@ -0,0 +1,184 @@
+import importlib.util
+import json
+import os
+import threading
+from collections import OrderedDict
+
+"""
+Model_Cache keeps loaded YOLO models in memory so they can be reused between analyses.
+Loading the weights and building the graph is far slower than a single inference, so every part of the system
+that needs a model (image analysis, model testing, batch analysis) should request it through get_model.
+"""
+
+DEFAULT_MAX_MODELS = 3
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB of weights
+
+# Exported formats, fastest first, and the module required to run them on the CPU.
+CPU_BACKEND_PREFERENCE = [
+    ("onnx_int8", "onnxruntime"),
+    ("openvino", "openvino"),
+    ("onnx", "onnxruntime")
+]
+
+
+def _load_yolo(weights_path):
+    """ Loads the provided weights with YOLO. Imported here so the cache can be used without loading torch. """
+    from ultralytics import YOLO
+    # The task must be provided for exported models, as it is not stored in their weights.
+    return YOLO(weights_path, task="detect")
+
+
+def fastest_weights_path(weights_path):
+    """ Returns the fastest available version of the provided best.pt weights.
+        PyTorch is fastest when a GPU is available, otherwise the exported models listed in the model's info.json
+        are preferred, as long as their runtime is installed. """
+    if not weights_path.endswith(".pt"):
+        return weights_path
+
+    info_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(weights_path))), "info.json")
+    if not os.path.isfile(info_path):
+        return weights_path
+
+    with open(info_path, "r", encoding="utf-8") as file:
+        exported_models = json.load(file).get("exported_models") or {}
+    if not exported_models:
+        return weights_path
+
+    import torch
+    if torch.cuda.is_available():
+        return weights_path
+
+    for export_format, runtime in CPU_BACKEND_PREFERENCE:
+        if export_format not in exported_models or importlib.util.find_spec(runtime) is None:
+            continue
+        export_path = os.path.join(os.path.dirname(info_path), exported_models[export_format])
+        if os.path.exists(export_path):
+            return export_path
+
+    return weights_path
+
+
+class SharedModel:
+    """ A cached model shared by every part of the system. YOLO's predictors are not thread safe, so calling the
+        model holds the model's lock, and analyses from different threads run one after another.
+        Other attributes, such as the class names, are read from the model itself. """
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.RLock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            return self.model(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class ModelCache:
+    """ A thread safe, least recently used cache of loaded models.
+        Models are keyed by the absolute weights path, along with the file's modification time and size,
+        so retraining or replacing the weights automatically causes the new weights to be loaded.
+        Models are returned as a SharedModel, so a model used by several threads only analyses one batch at a
+        time. """
+
+    def __init__(self, max_models=DEFAULT_MAX_MODELS, max_bytes=DEFAULT_MAX_BYTES, loader=_load_yolo):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._models = OrderedDict()  # path -> (fingerprint, SharedModel, size in bytes)
+        self._loading = {}  # path -> lock held while the model is loaded
+
+    @staticmethod
+    def fingerprint(weights_path):
+        """ Returns the values used to detect if the weights on disk have changed.
+            Some exported models (e.g. OpenVINO) are folders, which use their newest file and total size. """
+        if os.path.isdir(weights_path):
+            stat_results = [
+                os.stat(os.path.join(dirpath, filename))
+                for dirpath, _, filenames in os.walk(weights_path) for filename in filenames
+            ]
+            return (max((result.st_mtime_ns for result in stat_results), default=0),
+                    sum(result.st_size for result in stat_results))
+
+        stat_result = os.stat(weights_path)
+        return stat_result.st_mtime_ns, stat_result.st_size
+
+    def get(self, weights_path):
+        """ Returns the loaded model for the provided weights, loading it if it is not cached or has changed. """
+        path = os.path.abspath(weights_path)
+        fingerprint = self.fingerprint(path)
+
+        with self._lock:
+            model = self._cached(path, fingerprint)
+            if model is not None:
+                return model
+            loading_lock = self._loading.setdefault(path, threading.Lock())
+
+        # Each model has its own loading lock, so two threads requesting the same model only load it once,
+        # while other models can still be returned from the cache.
+        with loading_lock:
+            with self._lock:
+                model = self._cached(path, fingerprint)
+                if model is not None:
+                    return model
+
+            try:
+                model = SharedModel(self.loader(path))
+                with self._lock:
+                    self._models[path] = (fingerprint, model, fingerprint[1])
+                    self._models.move_to_end(path)
+                    self._evict()
+                return model
+            finally:
+                # Removed even if loading failed, e.g. for corrupt weights, so the lock is not kept forever.
+                with self._lock:
+                    if self._loading.get(path) is loading_lock:
+                        del self._loading[path]
+
+    def _cached(self, path, fingerprint):
+        """ Returns the cached model, if it was loaded from the current weights. Must be called with the lock held. """
+        cached = self._models.get(path)
+        if cached is None or cached[0] != fingerprint:
+            return None
+        self._models.move_to_end(path)
+        return cached[1]
+
+    def _evict(self):
+        """ Removes the least recently used models until the cache is within its limits.
+            The most recently used model is always kept, even if it is larger than the memory limit. """
+        while len(self._models) > 1 and (len(self._models) > self.max_models or self.total_bytes() > self.max_bytes):
+            self._models.popitem(last=False)
+
+    def total_bytes(self):
+        """ Returns the combined size of the cached weights. """
+        return sum(size for _, _, size in self._models.values())
+
+    def remove(self, weights_path):
+        """ Removes the provided model from the cache, if it is present. """
+        with self._lock:
+            self._models.pop(os.path.abspath(weights_path), None)
+
+    def clear(self):
+        """ Removes all models from the cache. """
+        with self._lock:
+            self._models.clear()
+
+    def __contains__(self, weights_path):
+        return os.path.abspath(weights_path) in self._models
+
+    def __len__(self):
+        return len(self._models)
+
+
+# Shared cache used by the whole process.
+model_cache = ModelCache()
+
+
+def get_model(weights_path, prefer_fastest=True):
+    """ Returns a loaded model for the provided weights from the process wide cache.
+        Unless prefer_fastest is False, the fastest available exported version of the weights is used. """
+    if prefer_fastest:
+        weights_path = fastest_weights_path(weights_path)
+    return model_cache.get(weights_path)
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import numpy as np
+from helpers.atomic_file import atomic_write
+from helpers.result_cache import hash_file
+
+"""
+Prediction_Store saves a trained model's predictions for each dataset image in the model's folder, so the model does
+not have to analyse the same images again when newer models are compared against it.
+Predictions are keyed by the hash of the image's contents, so renamed or moved images are still found.
+If the model's weights change, or the predictions were made with different settings, the stored predictions are
+discarded and filled in again as they are needed.
+The predictions are stored as columns: the image hashes, where each image's boxes start, and every box.
+"""
+
+STORE_FILENAME = "predictions.npz"
+
+
+class PredictionStore:
+    """ The stored predictions of a single model. Predictions are normalised
+        (x1, y1, x2, y2, confidence, class) boxes.
+        The model can be provided if it is already loaded, otherwise it is loaded when it is first needed. """
+
+    def __init__(self, weights_path, settings=None, model=None):
+        self.weights_path = weights_path
+        self.model_folder = os.path.dirname(os.path.dirname(os.path.abspath(weights_path)))
+        self.path = os.path.join(self.model_folder, STORE_FILENAME)
+        self.fingerprint = json.dumps({"weights": hash_file(weights_path), "settings": settings or {}},
+                                      sort_keys=True)
+        self._lock = threading.Lock()
+        self._predictions = {}
+        self._changed = False
+        self._model = model
+        self.load()
+
+    def load(self):
+        """ Loads the stored predictions, unless they were made by different weights or with different settings. """
+        try:
+            with np.load(self.path) as data:
+                if str(data["fingerprint"]) != self.fingerprint:
+                    return
+                offsets = data["offsets"]
+                detections = data["detections"]
+                for index, image_hash in enumerate(data["image_hashes"]):
+                    self._predictions[str(image_hash)] = detections[offsets[index]:offsets[index + 1]]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def get(self, image_hash):
+        """ Returns the stored predictions for the image, or None if there are none. """
+        with self._lock:
+            return self._predictions.get(image_hash)
+
+    def put(self, image_hash, detections):
+        with self._lock:
+            self._predictions[image_hash] = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+            self._changed = True
+
+    def model(self):
+        """ Returns the loaded model, which is only loaded if a prediction is missing. """
+        if self._model is None:
+            from helpers.model_cache import get_model
+            self._model = get_model(self.weights_path)
+        return self._model
+
+    def save(self):
+        """ Saves the predictions to the model's folder, if any have been added. """
+        with self._lock:
+            if not self._changed:
+                return
+            image_hashes = list(self._predictions)
+            counts = [len(self._predictions[image_hash]) for image_hash in image_hashes]
+            offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            detections = (np.concatenate([self._predictions[image_hash] for image_hash in image_hashes])
+                          if image_hashes else np.zeros((0, 6), dtype=np.float32))
+
+            with atomic_write(self.path, "wb") as file:
+                np.savez_compressed(file, fingerprint=self.fingerprint,
+                                    image_hashes=np.asarray(image_hashes, dtype=str), offsets=offsets,
+                                    detections=detections)
+            self._changed = False
+
+    def __len__(self):
+        return len(self._predictions)
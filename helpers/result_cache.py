@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from helpers.disk_cache import DiskCache
+
+"""
+Result_Cache stores the results of previous analyses on disk, so analysing the same image again with the same model
+returns instantly. Results are keyed by the image's contents, the contents of the model's weights and the settings
+used to analyse it, so changing any of them causes the image to be analysed again.
+Only the boxes are stored, as (x1, y1, x2, y2, confidence, class) pixel values, along with the image's size and the
+model's class names, so a cached result can be displayed without loading the model.
+The least recently used results are deleted when the cache is over its size limit (see Disk_Cache).
+"""
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "results")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_MODEL_HASHES = 32
+
+
+def hash_file(path, hasher=None):
+    """ Returns the SHA-256 hash of the provided file's contents. """
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ResultCache(DiskCache):
+    """ A size limited, on disk cache of analysis results. When the cache is full, the least recently used
+        results are deleted. """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(cache_dir, ".npz", max_bytes)
+        # (path, mtime, size) -> hash of the most recently used weights, so weights are only hashed once per change.
+        self._model_hashes = OrderedDict()
+        self._hash_lock = threading.Lock()
+
+    def model_fingerprint(self, weights_path):
+        """ Returns the hash of the model's weights. Exported models that are folders hash every file inside. """
+        weights_path = os.path.abspath(weights_path)
+        if os.path.isdir(weights_path):
+            files = sorted(os.path.join(dirpath, filename)
+                           for dirpath, _, filenames in os.walk(weights_path) for filename in filenames)
+        else:
+            files = [weights_path]
+
+        stat_key = tuple((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in files)
+        with self._hash_lock:
+            if stat_key in self._model_hashes:
+                self._model_hashes.move_to_end(stat_key)
+                return self._model_hashes[stat_key]
+
+        # Hashed outside the lock, so other threads are not held up by large weights.
+        hasher = hashlib.sha256()
+        for path in files:
+            hash_file(path, hasher)
+        model_hash = hasher.hexdigest()
+
+        with self._hash_lock:
+            self._model_hashes[stat_key] = model_hash
+            self._model_hashes.move_to_end(stat_key)
+            while len(self._model_hashes) > MAX_MODEL_HASHES:
+                self._model_hashes.popitem(last=False)
+        return model_hash
+
+    def key(self, image_path, weights_path, params=None):
+        """ Returns the cache key for the image, model and analysis settings. """
+        key_data = json.dumps({
+            "image": hash_file(image_path),
+            "model": self.model_fingerprint(weights_path),
+            "params": params or {}
+        }, sort_keys=True)
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def path_for_key(self, key):
+        """ Returns the file a result with the provided key is stored in. """
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def get(self, key):
+        """ Returns the (detections, image shape, class names) stored for the key, or None if it is not cached. """
+        path = self.path_for_key(key)
+        try:
+            with np.load(path) as data:
+                detections = data["detections"]
+                orig_shape = tuple(int(value) for value in data["orig_shape"])
+                names = {int(class_id): name for class_id, name in json.loads(str(data["names"])).items()}
+        except (OSError, KeyError, ValueError):
+            return None
+
+        self.touch(path)
+        return detections, orig_shape, names
+
+    def put(self, key, detections, orig_shape, names):
+        """ Stores the detections for the key, then removes the least recently used results if the cache is full. """
+        with self.write(self.path_for_key(key)) as file:
+            np.savez(file, detections=np.asarray(detections, dtype=np.float32).reshape(-1, 6),
+                     orig_shape=np.asarray(orig_shape[:2], dtype=np.int64), names=json.dumps(names))
+
+
+# Shared cache used by the whole process.
+result_cache = ResultCache()
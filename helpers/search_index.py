@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+"""
+Search_Index finds the images whose file names contain the search text, without checking every name.
+Each name is split into trigrams (every 3 characters in a row), and only the names containing all of the search's
+trigrams are checked. Shorter searches check every name, which is still fast as they are only typed once.
+When the search text is extended, e.g. while typing, only the previous results are checked.
+Searches can also filter on the catalog's details of each image:
+    boxes:3, boxes:>3, boxes:<3    The number of annotated boxes.
+    defects:yes, defects:no        If the image has any annotated boxes.
+Images without details (e.g. before the catalog has read them) do not match these filters.
+"""
+
+TRIGRAM_LENGTH = 3
+
+
+def _trigrams(text):
+    return {text[index:index + TRIGRAM_LENGTH] for index in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+
+def _box_filter(value):
+    """ Returns a function that checks a box count against a value such as 3, >3 or <3. """
+    comparison = value[0] if value[:1] in (">", "<") else "="
+    count = int(value.lstrip("<>"))
+    if comparison == ">":
+        return lambda boxes: boxes > count
+    if comparison == "<":
+        return lambda boxes: boxes < count
+    return lambda boxes: boxes == count
+
+
+def parse_query(query):
+    """ Splits the query into the text to search for, the filter words, and a list of (key, function) filters on the
+        image details. Words that are not valid filters are searched for as text. """
+    words = []
+    filter_words = []
+    filters = []
+    for word in query.lower().split(" "):
+        key, _, value = word.partition(":")
+        try:
+            if key == "boxes" and value:
+                filters.append(("label_count", _box_filter(value)))
+                filter_words.append(word)
+                continue
+            if key == "defects" and value in ("yes", "no"):
+                filters.append(("label_count", (lambda boxes: boxes > 0) if value == "yes" else
+                                (lambda boxes: boxes == 0)))
+                filter_words.append(word)
+                continue
+        except ValueError:
+            pass
+        words.append(word)
+    return " ".join(words).strip(), filter_words, filters
+
+
+class SearchIndex:
+    """ A search index over image names, and optionally each image's details from the catalog. """
+
+    def __init__(self, names, details=None):
+        self.names = [name.lower() for name in names]
+        self.details = [details.get(name) if details else None for name in names]
+        self.trigrams = defaultdict(list)
+        for index, name in enumerate(self.names):
+            for trigram in _trigrams(name):
+                self.trigrams[trigram].append(index)
+        self._previous = None  # (text, filter words, result) of the last search
+
+    def search(self, query):
+        """ Returns the indexes of the names matching the query, in their original order. """
+        text, filter_words, filters = parse_query(query)
+
+        if self._previous is not None and self._previous[1] == filter_words and self._previous[0] in text:
+            # The search was extended, so only the previous matches can match.
+            candidates = self._previous[2]
+        elif len(text) >= TRIGRAM_LENGTH:
+            postings = sorted((self.trigrams.get(trigram, []) for trigram in _trigrams(text)), key=len)
+            candidates = sorted(set(postings[0]).intersection(*postings[1:]))
+        else:
+            candidates = range(len(self.names))
+
+        result = [index for index in candidates if text in self.names[index] and self._matches(index, filters)]
+        self._previous = (text, filter_words, result)
+        return result
+
+    def _matches(self, index, filters):
+        if not filters:
+            return True
+        details = self.details[index]
+        if details is None:
+            return False
+        return all(details.get(key) is not None and check(details[key]) for key, check in filters)
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from PySide6.QtCore import QBuffer, QIODevice, QObject, QRunnable, QSize, QThreadPool, Qt, Signal
+from PySide6.QtGui import QImage, QImageReader
+from helpers.disk_cache import DiskCache
+
+"""
+Thumbnail_Cache stores small copies of images on disk, so the image grid does not decode every full size X-ray each
+time it is opened. Thumbnails are keyed by the image's path, modification time and size, so a changed image gets a
+new thumbnail. The least recently used thumbnails are deleted when the cache is over its size limit (see Disk_Cache),
+which also removes the thumbnails left behind by changed or deleted images.
+Thumbnails are decoded at a reduced size where the image format supports it, e.g. JPEGs are only partly decoded,
+and are generated on a background thread pool by ThumbnailLoader, which signals when each one is ready.
+"""
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "thumbnails")
+THUMBNAIL_SIZE = 100
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+class ThumbnailCache(DiskCache):
+    """ A size limited, on disk cache of image thumbnails, which fit within a square of the provided size. """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, size=THUMBNAIL_SIZE, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(cache_dir, ".png", max_bytes)
+        self.size = size
+
+    def key(self, image_path):
+        """ Returns the cache key for the image, which changes whenever the image is modified. """
+        stat_result = os.stat(image_path)
+        key_data = f"{os.path.abspath(image_path)}|{stat_result.st_mtime_ns}|{stat_result.st_size}|{self.size}"
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def path_for_key(self, key):
+        """ Returns the file a thumbnail with the provided key is stored in. """
+        return os.path.join(self.cache_dir, key[:2], key + ".png")
+
+    def get(self, image_path):
+        """ Returns the image's thumbnail, generating and storing it if it is not cached.
+            A null QImage is returned if the image cannot be read. """
+        try:
+            path = self.path_for_key(self.key(image_path))
+        except OSError:
+            return QImage()
+
+        thumbnail = QImage(path) if os.path.exists(path) else QImage()
+        if thumbnail.isNull():
+            thumbnail = self.generate(image_path)
+            if not thumbnail.isNull():
+                self.store(path, thumbnail)
+            return thumbnail
+
+        self.touch(path)
+        return thumbnail
+
+    def generate(self, image_path):
+        """ Reads the image at thumbnail size. """
+        reader = QImageReader(image_path)
+        reader.setAutoTransform(True)
+        full_size = reader.size()
+        if full_size.isValid():
+            # Asking the reader for the reduced size lets formats such as JPEG skip most of the decoding.
+            reader.setScaledSize(full_size.scaled(QSize(self.size, self.size), Qt.KeepAspectRatio))
+            return reader.read()
+
+        # The reader does not know the image's size until it has been read, so it is scaled afterwards.
+        image = reader.read()
+        if image.isNull():
+            return image
+        return image.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    def store(self, path, thumbnail):
+        """ Saves the thumbnail, then removes the least recently used thumbnails if the cache is full.
+            Failing to store it is ignored, as it is generated again next time. """
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        if not thumbnail.save(buffer, "PNG"):
+            return
+        try:
+            with self.write(path) as file:
+                file.write(bytes(buffer.data()))
+        except OSError:
+            pass
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, loader, image_path):
+        super().__init__()
+        self.loader = loader
+        self.image_path = image_path
+
+    def run(self):
+        self.loader._finished(self.image_path, self.loader.cache.get(self.image_path))
+
+
+class ThumbnailLoader(QObject):
+    """ Loads thumbnails from the cache on a background thread pool. thumbnail_ready is emitted with the image path
+        and its thumbnail, which is a null QImage if the image could not be read. """
+    thumbnail_ready = Signal(str, QImage)
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or ThumbnailCache()
+        self.thread_pool = QThreadPool(self)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def request(self, image_path):
+        """ Starts loading the image's thumbnail, unless it is already being loaded. """
+        with self._lock:
+            if image_path in self._pending:
+                return
+            self._pending.add(image_path)
+        self.thread_pool.start(_ThumbnailTask(self, image_path))
+
+    def cancel(self):
+        """ Drops the requests which have not started, e.g. when the images shown change. """
+        self.thread_pool.clear()
+        with self._lock:
+            self._pending.clear()
+
+    def wait(self):
+        """ Waits for the started requests to finish. """
+        self.thread_pool.waitForDone()
+
+    def _finished(self, image_path, thumbnail):
+        with self._lock:
+            self._pending.discard(image_path)
+        self.thumbnail_ready.emit(image_path, thumbnail)
@@ -0,0 +1,113 @@
+import numpy as np
+from helpers import inference
+
+"""
+Tiled_Inference analyses very large X-ray images by cutting them into overlapping tiles at their native resolution.
+Without tiling, YOLO downsamples the whole radiograph to its input size, and small flaws such as voids are lost.
+Each tile is analysed separately, the boxes are moved back into the coordinates of the full image, and any duplicate
+boxes found on the seams between tiles are merged using non maximum suppression.
+"""
+
+DEFAULT_TILE_SIZE = 640
+DEFAULT_OVERLAP = 0.2
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MERGE_THRESHOLD = 0.5
+
+
+def detection_settings(tile_settings):
+    """ Returns the tile settings which change the boxes found, e.g. to key cached results by.
+        The batch size only changes how many tiles are analysed at once, so it is left out. """
+    if tile_settings is None:
+        return None
+    return {
+        "tile_size": tile_settings.get("tile_size", DEFAULT_TILE_SIZE),
+        "overlap": tile_settings.get("overlap", DEFAULT_OVERLAP),
+        "merge_threshold": tile_settings.get("merge_threshold", DEFAULT_MERGE_THRESHOLD)
+    }
+
+
+def tile_starts(length, tile_size, overlap):
+    """ Returns the start positions of tiles along one axis. The final tile is aligned to the end of the axis,
+        so the whole image is covered without tiles extending past its edge. """
+    if length <= tile_size:
+        return [0]
+
+    stride = max(1, int(tile_size * (1 - overlap)))
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def generate_tiles(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """ Returns the (x1, y1, x2, y2) pixel coordinates of every tile needed to cover the image. """
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in tile_starts(height, tile_size, overlap)
+        for x in tile_starts(width, tile_size, overlap)
+    ]
+
+
+def non_max_suppression(boxes, scores, threshold=DEFAULT_MERGE_THRESHOLD, metric="ios"):
+    """ Returns the indexes of the boxes to keep, highest score first.
+        Boxes are (x1, y1, x2, y2). The overlap metric can be "iou" (intersection over union) or "ios"
+        (intersection over the smaller box). IoS is used by default, as a flaw cut in half by a tile seam produces
+        a small partial box inside the full box, which has a low IoU but a high IoS. """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-scores, kind="stable")
+
+    keep = []
+    while order.size > 0:
+        best = order[0]
+        keep.append(int(best))
+        rest = order[1:]
+
+        inter_top_left = np.maximum(boxes[best, :2], boxes[rest, :2])
+        inter_bottom_right = np.minimum(boxes[best, 2:], boxes[rest, 2:])
+        inter_area = np.prod(np.clip(inter_bottom_right - inter_top_left, 0, None), axis=1)
+
+        if metric == "ios":
+            denominator = np.minimum(areas[best], areas[rest])
+        else:
+            denominator = areas[best] + areas[rest] - inter_area
+
+        overlap = np.divide(inter_area, denominator, out=np.zeros_like(inter_area), where=denominator > 0)
+        order = rest[overlap < threshold]
+
+    return keep
+
+
+def merge_detections(detections, threshold=DEFAULT_MERGE_THRESHOLD, metric="ios"):
+    """ Merges duplicate (x1, y1, x2, y2, confidence, class) detections. Only boxes of the same class are merged. """
+    detections = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+    if len(detections) == 0:
+        return detections
+
+    # Offsetting each class by more than the image size stops boxes of different classes overlapping.
+    class_offset = detections[:, 5:6] * (detections[:, :4].max() + 1)
+    keep = non_max_suppression(detections[:, :4] + class_offset, detections[:, 4], threshold, metric)
+    return detections[keep]
+
+
+def tiled_predict(model, image, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP,
+                  batch_size=DEFAULT_BATCH_SIZE, merge_threshold=DEFAULT_MERGE_THRESHOLD, path=""):
+    """ Analyses the provided image (a decoded BGR array) tile by tile, batch_size tiles at a time.
+        Returns a single result for the whole image, in the same format as calling the model directly. """
+    height, width = image.shape[:2]
+    tiles = generate_tiles(width, height, tile_size, overlap)
+
+    detections = []
+    for batch in inference.batch_items(tiles, batch_size):
+        crops = [np.ascontiguousarray(image[y1:y2, x1:x2]) for x1, y1, x2, y2 in batch]
+        results = model(crops, imgsz=tile_size, verbose=False)
+
+        for (x1, y1, _, _), result in zip(batch, results):
+            boxes = inference.result_detections(result)
+            boxes[:, [0, 2]] += x1
+            boxes[:, [1, 3]] += y1
+            detections.append(boxes)
+
+    detections = np.concatenate(detections) if detections else np.zeros((0, 6), dtype=np.float32)
+    merged = merge_detections(detections, merge_threshold)
+    return inference.build_result(image, path, model.names, merged)
@@ -0,0 +1,187 @@
+import csv
+import json
+import os
+import threading
+import time
+from helpers import inference
+from helpers.atomic_file import atomic_write
+from helpers.inference_pipeline import InferencePipeline, decode_image
+
+"""
+Watch_Folder inspects images as they are saved into a folder, e.g. by the X-Ray machine.
+The folder is checked regularly for new images. An image is only analysed once it has stopped changing, so files that
+are still being written are not read. Images already in the folder when watching starts, and images that arrive later,
+are analysed through the same batched pipeline using a model that stays loaded.
+For each image, its verdict is written as JSON, an annotated copy is saved and a row is added to verdicts.csv.
+"""
+
+DEFAULT_SETTLE_SECONDS = 1.0
+DEFAULT_POLL_INTERVAL = 0.5
+MAX_READ_ATTEMPTS = 3
+VERDICTS_CSV = "verdicts.csv"
+
+
+class FolderWatcher:
+    """ Finds images in a folder that are ready to be analysed.
+        An image is ready once its size and modification time have not changed for settle_seconds. """
+
+    def __init__(self, input_dir, settle_seconds=DEFAULT_SETTLE_SECONDS):
+        self.input_dir = input_dir
+        self.settle_seconds = settle_seconds
+        self.handled = set()  # Images that have been returned as ready, and should be ignored from now on
+        self._observed = {}  # path -> (size, modification time, time the size or modification time last changed)
+
+    def poll(self):
+        """ Returns the images that have become ready since the last poll, in the order they were modified. """
+        now = time.time()
+        ready = []
+        seen = set()
+
+        for entry in os.scandir(self.input_dir):
+            if not entry.is_file() or not entry.name.endswith(inference.IMAGE_EXTENSIONS) or entry.path in self.handled:
+                continue
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue  # Deleted or moved since the folder was listed
+
+            seen.add(entry.path)
+            signature = (stat_result.st_size, stat_result.st_mtime)
+            previous = self._observed.get(entry.path)
+            if previous is None or previous[:2] != signature:
+                # New or still being written. Images that have not been modified recently are already complete.
+                changed_at = min(now, stat_result.st_mtime) if previous is None else now
+                self._observed[entry.path] = (*signature, changed_at)
+                previous = self._observed[entry.path]
+
+            if stat_result.st_size > 0 and now - previous[2] >= self.settle_seconds:
+                ready.append((stat_result.st_mtime, entry.path))
+
+        # Forgets images that were removed before they were ready.
+        for path in list(self._observed):
+            if path not in seen:
+                del self._observed[path]
+
+        ready.sort()
+        for _, path in ready:
+            self.handled.add(path)
+            del self._observed[path]
+        return [path for _, path in ready]
+
+    def retry(self, path):
+        """ Allows an image to be returned as ready again, e.g. if it could not be read. """
+        self.handled.discard(path)
+
+
+class WatchFolderInspector:
+    """ Analyses every image saved into the input folder, writing the verdicts and annotated images to the
+        output folder. Images with a verdict in the output folder have already been inspected and are skipped. """
+
+    def __init__(self, model, input_dir, output_dir, batch_size=8, tile_settings=None,
+                 settle_seconds=DEFAULT_SETTLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL, workers=None):
+        self.model = model
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.tile_settings = tile_settings
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.watcher = FolderWatcher(input_dir, settle_seconds)
+        self._read_attempts = {}
+        self._stop_event = threading.Event()
+
+        os.makedirs(output_dir, exist_ok=True)
+        for filename in os.listdir(input_dir):
+            if os.path.exists(self.verdict_path(filename)):
+                self.watcher.handled.add(os.path.join(input_dir, filename))
+
+    def verdict_path(self, image_name):
+        return os.path.join(self.output_dir, image_name + ".json")
+
+    def overlay_path(self, image_name):
+        name, extension = os.path.splitext(image_name)
+        return os.path.join(self.output_dir, f"{name}_overlay{extension}")
+
+    def run(self, on_inspected=None):
+        """ Inspects images until stop is called. on_inspected is called with each image's verdict summary. """
+        while not self._stop_event.is_set():
+            inspected = self.inspect_ready_images()
+            if on_inspected is not None:
+                for summary in inspected:
+                    on_inspected(summary)
+            if not inspected:
+                self._stop_event.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def inspect_ready_images(self):
+        """ Analyses the images that are ready, and returns their verdict summaries. """
+        image_paths = self.watcher.poll()
+        if not image_paths:
+            return []
+
+        def load(image_path):
+            # Images that cannot be read yet are retried on a later poll, instead of stopping the batch.
+            try:
+                return decode_image(image_path)
+            except ValueError:
+                return None
+
+        pipeline = InferencePipeline(load, self.predict, self.batch_size, workers=self.workers)
+        summaries = []
+        for image_path, result in pipeline.run(image_paths):
+            if result is None:
+                self.handle_unreadable(image_path)
+                continue
+
+            result.path = image_path
+            summaries.append(self.write_outputs(image_path, result))
+
+        return summaries
+
+    def predict(self, images):
+        """ Analyses the decoded images, returning None for any image that could not be read. """
+        readable = [image for image in images if image is not None]
+        if self.tile_settings is not None:
+            from helpers.tiled_inference import tiled_predict
+            results = iter([tiled_predict(self.model, image, **self.tile_settings) for image in readable])
+        else:
+            results = iter(self.model(readable, verbose=False) if readable else [])
+        return [next(results) if image is not None else None for image in images]
+
+    def handle_unreadable(self, image_path):
+        """ Retries an image that could not be read, as it may still have been being written.
+            After several attempts, an error is written in place of its verdict. """
+        attempts = self._read_attempts.get(image_path, 0) + 1
+        self._read_attempts[image_path] = attempts
+        if attempts < MAX_READ_ATTEMPTS:
+            self.watcher.retry(image_path)
+            return
+
+        del self._read_attempts[image_path]
+        with open(self.verdict_path(os.path.basename(image_path)), "w", encoding="utf-8") as file:
+            json.dump({"image": os.path.basename(image_path), "error": "Unable to read image"}, file, indent=4)
+
+    def write_outputs(self, image_path, result):
+        """ Writes the verdict JSON and annotated image, and adds the verdict to verdicts.csv. """
+        import cv2
+
+        image_name = os.path.basename(image_path)
+        details = inference.result_to_dict(image_name, result)
+
+        cv2.imwrite(self.overlay_path(image_name), result.plot())
+
+        csv_path = os.path.join(self.output_dir, VERDICTS_CSV)
+        write_header = not os.path.exists(csv_path)
+        with open(csv_path, "a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=inference.SUMMARY_FIELDS, extrasaction="ignore")
+            if write_header:
+                writer.writeheader()
+            writer.writerow(details)
+
+        # The verdict is written last, as its existence marks the image as inspected.
+        with atomic_write(self.verdict_path(image_name), encoding="utf-8") as file:
+            json.dump(details, file, indent=4)
+
+        return inference.summarise_result(image_name, result)
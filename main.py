@@ -54,6 +54,12 @@ class MainWindow(QMainWindow):
         self.training_data_tab.set_column_count(new_columns)
         return super().resizeEvent(event)
 
+    def closeEvent(self, event):
+        """Stops any folder analysis and closes the training data catalog when the window is closed."""
+        self.analyse_image_tab.stop_folder_analysis()
+        self.training_data_tab.close_catalog()
+        return super().closeEvent(event)
+
     def apply_styles(self):
         """Load QSS stylesheet and apply it to the app."""
         style_path = os.path.join("helpers", "style.qss")
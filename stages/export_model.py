@@ -0,0 +1,52 @@
+import importlib.util
+import os
+
+"""
+Export_Model converts the trained PyTorch weights into formats with faster CPU runtimes.
+The inspection computers do not have a GPU, where ONNX Runtime and OpenVINO are considerably faster than PyTorch.
+Exported models are saved next to weights/best.pt and recorded in the model's info.json.
+"""
+
+# Export formats that are optional, as their runtime may not be installed.
+OPTIONAL_EXPORT_FORMATS = {
+    "openvino": "openvino"
+}
+
+
+def is_runtime_available(module_name):
+    """ Checks if the provided runtime is installed, without importing it. """
+    return importlib.util.find_spec(module_name) is not None
+
+
+def export_model(model_info, img_size=640):
+    """
+    Exports the model's best weights to ONNX, and OpenVINO if it is installed.
+    The model info's exported models are updated with each successful export. A failed export does not stop the
+    others, as the PyTorch weights can always be used instead.
+
+    Args:
+        model_info (ModelInfo): The trained model to export.
+        img_size (int): Image size the model was trained with.
+
+    :return: The formats that were exported
+    :rtype: list
+    """
+    from ultralytics import YOLO
+
+    formats = ["onnx"]
+    formats.extend(export_format for export_format, module_name in OPTIONAL_EXPORT_FORMATS.items()
+                   if is_runtime_available(module_name))
+
+    exported = []
+    for export_format in formats:
+        try:
+            print(f"Exporting model to {export_format.upper()}...")
+            # Dynamic input shapes allow batches of any size and tiles of any size to be analysed.
+            export_path = YOLO(model_info.get_best_pt_path()).export(format=export_format, imgsz=int(img_size),
+                                                                     dynamic=True)
+            model_info.exported_models[export_format] = os.path.relpath(export_path, model_info.path)
+            exported.append(export_format)
+        except Exception as e:
+            print(f"Failed to export model to {export_format.upper()}: {e}")
+
+    return exported
@@ -8,10 +8,12 @@ import time
 from PySide6.QtCore import Signal, QThread
 import sys
 import torch
-from helpers import file_helpers
+from helpers.catalog import Catalog
+from helpers.dataset_sync import DatasetSync
 from helpers.console_output import CaptureConsoleOutputThread
 import stages.model_training
 from data_classes.model_info import ModelInfo
+from stages.quantize_model import QuantizeModelStage
 from stages.test_model import TestModelStage
 
 
@@ -39,6 +41,7 @@ class MainTrainPipeline(QThread):
         self.train_labels_dir = os.path.join(self.data_dir, "labels")
 
         stored_training_images_dir = os.path.abspath("stored_training_images")
+        self.stored_training_images_dir = stored_training_images_dir
         self.dataset_config_dir = os.path.join(stored_training_images_dir, "datasets")
         self.image_dir = os.path.join(stored_training_images_dir, "images", "raw")
         self.annotation_dir = os.path.join(stored_training_images_dir, "labels", "raw")
@@ -73,32 +76,36 @@ class MainTrainPipeline(QThread):
         if result and self._is_running:
             self.test_model(result)
 
+        if result and self._is_running and self.model_info.quantize:
+            self.quantize_model(result)
+
         self.pipeline_finished.emit()
 
     def prepare_data(self):
         """Augments the data to improve the performance of the model training."""
-        self.data_augmentation_text.emit("Resetting Data...")
-        file_helpers.reset_training_data(self.train_data_dir, self.train_labels_dir)
-        self.data_augmentation_progress_bar.emit(10)
-
         self.data_augmentation_text.emit("Loading Data...")
-        all_img_path = [f for f in os.listdir(self.image_dir) if f.endswith(('.jpg', '.png', '.PNG', '.JPG'))]
-        self.data_augmentation_progress_bar.emit(20)
-
-        if (self.model_info.dataset_config != "All Images"):
-            self.data_augmentation_text.emit("Config Found, Loading...")
-            config_path = os.path.join(self.dataset_config_dir, self.model_info.dataset_config + ".txt")
-            selected_files = file_helpers.read_config_file(config_path)
-            filtered_img_list = [
-                img for img in all_img_path
-                if any(img.lower() in filename.lower()
-                       for filename in selected_files)
-            ]
-            all_img_path = filtered_img_list
+        # The catalog is opened here, as each thread needs its own connection.
+        with Catalog(self.stored_training_images_dir) as catalog:
+            catalog.refresh()
+            self.data_augmentation_progress_bar.emit(20)
+
+            if (self.model_info.dataset_config != "All Images"):
+                self.data_augmentation_text.emit("Config Found, Loading...")
+                all_img_path = catalog.config_image_names(self.model_info.dataset_config)
+            else:
+                all_img_path = catalog.image_names()
+
+            self.data_augmentation_text.emit("Updating Image Catalog...")
+            catalog.update_details()
+            image_hashes = catalog.image_hashes()
 
         self.data_augmentation_progress_bar.emit(80)
         self.data_augmentation_text.emit("Initialising Training Values...")
-        file_helpers.load_training_images(all_img_path, self.image_dir, self.annotation_dir, self.data_dir)
+        # Only images that changed since the last training run are updated.
+        counts = DatasetSync(self.image_dir, self.annotation_dir, self.data_dir).sync(
+            all_img_path, reshuffle=self.model_info.reshuffle_dataset, known_hashes=image_hashes)
+        self.data_augmentation_text.emit(f"Added {counts['added']}, updated {counts['replaced']}, removed "
+                                         f"{counts['removed']} and kept {counts['unchanged']} images.")
 
         self.data_augmentation_progress_bar.emit(100)
         self.data_augmentation_text.emit("Data Loaded!")
@@ -183,6 +190,15 @@ class MainTrainPipeline(QThread):
         self.testing_thread.run()
         self.testing_thread.wait()
 
+    def quantize_model(self, model_info_dir):
+        """Creates an INT8 version of the model, which is kept if its accuracy is within the tolerance."""
+        model_info = ModelInfo.fromPath(os.path.join(model_info_dir, "info.json"))
+        data_yaml = os.path.abspath(os.path.join("data", "dataset_yaml", "dataset.yaml"))
+
+        self.quantization_thread = QuantizeModelStage(model_info, self.train_data_dir, data_yaml)
+        self.quantization_thread.model_quantization_text_signal.connect(self.model_testing_text)
+        self.quantization_thread.run()
+
     def cleanup(self):
         if hasattr(self, 'console_thread'):
             self.console_thread.stop()
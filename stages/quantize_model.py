@@ -0,0 +1,161 @@
+import os
+import random
+import shutil
+import tempfile
+from PySide6.QtCore import Signal, QThread
+from data_classes.model_info import ModelInfo
+from helpers import file_helpers
+from helpers.inference import IMAGE_EXTENSIONS
+from stages.export_model import export_model
+
+
+class CalibrationDataReader:
+    """ Provides preprocessed validation images to ONNX Runtime, to calibrate the ranges of the quantized values.
+        Images are decoded one at a time as they are requested, so memory use does not depend on the sample size. """
+
+    def __init__(self, image_paths, input_name, img_size=640):
+        self.image_paths = iter(image_paths)
+        self.input_name = input_name
+        self.img_size = img_size
+
+    def get_next(self):
+        """ Returns the next calibration input, or None when every image has been used. """
+        import cv2
+        import numpy as np
+        from ultralytics.data.augment import LetterBox
+
+        for image_path in self.image_paths:
+            image = cv2.imread(image_path)
+            if image is None:
+                continue
+
+            # The same preprocessing YOLO uses: letterbox, BGR to RGB, HWC to CHW and scale to 0-1.
+            image = LetterBox((self.img_size, self.img_size), auto=False)(image=image)
+            image = image[..., ::-1].transpose(2, 0, 1)
+            image = np.ascontiguousarray(image, dtype=np.float32)[None] / 255.0
+            return {self.input_name: image}
+
+        return None
+
+    def rewind(self):
+        pass
+
+
+def keep_or_discard_quantized_model(model_info, int8_path, original, quantized):
+    """ Keeps the INT8 model if its mAP50 dropped by less than the model's quantization tolerance, otherwise deletes
+        it. The metrics of both models are saved to the model information. Returns the result to display. """
+    tolerance = float(model_info.quantization_tolerance)
+    accuracy_drop = original["mAP_50"] - quantized["mAP_50"]
+    kept = accuracy_drop < tolerance
+
+    if kept:
+        model_info.exported_models["onnx_int8"] = os.path.relpath(int8_path, model_info.path)
+        result_string = (f"INT8 model kept. mAP50 {quantized['mAP_50']:.4f} "
+                         f"(original {original['mAP_50']:.4f}), {quantized['latency_ms']:.1f}ms per image "
+                         f"(original {original['latency_ms']:.1f}ms).")
+    else:
+        file_helpers.delete_file(int8_path)
+        model_info.exported_models.pop("onnx_int8", None)
+        result_string = (f"INT8 model discarded. mAP50 dropped by {accuracy_drop:.4f}, "
+                         f"more than the tolerance of {tolerance}.")
+
+    model_info.quantization_metrics = {
+        "original": original,
+        "int8": quantized,
+        "tolerance": tolerance,
+        "kept": kept
+    }
+    return result_string
+
+
+class QuantizeModelStage(QThread):
+    model_quantization_text_signal = Signal(str)
+
+    def __init__(self, model_info: ModelInfo, path_to_images, data_yaml, calibration_image_count=64, img_size=640):
+        """ Creates an INT8 version of the model and keeps it only if its accuracy is close enough to the original.
+            The original and quantized models are both evaluated on the validation images, and their latency and
+            accuracy are saved to the model information. """
+        super().__init__()
+        self.model_info = model_info
+        self.path_to_val_images = os.path.join(path_to_images, "val")
+        self.data_yaml = data_yaml
+        self.calibration_image_count = calibration_image_count
+        self.img_size = img_size
+
+    def run(self):
+        try:
+            self.quantize()
+        except Exception as e:
+            self.model_info.quantization_result = f"Quantization failed: {e}"
+            self.model_quantization_text_signal.emit(f"Quantization - Failed: {e}")
+
+        self.model_info.save_to_json()
+
+    def quantize(self):
+        """ Quantizes the ONNX model, then compares it to the original and decides whether to keep it. """
+        onnx_path = self.model_info.get_exported_model_path("onnx")
+        if onnx_path == "" or not os.path.exists(onnx_path):
+            self.model_quantization_text_signal.emit("Quantization - Exporting model to ONNX...")
+            export_model(self.model_info, self.img_size)
+            onnx_path = self.model_info.get_exported_model_path("onnx")
+            if onnx_path == "":
+                raise RuntimeError("The model could not be exported to ONNX.")
+
+        calibration_images = self.select_calibration_images()
+        if not calibration_images:
+            raise RuntimeError("No validation images available for calibration.")
+
+        self.model_quantization_text_signal.emit(f"Quantization - Calibrating on {len(calibration_images)} "
+                                                 "validation images...")
+        int8_path = os.path.splitext(onnx_path)[0] + "_int8.onnx"
+        self.quantize_onnx(onnx_path, int8_path, calibration_images)
+
+        self.model_quantization_text_signal.emit("Quantization - Evaluating original model...")
+        original = self.evaluate(onnx_path)
+        self.model_quantization_text_signal.emit("Quantization - Evaluating quantized model...")
+        quantized = self.evaluate(int8_path)
+
+        result_string = keep_or_discard_quantized_model(self.model_info, int8_path, original, quantized)
+        self.model_info.quantization_result = result_string
+        self.model_quantization_text_signal.emit(f"Quantization Finished, FINAL RESULT - {result_string}")
+
+    def quantize_onnx(self, onnx_path, int8_path, calibration_images):
+        """ Saves an INT8 version of the ONNX model, calibrated on the provided images. """
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+        import onnxruntime
+
+        input_name = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        quantize_static(onnx_path, int8_path,
+                        CalibrationDataReader(calibration_images, input_name, self.img_size),
+                        quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8,
+                        per_channel=True)
+
+    def select_calibration_images(self):
+        """ Selects a random sample of the validation images to calibrate the quantized model with. """
+        val_images = [
+            os.path.join(self.path_to_val_images, f)
+            for f in os.listdir(self.path_to_val_images)
+            if f.endswith(IMAGE_EXTENSIONS)
+        ]
+        return random.sample(val_images, min(self.calibration_image_count, len(val_images)))
+
+    def evaluate(self, weights_path):
+        """ Evaluates the provided weights on the validation set, on the CPU.
+            Returns the mAP50, mAP50-95 and the average inference time per image in milliseconds. """
+        from ultralytics import YOLO
+
+        output_dir = tempfile.mkdtemp()
+        try:
+            metrics = YOLO(weights_path, task="detect").val(data=self.data_yaml, imgsz=self.img_size, batch=1,
+                                                            device="cpu", plots=False, verbose=False,
+                                                            project=output_dir)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        return {
+            "mAP_50": float(metrics.box.map50),
+            "mAP_50_95": float(metrics.box.map),
+            "latency_ms": float(metrics.speed["inference"])
+        }
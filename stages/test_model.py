@@ -1,21 +1,36 @@
 import os
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PySide6.QtCore import Signal, QThread
-import cv2
-import numpy as np
-from ultralytics import YOLO
-from helpers import file_helpers
+from helpers import box_matching, evaluation, file_helpers, fuzzing, inference, metamorphic
+from helpers.fuzzing import FuzzingHarness
+from helpers.image_cache import ImageCache
+from helpers.inference_pipeline import InferencePipeline
+from helpers.model_cache import get_model
+from helpers.prediction_store import PredictionStore
 from data_classes.model_info import ModelInfo
 
+# Share of the progress bar for each test suite, based on how long each suite usually takes.
+SUITE_PROGRESS_WEIGHTS = {"metamorphic": 30, "differential": 40, "fuzzing": 30}
+
 
 class TestModelStage(QThread):
     model_testing_text_signal = Signal(str)
     model_testing_progress_bar_signal = Signal(int)
 
-    def __init__(self, model_info: ModelInfo, path_to_images, path_to_labels, path_to_all_images, path_to_models):
-        """Tests the model and creates statistics for comparison."""
+    def __init__(self, model_info: ModelInfo, path_to_images, path_to_labels, path_to_all_images, path_to_models,
+                 comparison_model_count=3, metamorphic_transforms=metamorphic.DEFAULT_TRANSFORMS,
+                 fuzzing_mutations=fuzzing.DEFAULT_MUTATIONS):
+        """Tests the model and creates statistics for comparison.
+        The model is compared with up to comparison_model_count older models, using their stored predictions.
+        The metamorphic test checks the same boxes are found after each of the named transforms, and the fuzzing test
+        analyses the test images after each of the named mutations."""
         super().__init__()
         self.model_info = model_info
+        self.comparison_model_count = comparison_model_count
+        self.metamorphic_transforms = list(metamorphic_transforms)
+        self.fuzzing_mutations = list(fuzzing_mutations)
         self.path_to_images = path_to_images
         self.path_to_labels = path_to_labels
         self.path_to_models = path_to_models
@@ -35,208 +50,258 @@ class TestModelStage(QThread):
         self.selected_test_images.extend(self.selected_val_images)
         self.selected_test_images.extend(self.selected_all_images)
 
-        self.selected_test_annotation = []
-        for img in self.selected_test_images:
-            self.selected_test_annotation.append(file_helpers.get_annotation_for_image(img, self.path_to_labels))
-
     def run(self):
+        # The models are loaded once and shared by every test.
+        self.model = get_model(self.model_info.get_best_pt_path())
+        self.previous_model_path = self.find_previous_model()
+        self.comparison_model_paths = self.find_comparison_models()
+        # Every suite takes its images and annotations from the same cache, so each file is only read once.
+        self.image_cache = ImageCache()
+
+        # The test suites are independent, so they run at the same time. Images are prepared and fuzzing runs in
+        # parallel, while the lock ensures only one suite uses the loaded models at a time.
+        self.model_lock = threading.Lock()
+        self.progress_lock = threading.Lock()
+        self.suite_progress = {suite: 0.0 for suite in SUITE_PROGRESS_WEIGHTS}
+
+        # The suite run, the name it is shown with, and the model information field its result is saved to.
+        suites = {
+            "metamorphic": (self.run_metamorphic_suite, "Metamorphic", "metamorphic_test_result"),
+            "differential": (self.run_differential_suite, "Differential", "differential_test_result"),
+            "fuzzing": (self.fuzzing_tests, "Fuzzing", "fuzzing_test_result")
+        }
+        with ThreadPoolExecutor(max_workers=len(SUITE_PROGRESS_WEIGHTS)) as executor:
+            futures = {suite: executor.submit(run) for suite, (run, _, _) in suites.items()}
+
+            # A suite that fails has the error saved as its result, without losing the other suites' results.
+            for suite, future in futures.items():
+                error = future.exception()
+                if error is None:
+                    continue
+                _, display_name, result_field = suites[suite]
+                result_string = f"Failed: {type(error).__name__}: {error}"
+                setattr(self.model_info, result_field, result_string)
+                self.model_testing_text_signal.emit(f"{display_name} Testing Finished, FINAL RESULT - {result_string}")
+                self.update_progress(suite, 1.0)
+
+        self.image_cache.clear()
+        self.model_testing_progress_bar_signal.emit(100)
+        self.model_info.save_to_json()
+
+    def run_metamorphic_suite(self):
+        self.predictions = self.analyse_test_images()
         self.metamorphic_tests()
+
+    def run_differential_suite(self):
+        self.evaluate_validation_set()
         self.differential_tests()
-        self.fuzzing_tests()
 
-        self.model_info.save_to_json()
+    def update_progress(self, suite, fraction):
+        """ Records the progress of one suite, and emits the combined progress of every suite. """
+        with self.progress_lock:
+            self.suite_progress[suite] = fraction
+            total = sum(SUITE_PROGRESS_WEIGHTS[name] * progress for name, progress in self.suite_progress.items())
+            self.model_testing_progress_bar_signal.emit(int(total))
+
+    def find_previous_model(self):
+        """ Returns the weights of the model to compare against, or an empty string if there is none. """
+        previous_model_path = self.model_info.starting_model
+        if previous_model_path == "":
+            previous_model_path = file_helpers.get_model_for_comparison(self.path_to_models)
+        return previous_model_path
+
+    def find_comparison_models(self):
+        """ Returns the weights of the previous model, followed by older models up to the comparison count. """
+        if self.previous_model_path == "":
+            return []
+
+        comparison_model_paths = [self.previous_model_path]
+        current_model_path = os.path.abspath(self.model_info.get_best_pt_path())
+        for path in file_helpers.get_models_for_comparison(self.path_to_models, self.comparison_model_count):
+            if len(comparison_model_paths) >= self.comparison_model_count:
+                break
+            if os.path.abspath(path) != current_model_path and path not in comparison_model_paths:
+                comparison_model_paths.append(path)
+        return comparison_model_paths
+
+    def analyse_test_images(self, batch_size=4):
+        """ Analyses each test image and its metamorphic variants with the new model.
+            Images are prepared in the background while the previous batch is analysed.
+            Returns one dictionary of predicted boxes per test image.
+            Boxes found in the variants are mapped back to their position in the original image. """
+        total = len(self.selected_test_images)
+        predictions = []
+
+        def load(file):
+            image = self.image_cache.image(file)
+            return [image] + metamorphic.create_variants(image, self.metamorphic_transforms)
+
+        def predict(prepared):
+            # Each image and all of its variants are analysed in the same batch.
+            images = [image for variants in prepared for image in variants]
+            with self.model_lock:
+                results = iter(self.model(images, verbose=False))
+
+            batch_predictions = []
+            for _ in prepared:
+                prediction = {"original": self.result_boxes(next(results)), "variants": {}}
+                for transform_name in self.metamorphic_transforms:
+                    prediction["variants"][transform_name] = metamorphic.boxes_to_original(
+                        transform_name, self.result_boxes(next(results)))
+                batch_predictions.append(prediction)
+            return batch_predictions
+
+        pipeline = InferencePipeline(load, predict, batch_size)
+        for _, prediction in pipeline.run(self.selected_test_images):
+            predictions.append(prediction)
+            self.model_testing_text_signal.emit(f"Model Testing - Analysed {len(predictions)}/{total} images.")
+            self.update_progress("metamorphic", len(predictions) / total * 0.95)
+
+        return predictions
+
+    def evaluate_validation_set(self):
+        """ Evaluates the new model, and the models it is compared with, on every validation image.
+            Each model's predictions are stored in its folder, so older models only analyse images they have not
+            seen before. The new model's precision, recall and mAP are saved to the model information, along with
+            a CSV of statistics for each image. """
+        val_images = inference.list_images(self.path_to_val_images)
+        settings = {"confidence": evaluation.EVALUATION_CONFIDENCE}
+        models = [PredictionStore(self.model_info.get_best_pt_path(), settings, self.model)]
+        models.extend(PredictionStore(path, settings) for path in self.comparison_model_paths)
+
+        def progress(evaluated):
+            self.model_testing_text_signal.emit(f"Evaluation - Evaluated {evaluated}/{len(val_images)} "
+                                                "validation images.")
+            self.update_progress("differential", evaluated / len(val_images) * 0.95)
+
+        per_image_csv_path = os.path.join(self.model_info.path, "evaluation_per_image.csv")
+        summaries = evaluation.evaluate_models(models, val_images, self.path_to_labels,
+                                               per_image_csv_paths=[per_image_csv_path],
+                                               progress_callback=progress, model_lock=self.model_lock,
+                                               image_cache=self.image_cache)
+
+        self.evaluation = summaries[0]
+        self.comparison_evaluations = summaries[1:]
+
+        result_string = (f"Precision {self.evaluation['precision']}, Recall {self.evaluation['recall']}, "
+                         f"mAP50 {self.evaluation['mAP_50']}, mAP50-95 {self.evaluation['mAP_50_95']} "
+                         f"on {self.evaluation['images']} validation images. Best confidence threshold "
+                         f"{self.evaluation['best_f1_confidence']}.")
+        if self.evaluation["skipped_images"]:
+            result_string += f" {self.evaluation['skipped_images']} unreadable validation images were skipped."
+        self.model_info.evaluation_result = result_string
+        self.model_info.evaluation_metrics = dict(self.evaluation,
+                                                  per_image_csv=os.path.basename(per_image_csv_path))
+        self.model_testing_text_signal.emit(f"Evaluation Finished, FINAL RESULT - {result_string}")
+
+    def result_boxes(self, result):
+        """ Returns the result's bounding boxes in YOLO format. """
+        boxes = []
+        for box in result.boxes:
+            x_center, y_center, w, h = box.xywhn[0].tolist()
+            boxes.append([0, x_center, y_center, w, h])
+        return boxes
 
     def metamorphic_tests(self):
         """ Tests a model's ability to handle different variations of input data with
             the same metamorphic properties.
             This function tests if the model identifies the same bounding boxes for images before
-            and after they are rotated. """
-        # Setup worker and thread
-        model = YOLO(self.model_info.get_best_pt_path())
-
+            and after they are rotated, flipped, brightened, darkened, have their contrast changed or are resized.
+            The results for each transform are saved, along with the overall result. """
         # Init values
-        total_match = 0
+        matches = {transform_name: 0 for transform_name in self.metamorphic_transforms}
         total_number = 0
-        iteration_num = 1
-
-        # Iterate through all test images
-        for file in self.selected_test_images:
-            image = cv2.imread(file)
-            rotated_image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
-
-            # Compute bounding boxes for the original image
-            original_results = model(file)
-            original_boxes = []
-
-            for box in original_results[0].boxes:
-                x_center, y_center, w, h = box.xywhn[0].tolist()
-                original_boxes.append([0, x_center, y_center, w, h])
-
-            # Rotate the bounding boxes for comparison to the rotated image's bounding boxes
-            rotated_original_boxes = self.rotate_annotations_by_90(original_boxes)
 
-            # Compute bounding boxes for rotated images
-            rotated_results = model(rotated_image)
-            rotated_boxes = []
+        for prediction in self.predictions:
+            total_number += len(prediction["original"])
+            for transform_name, variant_boxes in prediction["variants"].items():
+                # Compare bounding boxes
+                matches[transform_name] += self.compare_annotations(prediction["original"], variant_boxes, 0.3)[0]
 
-            for box in rotated_results[0].boxes:
-                x_center, y_center, w, h = box.xywhn[0].tolist()
-                rotated_boxes.append([0, x_center, y_center, w, h])
-
-            # Compare bounding boxes
-            matched, total = self.compare_annotations(rotated_original_boxes, rotated_boxes, 0.3)
-            total_match += matched
-            total_number += total
-
-            self.model_testing_text_signal.emit(f"Metamorphic Test (Iteration "
-                                                f"{iteration_num}/{len(self.selected_test_images)}) - Matched "
-                                                f"{matched}/{total}.")
-            iteration_num += 1
-            self.model_testing_progress_bar_signal.emit(int(iteration_num / len(self.selected_test_images) * 33))
-
-        if total_number == 0:
+        total_match = sum(matches.values())
+        total_compared = total_number * len(self.metamorphic_transforms)
+        if total_compared == 0:
             final_result = "0% Matched. No bounding boxes were found in test data."
+            self.model_info.metamorphic_test_details = {}
         else:
-            final_result = f"{(total_match / total_number) * 100}% Matched out of {total_number} Total"
+            final_result = f"{(total_match / total_compared) * 100}% Matched out of {total_compared} Total"
+            self.model_info.metamorphic_test_details = {
+                transform_name: round(matched / total_number * 100, 2) for transform_name, matched in matches.items()
+            }
+            worst_transform = min(matches, key=matches.get)
+            final_result += (f" ({len(self.metamorphic_transforms)} transforms, lowest "
+                             f"{worst_transform} at {self.model_info.metamorphic_test_details[worst_transform]}%)")
 
         self.model_info.metamorphic_test_result = final_result
 
         self.model_testing_text_signal.emit(f"Metamorphic Test Finished, FINAL RESULT - {final_result} ")
+        for transform_name, percentage in self.model_info.metamorphic_test_details.items():
+            self.model_testing_text_signal.emit(f"Metamorphic Test - {transform_name}: {percentage}% Matched")
+        self.update_progress("metamorphic", 1.0)
 
     def differential_tests(self):
-        """ Compares current model's recall compared to previous models. """
-        previous_model_path = self.model_info.starting_model
-        if previous_model_path == "":
-            previous_model_path = file_helpers.get_model_for_comparison(self.path_to_models)
-
+        """ Compares current model's recall and mAP to the previous models', on the whole validation set. """
         # No previous models
-        if previous_model_path == "":
+        if not self.comparison_model_paths:
             # Emit a status update
             result_string = "No previous model found. Passing Test."
             self.model_info.differential_test_result = result_string
             self.model_testing_text_signal.emit(f"Differential Testing - {result_string} ")
-            self.model_testing_progress_bar_signal.emit(66)
+            self.update_progress("differential", 1.0)
             return
 
-        current_model = YOLO(self.model_info.get_best_pt_path())
-        previous_model = YOLO(previous_model_path)
-
-        total_correct_bounding_boxes = 0
-        current_model_performance = 0
-        previous_model_performance = 0
-
-        length_of_selected_images = len(self.selected_test_images)
-
-        # Compare performance for each model, to the correct bounding boxes for the image.
-        for index in range(0, length_of_selected_images):
-            current_image = self.selected_test_images[index]
-            current_annotation = self.selected_test_annotation[index]
-
-            # Loads correct bounding boxes
-            correct_bounding_boxes = []
-            with open(current_annotation, "r") as f:
-                for line in f.readlines():
-                    stripped_line = line.strip()
-                    class_id, x_center, y_center, box_w, box_h = map(float, stripped_line.split())
-                    correct_bounding_boxes.append([class_id, x_center, y_center, box_w, box_h])
-            total_correct_bounding_boxes += len(correct_bounding_boxes)
-
-            # Calculates new model's bounding boxes
-            current_model_results = current_model(current_image)
-            current_model_bounding_boxes = []
-            for box in current_model_results[0].boxes:
-                x_center, y_center, w, h = box.xywhn[0].tolist()
-                current_model_bounding_boxes.append([0, x_center, y_center, w, h])
-
-            # Calculates previous model's bounding boxes
-            previous_model_results = previous_model(current_image)
-            previous_model_bounding_boxes = []
-            for box in previous_model_results[0].boxes:
-                x_center, y_center, w, h = box.xywhn[0].tolist()
-                previous_model_bounding_boxes.append([0, x_center, y_center, w, h])
-
-            # Adds the matching bounding boxes between the true value and the model's predicted values
-            current_model_performance += self.compare_annotations(current_model_bounding_boxes,
-                                                                  correct_bounding_boxes, 0.5)[0]
-
-            previous_model_performance += self.compare_annotations(previous_model_bounding_boxes,
-                                                                   correct_bounding_boxes, 0.5)[0]
-
-            # Emit a status update
-            self.model_testing_text_signal.emit("Differential Testing - Calculated "
-                                                f"{index + 1}/{length_of_selected_images}")
-            self.model_testing_progress_bar_signal.emit(int(index / length_of_selected_images * 33) + 33)
-
-        if total_correct_bounding_boxes == 0:
-            percentage_current_correct = 0
-            percentage_previous_correct = 0
-        else:
-            percentage_current_correct = current_model_performance / total_correct_bounding_boxes
-            percentage_previous_correct = previous_model_performance / total_correct_bounding_boxes
-
-        # Difference can be positive (improved) or negative (degraded)
-        difference = (percentage_current_correct - percentage_previous_correct) * 100
-
-        result_string = (f"Change in recall of {difference}%"
-                         f" since previous model, based on {length_of_selected_images}"
-                         " images.")
+        # Differences can be positive (improved) or negative (degraded)
+        differences = []
+        for comparison_evaluation in self.comparison_evaluations:
+            recall_difference = (self.evaluation["recall"] - comparison_evaluation["recall"]) * 100
+            map_difference = self.evaluation["mAP_50"] - comparison_evaluation["mAP_50"]
+            differences.append(f"recall of {round(recall_difference, 2)}% and mAP50 of {round(map_difference, 4)}")
+
+        result_string = (f"Change in {differences[0]}"
+                         f" since previous model, based on {self.evaluation['images']}"
+                         " validation images.")
+        if len(differences) > 1:
+            older_models = []
+            for path, difference in zip(self.comparison_model_paths[1:], differences[1:]):
+                model_folder_name = file_helpers.get_folder_name_from_path(os.path.dirname(os.path.dirname(path)))
+                older_models.append(f"{model_folder_name}: {difference}")
+            result_string += f" Change since older models - {', '.join(older_models)}."
 
         self.model_info.differential_test_result = result_string
 
         self.model_testing_text_signal.emit(f"Differential Testing Finished, FINAL RESULT - {result_string}")
-        self.model_testing_progress_bar_signal.emit(66)
+        self.update_progress("differential", 1.0)
 
     def fuzzing_tests(self):
         """ Generates random and unexpected inputs for the system. The primary goal is to identify issues
-            such as program crashes, memory corruption and other vulnerabilities. """
-
-        model = YOLO(self.model_info.get_best_pt_path())
-        num_passes = 0
-        num_fails = 0
-        total_num = len(self.selected_test_images)
-
-        for index in range(0, total_num):
-            try:
-                test_img_path = self.selected_test_images[index]
-                test_img = cv2.imread(test_img_path)
-
-                # Swap the colour channels
-                channels = list(cv2.split(test_img))
-                random.shuffle(channels)
-                test_img = cv2.merge(channels)
-
-                # Add gaussian noise
-                random_gaussian_noise = np.random.normal(0, 25, test_img.shape).astype(np.uint8)
-                test_img = cv2.add(test_img, random_gaussian_noise)
-
-                # Add occlusion
-                h, w = test_img.shape[:2]
-                x1 = random.randint(0, w // 2)
-                y1 = random.randint(0, h // 2)
-                x2 = x1 + random.randint(10, w // 2)
-                y2 = y1 + random.randint(10, h // 2)
-                cv2.rectangle(test_img, (x1, y1), (x2, y2), (0, 0, 0), -1)
-
-                # Test the corrupted image with the model.
-                model(test_img)
-
-                # If an exception was not thrown, it has passed.
-                num_passes += 1
-                self.model_testing_text_signal.emit(f"Fuzzing Testing - Test {index + 1}/{total_num} Passed.")
-            except Exception:
-                # Exception has been thrown so the test must have failed.
-                num_fails += 1
-                self.model_testing_text_signal.emit(f"Fuzzing Testing - Test {index}/{total_num} Failed.")
-
-            self.model_testing_progress_bar_signal.emit(int(int(index / total_num * 33) + 66))
-
-        percentage_passed = (num_passes / total_num) * 100
-        result_string = f"{percentage_passed}% Passed out of {total_num} Images."
+            such as program crashes, memory corruption and other vulnerabilities.
+            Each input is analysed in a separate process, so a crash or running out of memory only fails that test. """
+        def progress(completed, total):
+            self.model_testing_text_signal.emit(f"Fuzzing Testing - Completed {completed}/{total} tests.")
+            self.update_progress("fuzzing", completed / total)
+
+        harness = FuzzingHarness(self.model_info.get_best_pt_path(), mutations=self.fuzzing_mutations)
+        report = harness.run(self.selected_test_images, progress, load_image=self.image_cache.image)
+
+        total_num = sum(stats["tests"] for stats in report.values())
+        num_passes = sum(stats["passed"] for stats in report.values())
+        percentage_passed = (num_passes / total_num) * 100 if total_num else 0
+        result_string = (f"{percentage_passed}% Passed out of {total_num} Tests on "
+                         f"{len(self.selected_test_images)} Images.")
+
+        failures = [f"{mutation}: {stats['tests'] - stats['passed']} failed ({stats['crash']} crashed, "
+                    f"{stats['timeout']} timed out)"
+                    for mutation, stats in report.items() if stats["passed"] < stats["tests"]]
+        if failures:
+            result_string += f" Failures - {', '.join(failures)}."
+        if not harness.memory_limit_enforced:
+            result_string += " Memory use was not limited, as psutil is not installed."
 
         self.model_testing_text_signal.emit(f"Fuzzing Testing Finished, FINAL RESULT - {result_string}")
-        self.model_testing_progress_bar_signal.emit(100)
+        self.update_progress("fuzzing", 1.0)
 
         self.model_info.fuzzing_test_result = result_string
+        self.model_info.fuzzing_test_details = report
 
     def select_random_images(self, image_dir, percentage=5):
         """ Selects a provided percentage of images from the provided DIR. """
@@ -253,61 +318,13 @@ class TestModelStage(QThread):
 
     def rotate_annotations_by_90(self, boxes):
         """ Rotates the annotations by 90 degrees clockwise """
-        rotated = []
-
-        for box in boxes:
-            class_id, x, y, bw, bh = box
-            new_x = 1 - y
-            new_y = x
-            new_bw = bh
-            new_bh = bw
-
-            rotated.append([class_id, new_x, new_y, new_bw, new_bh])
-
-        return rotated
+        return metamorphic.rotate_boxes_90_clockwise(boxes).tolist()
 
     def intersection_over_union(self, box1, box2):
         """ Calculates if the predicted bounding boxes overlap. """
-        # Turning the yolo coordinates into normal box coordinates with
-        # each var being a corner of the box
-
-        x1_min = box1[1] - box1[3] / 2
-        y1_min = box1[2] - box1[4] / 2
-        x1_max = box1[1] + box1[3] / 2
-        y1_max = box1[2] + box1[4] / 2
-
-        x2_min = box2[1] - box2[3] / 2
-        y2_min = box2[2] - box2[4] / 2
-        x2_max = box2[1] + box2[3] / 2
-        y2_max = box2[2] + box2[4] / 2
-
-        # Find the intersection points between the boxes
-        inter_x1 = max(x1_min, x2_min)  # Left edge
-        inter_y1 = max(y1_min, y2_min)  # Top edge
-        inter_x2 = min(x1_max, x2_max)  # Right edge
-        inter_y2 = min(y1_max, y2_max)  # Bottom edge
-
-        # Calculate the width and height of the overlap.
-        # If the length is negative, it is discarded.
-        inter_area = max(0, inter_x2 - inter_x1) * max(0, inter_y2 - inter_y1)
-
-        # Compute the area of each box
-        box1_area = (x1_max - x1_min) * (y1_max - y1_min)
-        box2_area = (x2_max - x2_min) * (y2_max - y2_min)
-
-        # Compute IoU
-        union = box1_area + box2_area - inter_area
-
-        return inter_area / union if union else 0
+        return float(box_matching.iou_matrix(box_matching.yolo_to_corners([box1]),
+                                             box_matching.yolo_to_corners([box2]))[0, 0])
 
     def compare_annotations(self, boxes1, boxes2, intersection_over_union_percentage=0.5):
-        """ Compares to see if any annotations match. """
-        matched = 0
-        for original_box in boxes1:
-            for rotated_box in boxes2:
-                # If the IoU is over the threshold of 0.1
-                if self.intersection_over_union(original_box, rotated_box) >= intersection_over_union_percentage:
-                    matched += 1
-                    break
-
-        return matched, len(boxes1)
+        """ Compares to see if any annotations match. Each box can only be matched to one other box. """
+        return box_matching.count_matches(boxes1, boxes2, intersection_over_union_percentage), len(boxes1)
@@ -10,6 +10,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from data_classes.model_info import ModelInfo
 from helpers import file_helpers
+from stages.export_model import export_model
 
 
 def train_yolo(data_yaml, model_info, training_start, model_dir,
@@ -88,6 +89,10 @@ def train_yolo(data_yaml, model_info, training_start, model_dir,
 
     model_info_object.save_to_json()
 
+    # Faster CPU versions of the model are created for analysing images on computers without a GPU.
+    if export_model(model_info_object, img_size):
+        model_info_object.save_to_json()
+
     print(f"Model saved at: {model_dir}")
 
     return model_dir  # Return the directory where the model was saved
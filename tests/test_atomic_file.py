@@ -0,0 +1,38 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.atomic_file import atomic_write
+
+
+def test_file_replaced_once_written(tmp_path):
+    """Tests that the file keeps its old contents until the new contents have been written."""
+    path = os.path.join(tmp_path, "config.txt")
+    with open(path, "w") as file:
+        file.write("old")
+
+    with atomic_write(path) as file:
+        file.write("new")
+        with open(path) as existing:
+            assert existing.read() == "old"
+
+    with open(path) as file:
+        assert file.read() == "new"
+    assert os.listdir(tmp_path) == ["config.txt"]
+
+
+def test_failed_write_leaves_file_unchanged(tmp_path):
+    """Tests that an error while writing leaves the original file, and removes the temporary file."""
+    path = os.path.join(tmp_path, "config.txt")
+    with open(path, "w") as file:
+        file.write("old")
+
+    try:
+        with atomic_write(path) as file:
+            file.write("partial")
+            raise RuntimeError("Disk full")
+    except RuntimeError:
+        pass
+
+    with open(path) as file:
+        assert file.read() == "old"
+    assert os.listdir(tmp_path) == ["config.txt"]
@@ -0,0 +1,41 @@
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import box_matching
+
+
+def test_iou_matrix():
+    """Tests the intersection over union of every pair of boxes."""
+    corners1 = [[0, 0, 10, 10], [20, 20, 30, 30]]
+    corners2 = [[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110]]
+
+    ious = box_matching.iou_matrix(corners1, corners2)
+
+    assert ious.shape == (2, 3)
+    assert np.allclose(ious[0], [1.0, 50 / 150, 0.0])
+    assert np.allclose(ious[1], [0.0, 0.0, 0.0])
+
+
+def test_yolo_to_corners():
+    """Tests that YOLO centre and size boxes are converted into corners."""
+    assert np.allclose(box_matching.yolo_to_corners([[0, 0.5, 0.5, 0.2, 0.4]]), [[0.4, 0.3, 0.6, 0.7]])
+    assert box_matching.yolo_to_corners([]).shape == (0, 4)
+
+
+def test_boxes_matched_once():
+    """Tests that two predictions of the same box only count as one match."""
+    predictions = [[0, 0.5, 0.5, 0.2, 0.2], [0, 0.51, 0.5, 0.2, 0.2]]
+    annotations = [[0, 0.5, 0.5, 0.2, 0.2]]
+
+    assert box_matching.count_matches(predictions, annotations) == 1
+    assert box_matching.count_matches([], annotations) == 0
+
+
+def test_highest_score_matched_first():
+    """Tests that when scores are provided, the most confident box is given the best match."""
+    corners1 = [[0, 0, 10, 10], [1, 0, 11, 10]]
+    corners2 = [[1, 0, 11, 10]]
+
+    assert box_matching.match_boxes(corners1, corners2, 0.5, scores=[0.9, 0.1])[0][:2] == (0, 0)
+    assert box_matching.match_boxes(corners1, corners2, 0.5)[0][:2] == (1, 0)
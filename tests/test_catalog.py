@@ -0,0 +1,130 @@
+import os
+import cv2
+import numpy as np
+import pytest
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import catalog as catalog_module
+from helpers.catalog import Catalog
+
+
+def create_stored_images(folder, names):
+    """Creates the stored training images folders, with an image and annotation for each name."""
+    for subfolder in ["images/raw", "labels/raw", "datasets"]:
+        os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+    for name in names:
+        cv2.imwrite(os.path.join(folder, "images", "raw", name + ".png"), np.zeros((30, 40, 3), dtype=np.uint8))
+        with open(os.path.join(folder, "labels", "raw", name + ".txt"), "w") as file:
+            file.write("0 0.5 0.5 0.2 0.4\n0 0.3 0.3 0.4 0.2\n")
+
+
+def read_config(folder, name):
+    with open(os.path.join(folder, "datasets", name + ".txt"), "r", encoding="utf-8") as file:
+        return file.read().splitlines()
+
+
+def test_refresh_and_details(tmp_path):
+    """Tests that images are listed from the catalog, and their details are filled in and cleared when changed."""
+    create_stored_images(tmp_path, ["b", "a"])
+
+    with Catalog(str(tmp_path)) as catalog:
+        catalog.refresh()
+        assert catalog.image_names() == ["a.png", "b.png"]
+        assert catalog.update_details() == 2
+        assert catalog.update_details() == 0
+
+        details = catalog.image_details("a.png")
+        assert (details["width"], details["height"], details["label_count"]) == (40, 30, 2)
+        assert details["mean_box_width"] == pytest.approx(0.3) and details["hash"]
+
+        os.remove(os.path.join(tmp_path, "images", "raw", "b.png"))
+        with open(os.path.join(tmp_path, "labels", "raw", "a.txt"), "w") as file:
+            file.write("")
+        catalog.refresh()
+
+        assert catalog.image_names() == ["a.png"]
+        assert catalog.image_details("a.png")["hash"] is None
+        catalog.update_details()
+        assert catalog.image_details("a.png")["label_count"] == 0
+
+
+def test_configs_imported_and_exported(tmp_path):
+    """Tests that config files are imported, and membership changes only rewrite the affected config files."""
+    create_stored_images(tmp_path, ["img_1", "img_10", "img_2"])
+    with open(os.path.join(tmp_path, "datasets", "first.txt"), "w") as file:
+        file.write("img_1.png\nimg_2.txt")
+    with open(os.path.join(tmp_path, "datasets", "second.txt"), "w") as file:
+        file.write("img_10.png\n")
+    second_modified = os.stat(os.path.join(tmp_path, "datasets", "second.txt")).st_mtime_ns
+
+    with Catalog(str(tmp_path)) as catalog:
+        catalog.refresh()
+        assert catalog.config_names() == ["first", "second"]
+        assert catalog.config_image_names("first") == ["img_1.png", "img_2.png"]
+
+        catalog.add_to_config("first", "img_10.png")
+        assert read_config(tmp_path, "first") == ["img_1.png", "img_2.txt", "img_10.png"]
+
+        catalog.remove_image("img_1.png")
+        assert read_config(tmp_path, "first") == ["img_2.txt", "img_10.png"]
+        assert os.stat(os.path.join(tmp_path, "datasets", "second.txt")).st_mtime_ns == second_modified
+
+        # Changes made outside the catalog are imported, but its own changes are not imported again.
+        with open(os.path.join(tmp_path, "datasets", "second.txt"), "a") as file:
+            file.write("img_2.png\n")
+        catalog.import_configs()
+        assert catalog.is_in_config("second", "img_2.png")
+
+        catalog.delete_config("first")
+        assert catalog.config_names() == ["second"]
+        assert not os.path.exists(os.path.join(tmp_path, "datasets", "first.txt"))
+
+    with Catalog(str(tmp_path)) as catalog:
+        assert catalog.config_image_names("second") == ["img_10.png", "img_2.png"]
+
+
+def test_folders_only_read_when_changed(tmp_path, monkeypatch):
+    """Tests that the images and annotations folders are only read again after files are added or removed."""
+    create_stored_images(tmp_path, ["a"])
+    an_hour_ago = time.time() - 3600
+    for folder in ["images/raw", "labels/raw"]:
+        os.utime(os.path.join(tmp_path, folder), (an_hour_ago, an_hour_ago))
+
+    with Catalog(str(tmp_path)) as catalog:
+        catalog.refresh()
+        scanned = []
+        scan = catalog_module._scan
+
+        def counted_scan(folder, extensions):
+            scanned.append(folder)
+            return scan(folder, extensions)
+        monkeypatch.setattr(catalog_module, "_scan", counted_scan)
+
+        catalog.refresh()
+        assert [folder for folder in scanned if not folder.endswith("datasets")] == []
+
+        create_stored_images(tmp_path, ["b"])
+        catalog.refresh()
+        assert catalog.image_names() == ["a.png", "b.png"]
+
+
+def test_configs_match_by_file_name(tmp_path):
+    """Tests that images with the same name and different extensions are different config entries, while an
+    annotation's entry matches every image with its name."""
+    create_stored_images(tmp_path, ["a"])
+    cv2.imwrite(os.path.join(tmp_path, "images", "raw", "a.jpg"), np.zeros((30, 40, 3), dtype=np.uint8))
+    with open(os.path.join(tmp_path, "datasets", "png.txt"), "w") as file:
+        file.write("a.png\n")
+    with open(os.path.join(tmp_path, "datasets", "annotation.txt"), "w") as file:
+        file.write("a.txt\n")
+
+    with Catalog(str(tmp_path)) as catalog:
+        catalog.refresh()
+        assert catalog.config_image_names("png") == ["a.png"]
+        assert not catalog.is_in_config("png", "a.jpg")
+        assert catalog.config_image_names("annotation") == ["a.jpg", "a.png"]
+
+        catalog.remove_from_config("annotation", "a.jpg")
+        assert catalog.config_image_names("annotation") == ["a.png"]
+        assert read_config(tmp_path, "annotation") == ["a.png"]
@@ -0,0 +1,77 @@
+import csv
+import subprocess
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import xray
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import pytest
+from helpers import inference, model_cache
+
+
+def create_files(folder, names):
+    """Creates empty files with the provided names."""
+    for name in names:
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+
+
+def test_collect_images(tmp_path):
+    """Tests that files, globs and directories are expanded into unique image paths."""
+    create_files(tmp_path, ["a.png", "b.jpg", "notes.txt", os.path.join("nested", "c.PNG")])
+
+    images = inference.collect_images([
+        str(tmp_path),
+        os.path.join(str(tmp_path), "*.png"),
+        os.path.join(str(tmp_path), "**", "*.PNG"),
+        os.path.join(str(tmp_path), "notes.txt")
+    ])
+
+    assert [os.path.basename(image) for image in images] == ["a.png", "b.jpg", "c.PNG"]
+
+
+def test_no_images_found(tmp_path):
+    """Tests that the command fails when no images are provided."""
+    assert xray.main(["analyse", "--model", "missing.pt", str(tmp_path)]) == 1
+
+
+@pytest.mark.parametrize("setting", [["--tile_size", "0"], ["--tile_size", "big"], ["--overlap", "1.0"],
+                                     ["--overlap", "1.5"], ["--overlap", "-0.1"]])
+def test_invalid_tile_settings_rejected(tmp_path, setting, capsys):
+    """Tests that tile sizes below 1 and overlaps outside 0 to 1 are rejected before any analysis."""
+    with pytest.raises(SystemExit) as exit_info:
+        xray.main(["analyse", "--model", "missing.pt", "--tiled", *setting, str(tmp_path)])
+
+    assert exit_info.value.code != 0
+    assert setting[0] in capsys.readouterr().err
+
+
+def test_unreadable_image_reported(tmp_path, monkeypatch):
+    """Tests that an unreadable image is listed with an error verdict, and the other images are still analysed."""
+    cv2.imwrite(os.path.join(tmp_path, "a.png"), np.zeros((20, 20, 3), dtype=np.uint8))
+    cv2.imwrite(os.path.join(tmp_path, "c.png"), np.zeros((20, 20, 3), dtype=np.uint8))
+    create_files(tmp_path, ["b.png", "best.pt"])
+
+    def model(images, verbose=False):
+        boxes = SimpleNamespace(cls=np.array([0.0]), conf=np.array([0.75]), xywhn=np.array([[0.5, 0.5, 0.1, 0.1]]))
+        return [SimpleNamespace(boxes=boxes) for _ in images]
+    monkeypatch.setattr(model_cache, "get_model", lambda path: model)
+
+    output = os.path.join(tmp_path, "results.csv")
+    assert xray.main(["analyse", "--model", os.path.join(tmp_path, "best.pt"), "--format", "csv",
+                      "--output", output, os.path.join(tmp_path, "*.png")]) == 1
+
+    with open(output, "r", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert [(os.path.basename(row["image"]), row["verdict"][:5]) for row in rows] == [
+        ("a.png", "Fault"), ("b.png", "Error"), ("c.png", "Fault")]
+
+
+def test_cli_does_not_import_qt():
+    """Tests that the command line interface can be loaded without importing Qt."""
+    root = os.path.join(os.path.dirname(__file__), '..')
+    code = "import sys, xray; sys.exit('PySide6' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
@@ -0,0 +1,25 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.dataset_index import DatasetConfigIndex
+
+
+def test_exact_matches_only():
+    """Tests that images only match their own config entry, not entries that contain their name."""
+    index = DatasetConfigIndex(["img_10.png", "IMG_2.JPG\n", ""])
+
+    assert index.filter(["img_1.png", "img_10.png", "img_2.jpg", "img_20.png"]) == ["img_10.png", "img_2.jpg"]
+    assert "img_1.png" not in index
+    assert len(index) == 2
+
+
+def test_annotation_entries_match_images(tmp_path):
+    """Tests that config entries for an image's annotation match the image, and missing configs are empty."""
+    config_path = os.path.join(tmp_path, "config.txt")
+    with open(config_path, "w", encoding="utf-8") as file:
+        file.write("new_image.txt\nother.png\n")
+    index = DatasetConfigIndex.from_file(config_path)
+
+    assert index.filter([{"name": "new_image.png"}, {"name": "image.png"}], key=lambda item: item["name"]) == [
+        {"name": "new_image.png"}]
+    assert len(DatasetConfigIndex.from_file(os.path.join(tmp_path, "missing.txt"))) == 0
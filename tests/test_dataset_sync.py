@@ -0,0 +1,141 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import dataset_sync, file_helpers
+from helpers.dataset_sync import DatasetSync
+
+
+def create_dataset(folder, names):
+    """Creates the stored images, their annotations and an empty data folder."""
+    for subfolder in ["raw_images", "raw_labels", "data/images/train", "data/images/val", "data/labels/train",
+                      "data/labels/val"]:
+        os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+    for name in names:
+        write_image(folder, name, b"image " + name.encode())
+        with open(os.path.join(folder, "raw_labels", name + ".txt"), "w") as file:
+            file.write("0 0.5 0.5 0.1 0.1\n")
+    return DatasetSync(os.path.join(folder, "raw_images"), os.path.join(folder, "raw_labels"),
+                       os.path.join(folder, "data"))
+
+
+def write_image(folder, name, contents):
+    with open(os.path.join(folder, "raw_images", name + ".png"), "wb") as file:
+        file.write(contents)
+
+
+def synced_files(sync):
+    """Returns the images and annotations in each split of the data folder."""
+    return {split: sorted(os.listdir(sync.image_dir(split)) + os.listdir(sync.label_dir(split)))
+            for split in dataset_sync.SPLITS}
+
+
+def test_unchanged_dataset_skipped(tmp_path, monkeypatch):
+    """Tests that a second sync of the same images does not link or hash any files."""
+    names = [f"image_{index}" for index in range(20)]
+    sync = create_dataset(tmp_path, names)
+
+    counts = sync.sync([name + ".png" for name in names])
+    first_files = synced_files(sync)
+
+    def unexpected(*args):
+        raise AssertionError("No files should be linked or hashed.")
+
+    monkeypatch.setattr(dataset_sync, "link_or_copy", unexpected)
+    monkeypatch.setattr(dataset_sync, "hash_file", unexpected)
+    second_counts = sync.sync([name + ".png" for name in names])
+
+    assert counts == {"added": 20, "replaced": 0, "removed": 0, "unchanged": 0}
+    assert second_counts == {"added": 0, "replaced": 0, "removed": 0, "unchanged": 20}
+    assert synced_files(sync) == first_files
+    assert first_files["val"] and len(first_files["train"]) + len(first_files["val"]) == 40
+
+
+def test_known_hashes_reused(tmp_path, monkeypatch):
+    """Tests that hashes provided by the catalog are used while the image is unchanged, instead of hashing it."""
+    sync = create_dataset(tmp_path, ["image_1", "image_2"])
+    hashed = []
+    hash_file = dataset_sync.hash_file
+    monkeypatch.setattr(dataset_sync, "hash_file",
+                        lambda path: hashed.append(os.path.basename(path)) or hash_file(path))
+    image_stat = os.stat(os.path.join(tmp_path, "raw_images", "image_1.png"))
+    known_hashes = {"image_1.png": (image_stat.st_size, image_stat.st_mtime_ns, "catalog hash"),
+                    "image_2.png": (0, 0, "outdated hash")}
+
+    sync.sync(["image_1.png", "image_2.png"], known_hashes=known_hashes)
+
+    assert hashed == ["image_2.png"]
+    assert sync.load_manifest()["image_1.png"]["hash"] == "catalog hash"
+
+
+def test_only_changes_applied(tmp_path):
+    """Tests that changed images and annotations are replaced, removed images are deleted and splits are kept."""
+    names = [f"image_{index}" for index in range(10)]
+    sync = create_dataset(tmp_path, names)
+    sync.sync([name + ".png" for name in names])
+    splits = {name: entry["split"] for name, entry in sync.load_manifest().items()}
+
+    # Files are replaced rather than edited, so hardlinked copies are not updated automatically.
+    os.remove(os.path.join(tmp_path, "raw_images", "image_0.png"))
+    write_image(tmp_path, "image_0", b"changed")
+    os.remove(os.path.join(tmp_path, "raw_labels", "image_1.txt"))
+    write_image(tmp_path, "new_image", b"new")
+    counts = sync.sync([name + ".png" for name in names[:-1]] + ["new_image.png"])
+
+    image_0 = os.path.join(sync.image_dir(splits["image_0.png"]), "image_0.png")
+    with open(image_0, "rb") as file:
+        assert file.read() == b"changed"
+    assert not os.path.exists(os.path.join(sync.label_dir(splits["image_1.png"]), "image_1.txt"))
+    assert "image_9.png" not in synced_files(sync)[splits["image_9.png"]]
+    assert counts == {"added": 1, "replaced": 2, "removed": 1, "unchanged": 7}
+    assert all(sync.load_manifest()[name]["split"] == splits[name] for name in splits if name != "image_9.png")
+
+
+def test_reshuffle_and_stray_files(tmp_path):
+    """Tests that files not in the manifest are removed, and reshuffling keeps the 90/10 split."""
+    names = [f"image_{index}" for index in range(10)]
+    sync = create_dataset(tmp_path, names)
+    with open(os.path.join(sync.image_dir("train"), "old.png"), "wb") as file:
+        file.write(b"old")
+    with open(os.path.join(tmp_path, "data", "labels", "train.cache"), "wb") as file:
+        file.write(b"cache")
+
+    sync.sync([name + ".png" for name in names], reshuffle=True)
+    files = synced_files(sync)
+
+    assert "old.png" not in files["train"]
+    assert not os.path.exists(os.path.join(tmp_path, "data", "labels", "train.cache"))
+    assert len(files["train"]) == 18 and len(files["val"]) == 2
+
+
+def test_link_or_copy_hardlinks(tmp_path):
+    """Tests that files are hardlinked into a folder, replacing an older file with the same name."""
+    source = os.path.join(tmp_path, "image.png")
+    with open(source, "wb") as file:
+        file.write(b"image")
+    os.makedirs(os.path.join(tmp_path, "dest"))
+    with open(os.path.join(tmp_path, "dest", "image.png"), "wb") as file:
+        file.write(b"old")
+
+    assert file_helpers.link_or_copy(source, os.path.join(tmp_path, "dest")) == "hardlink"
+    assert os.path.samefile(source, os.path.join(tmp_path, "dest", "image.png"))
+
+
+def test_link_or_copy_falls_back(tmp_path, monkeypatch):
+    """Tests that each method is tried in turn, and the file is copied if none can be used."""
+    def unsupported(*args):
+        raise OSError("Not supported")
+
+    source = os.path.join(tmp_path, "image.png")
+    with open(source, "wb") as file:
+        file.write(b"image")
+    monkeypatch.setattr(file_helpers.os, "link", unsupported)
+    monkeypatch.setattr(file_helpers, "_reflink", unsupported)
+
+    assert file_helpers.link_or_copy(source, os.path.join(tmp_path, "symlink.png")) == "symlink"
+    assert os.path.islink(os.path.join(tmp_path, "symlink.png"))
+
+    monkeypatch.setattr(file_helpers.os, "symlink", unsupported)
+    destination = os.path.join(tmp_path, "copy.png")
+    assert file_helpers.link_or_copy(source, destination) == "copy"
+    with open(destination, "rb") as file:
+        assert file.read() == b"image"
@@ -0,0 +1,46 @@
+import os
+import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import disk_cache
+from helpers.disk_cache import DiskCache
+
+
+def write(cache, name, contents=b"0" * 100):
+    """Writes a cached file in a subfolder, as the thumbnail cache does."""
+    path = os.path.join(cache.cache_dir, name[:1], name + ".bin")
+    with cache.write(path) as file:
+        file.write(contents)
+    return path
+
+
+def test_least_recently_used_evicted(tmp_path):
+    """Tests that the least recently used files are deleted when the cache is over its size limit."""
+    cache = DiskCache(os.path.join(tmp_path, "cache"), ".bin", max_bytes=200)
+    first = write(cache, "first")
+    time.sleep(0.01)
+    second = write(cache, "second")
+    time.sleep(0.01)
+    cache.touch(first)
+    third = write(cache, "third")
+
+    assert [os.path.exists(path) for path in (first, second, third)] == [True, False, True]
+
+    cache.clear()
+    assert not os.path.exists(first) and not os.path.exists(third)
+
+
+def test_folder_only_listed_when_full(tmp_path, monkeypatch):
+    """Tests that writing files does not list the cache folder, unless the cache is full."""
+    cache = DiskCache(os.path.join(tmp_path, "cache"), ".bin", max_bytes=250)
+    write(cache, "first")
+    listed = []
+    walk = os.walk
+    monkeypatch.setattr(disk_cache.os, "walk", lambda path: listed.append(path) or walk(path))
+
+    write(cache, "second")
+    write(cache, "first", b"0" * 120)
+    assert listed == []
+
+    write(cache, "third")
+    assert len(listed) == 1
@@ -0,0 +1,78 @@
+import io
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from types import SimpleNamespace
+import cv2
+from helpers.evaluation import DetectionEvaluator, evaluate_models, read_annotations
+
+
+def test_perfect_predictions():
+    """Tests that predicting every annotated box exactly gives a precision, recall and mAP of 1."""
+    evaluator = DetectionEvaluator()
+    evaluator.add("a.png", [[0.4, 0.4, 0.6, 0.6, 0.9, 0]], [[0, 0.5, 0.5, 0.2, 0.2]])
+    evaluator.add("b.png", [], [])
+
+    summary = evaluator.summary()
+
+    assert summary["images"] == 2
+    assert (summary["precision"], summary["recall"]) == (1.0, 1.0)
+    assert summary["mAP_50"] == pytest.approx(1.0)
+    assert summary["mAP_50_95"] == pytest.approx(1.0)
+
+
+def test_duplicate_and_missed_boxes():
+    """Tests that a duplicate prediction is counted as incorrect, and a missed box lowers the recall."""
+    evaluator = DetectionEvaluator()
+    evaluator.add("a.png",
+                  [[0.4, 0.4, 0.6, 0.6, 0.9, 0], [0.4, 0.4, 0.6, 0.6, 0.8, 0]],
+                  [[0, 0.5, 0.5, 0.2, 0.2], [0, 0.1, 0.1, 0.1, 0.1]])
+
+    precision, recall = evaluator.precision_recall_at(0.25)
+
+    assert (precision, recall) == (0.5, 0.5)
+    assert evaluator.summary()["mAP_50"] == pytest.approx(0.5, abs=0.01)
+
+
+def test_confidence_sweep_and_per_image_rows():
+    """Tests that low confidence boxes are excluded at higher thresholds, and a row is written for each image."""
+    per_image_file = io.StringIO()
+    evaluator = DetectionEvaluator(per_image_file=per_image_file)
+    evaluator.add("a.png", [[0.4, 0.4, 0.6, 0.6, 0.9, 0], [0.0, 0.0, 0.1, 0.1, 0.3, 0]], [[0, 0.5, 0.5, 0.2, 0.2]])
+
+    sweep = {point["confidence"]: point for point in evaluator.summary()["confidence_sweep"]}
+
+    assert sweep[0.25]["precision"] == 0.5
+    assert sweep[0.5]["precision"] == 1.0
+    assert per_image_file.getvalue().splitlines()[1] == "a.png,1,2,1,1,0"
+
+
+def test_missing_annotation_file(tmp_path):
+    """Tests that an image without an annotation file has no boxes."""
+    assert read_annotations(os.path.join(tmp_path, "missing.txt")).shape == (0, 5)
+    assert isinstance(read_annotations(os.path.join(tmp_path, "missing.txt")), np.ndarray)
+
+
+def test_unreadable_images_skipped(tmp_path):
+    """Tests that images which cannot be read are skipped and counted, and the other images are still evaluated."""
+    os.makedirs(os.path.join(tmp_path, "images"))
+    os.makedirs(os.path.join(tmp_path, "labels"))
+    for name in ["a", "c"]:
+        cv2.imwrite(os.path.join(tmp_path, "images", name + ".png"), np.zeros((20, 20, 3), dtype=np.uint8))
+        with open(os.path.join(tmp_path, "labels", name + ".txt"), "w") as file:
+            file.write("0 0.5 0.5 0.5 0.5\n")
+    with open(os.path.join(tmp_path, "images", "b.png"), "wb") as file:
+        file.write(b"not an image")
+
+    def model(images, conf=0.25, verbose=True):
+        box = np.array([[5.0, 5.0, 15.0, 15.0, 0.9, 0.0]])
+        data = SimpleNamespace(cpu=lambda: SimpleNamespace(numpy=lambda: box))
+        return [SimpleNamespace(boxes=SimpleNamespace(data=data), orig_shape=(20, 20)) for _ in images]
+
+    image_paths = [os.path.join(tmp_path, "images", name + ".png") for name in ["a", "b", "c"]]
+    [summary] = evaluate_models([model], image_paths, os.path.join(tmp_path, "labels"))
+
+    assert (summary["images"], summary["skipped_images"]) == (2, 1)
+    assert summary["recall"] == 1.0
@@ -0,0 +1,109 @@
+import os
+import signal
+import time
+import cv2
+import numpy as np
+import pytest
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import fuzzing
+from helpers.fuzzing import FuzzingHarness
+
+
+class MisbehavingModel:
+    """A model that fails in a different way for each type of unusual image."""
+
+    def __call__(self, image, device="", verbose=True):
+        if isinstance(image, str):
+            raise FileNotFoundError(f"Image Not Found {image}")
+        if image.ndim == 2:
+            raise ValueError("Expected 3 channels")
+        if image.dtype == np.uint16:
+            os.kill(os.getpid(), signal.SIGKILL)
+        if image.shape[0] == 8:
+            time.sleep(30)
+        return []
+
+
+def load_misbehaving_model(weights_path):
+    """Loads the fake model inside the worker process."""
+    return MisbehavingModel()
+
+
+def load_memory_hungry_model(weights_path):
+    """Loads a fake model that keeps hold of far more memory than the limit allows."""
+    def model(image, device="", verbose=True):
+        memory = np.ones(1024 * 1024 * 1024, dtype=np.uint8)
+        time.sleep(30)
+        return [memory]
+    return model
+
+
+def test_mutations_created(tmp_path):
+    """Tests that each mutation creates an image with the expected type and size."""
+    image_path = os.path.join(tmp_path, "image.png")
+    cv2.imwrite(image_path, np.full((40, 60, 3), 100, dtype=np.uint8))
+
+    def generate(mutation):
+        return cv2.imread(fuzzing.generate_variant(image_path, mutation, 1, str(tmp_path)), cv2.IMREAD_UNCHANGED)
+
+    assert generate("grayscale").shape == (40, 60)
+    assert generate("sixteen_bit").dtype == np.uint16
+    assert generate("extreme_aspect_ratio").shape[0] == 8
+    assert generate("combined").shape == (40, 60, 3)
+    assert generate("truncated_file") is None
+    # Huge images are saved at their original size, and only enlarged when the worker reads them.
+    assert generate("huge_dimensions").shape == (40, 60, 3)
+    variant_path = fuzzing.generate_variant(image_path, "huge_dimensions", 1, str(tmp_path))
+    assert fuzzing.load_variant(variant_path, "huge_dimensions", 1).shape[:2] == (fuzzing.HUGE_IMAGE_SIZE,) * 2
+
+
+def test_mutations_created_from_decoded_image(tmp_path):
+    """Tests that a provided decoded image is used instead of reading the file, which does not exist."""
+    image_path = os.path.join(tmp_path, "missing.png")
+    image = np.full((40, 60, 3), 100, dtype=np.uint8)
+    image.flags.writeable = False
+
+    def generate(mutation):
+        variant_path = fuzzing.generate_variant(image_path, mutation, 1, str(tmp_path), image)
+        return cv2.imread(variant_path, cv2.IMREAD_UNCHANGED), os.path.getsize(variant_path)
+
+    assert generate("occlusion")[0].shape == (40, 60, 3)
+    truncated, size = generate("truncated_file")
+    assert truncated is None and size > 0
+
+
+def test_failures_isolated(tmp_path):
+    """Tests that errors, crashes and timeouts are recorded for each mutation, without stopping the other tests."""
+    image_path = os.path.join(tmp_path, "image.png")
+    cv2.imwrite(image_path, np.full((40, 60, 3), 100, dtype=np.uint8))
+    mutations = ["channel_swap", "grayscale", "sixteen_bit", "extreme_aspect_ratio", "truncated_file"]
+    progress = []
+
+    harness = FuzzingHarness("unused.pt", mutations=mutations, workers=2, generation_workers=2, timeout=3,
+                             memory_limit_bytes=None, loader=load_misbehaving_model, seed=1)
+    report = harness.run([image_path], lambda completed, total: progress.append((completed, total)))
+
+    assert report["channel_swap"]["passed"] == 1
+    assert report["grayscale"]["error"] == 1 and report["grayscale"]["passed"] == 0
+    assert report["sixteen_bit"]["crash"] == 1
+    assert report["extreme_aspect_ratio"]["timeout"] == 1
+    assert report["truncated_file"]["passed"] == 1
+    assert progress[-1] == (5, 5)
+
+
+def test_memory_limit_enforced(tmp_path):
+    """Tests that a worker using more than the memory limit is stopped, and recorded as a crash."""
+    if not fuzzing.memory_limit_supported():
+        pytest.skip("The memory use of processes cannot be measured on this computer.")
+    image_path = os.path.join(tmp_path, "image.png")
+    cv2.imwrite(image_path, np.full((40, 60, 3), 100, dtype=np.uint8))
+
+    harness = FuzzingHarness("unused.pt", mutations=["occlusion"], workers=1, generation_workers=1, timeout=20,
+                             memory_limit_bytes=512 * 1024 * 1024, loader=load_memory_hungry_model, seed=1)
+    start = time.perf_counter()
+    report = harness.run([image_path])
+
+    assert harness.memory_limit_enforced
+    assert report["occlusion"]["crash"] == 1 and "memory limit" in report["occlusion"]["errors"][0]
+    assert time.perf_counter() - start < 20
@@ -0,0 +1,69 @@
+import csv
+import os
+import cv2
+import numpy as np
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from types import SimpleNamespace
+from helpers import image_analysis
+from helpers.image_analysis import BatchImageAnalysisWorker
+
+
+def fake_model(images, verbose=False):
+    """Finds one box in every image."""
+    return [SimpleNamespace(boxes=SimpleNamespace(conf=[0.5])) for _ in images]
+
+
+def run_worker(folder):
+    """Runs the worker on the current thread, returning the values it finished with."""
+    finished = []
+    worker = BatchImageAnalysisWorker("best.pt", str(folder), batch_size=2)
+    worker.finished_signal.connect(lambda *values: finished.append(values))
+    worker.run()
+    return finished
+
+
+def test_corrupt_image_in_summary(tmp_path, monkeypatch):
+    """Tests that a corrupt image is recorded as an error in the summary CSV, and the other images are analysed."""
+    monkeypatch.setattr(image_analysis, "get_model", lambda path: fake_model)
+    for name in ["a.png", "c.png"]:
+        cv2.imwrite(os.path.join(tmp_path, name), np.zeros((20, 20, 3), dtype=np.uint8))
+    with open(os.path.join(tmp_path, "b.png"), "wb") as file:
+        file.write(b"not an image")
+
+    [(summary_path, summaries, error)] = run_worker(tmp_path)
+
+    assert error == ""
+    assert [summary["verdict"][:5] for summary in summaries] == ["Fault", "Error", "Fault"]
+    with open(summary_path, "r", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert [(row["image"], row["box_count"]) for row in rows] == [("a.png", "1"), ("b.png", "0"), ("c.png", "1")]
+
+
+def test_error_still_finishes(tmp_path, monkeypatch):
+    """Tests that the worker still finishes, with the error, if the model cannot be loaded."""
+    def get_model(path):
+        raise FileNotFoundError("Model not found")
+    monkeypatch.setattr(image_analysis, "get_model", get_model)
+    cv2.imwrite(os.path.join(tmp_path, "a.png"), np.zeros((20, 20, 3), dtype=np.uint8))
+
+    assert run_worker(tmp_path) == [("", [], "Model not found")]
+
+
+def test_stopped_analysis_saves_analysed_images(tmp_path, monkeypatch):
+    """Tests that stopping the worker ends the analysis after the current batch, and saves the images analysed."""
+    monkeypatch.setattr(image_analysis, "get_model", lambda path: fake_model)
+    for index in range(6):
+        cv2.imwrite(os.path.join(tmp_path, f"{index}.png"), np.zeros((20, 20, 3), dtype=np.uint8))
+
+    finished = []
+    worker = BatchImageAnalysisWorker("best.pt", str(tmp_path), batch_size=2)
+    worker.progress_signal.connect(lambda analysed, total, speed: analysed and worker.stop())
+    worker.finished_signal.connect(lambda *values: finished.append(values))
+    worker.run()
+
+    [(summary_path, summaries, error)] = finished
+    assert worker.is_cancelled() and error == ""
+    assert len(summaries) == 2
+    with open(summary_path, "r", encoding="utf-8") as file:
+        assert len(list(csv.DictReader(file))) == 2
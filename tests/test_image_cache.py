@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.image_cache import ImageCache
+from helpers.result_cache import hash_file
+
+
+def create_image(folder, name, value=100, size=20):
+    """Creates a PNG image filled with the provided value."""
+    path = os.path.join(folder, name)
+    cv2.imwrite(path, np.full((size, size, 3), value, dtype=np.uint8))
+    return path
+
+
+def test_image_read_once(tmp_path):
+    """Tests that an image requested by several threads is read and decoded once, and cannot be changed."""
+    path = create_image(tmp_path, "image.png")
+    cache = ImageCache()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        images = list(executor.map(lambda _: cache.image(path), range(8)))
+
+    assert cache.read_count == 1
+    assert all(image is images[0] for image in images)
+    assert np.array_equal(images[0], cv2.imread(path))
+    assert not images[0].flags.writeable
+
+
+def test_hash_uses_same_read(tmp_path):
+    """Tests that the file's hash matches hash_file, and decoding after hashing does not read the file again."""
+    path = create_image(tmp_path, "image.png")
+    cache = ImageCache()
+
+    assert cache.file_hash(path) == hash_file(path)
+    cache.image(path)
+    assert cache.file_hash(path) == hash_file(path)
+    assert cache.read_count == 1
+
+
+def test_least_recently_used_images_evicted(tmp_path):
+    """Tests that the least recently used images are removed once the memory limit is reached."""
+    paths = [create_image(tmp_path, f"image_{index}.png", value=index) for index in range(3)]
+    cache = ImageCache(max_bytes=2 * 20 * 20 * 3)
+
+    cache.image(paths[0])
+    cache.image(paths[1])
+    cache.image(paths[0])
+    cache.image(paths[2])
+
+    assert paths[0] in cache and paths[2] in cache and paths[1] not in cache
+    assert cache.total_bytes() == 2 * 20 * 20 * 3
+
+
+def test_annotations_parsed_once(tmp_path):
+    """Tests that annotations are parsed once, and a missing annotation file has no boxes."""
+    annotation_path = os.path.join(tmp_path, "image.txt")
+    with open(annotation_path, "w") as file:
+        file.write("0 0.5 0.5 0.2 0.2\n")
+    cache = ImageCache()
+
+    boxes = cache.annotations(annotation_path)
+    os.remove(annotation_path)
+
+    assert cache.annotations(annotation_path) is boxes
+    assert boxes.tolist() == [[0, 0.5, 0.5, 0.2, 0.2]]
+    assert cache.annotations(os.path.join(tmp_path, "missing.txt")).shape == (0, 5)
@@ -0,0 +1,36 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from PySide6.QtCore import Qt
+from data_classes.edit_config_item_container import EditConfigItemContainer
+from data_classes.image_item_container import ImageItemContainer
+from ui_tabs.image_grid_view import ImageListModel
+
+
+def test_model_lists_items():
+    """Tests that the model provides each item and its name, and is reset when the items change."""
+    opened = []
+    items = [ImageItemContainer("images", name, lambda path, name: opened.append(path)) for name in ["a.png", "b.png"]]
+    model = ImageListModel(items)
+    resets = []
+    model.modelReset.connect(lambda: resets.append(True))
+
+    assert model.rowCount() == 2
+    assert model.data(model.index(1, 0), Qt.DisplayRole) == "b.png"
+    model.data(model.index(0, 0), ImageListModel.ItemRole).open()
+    assert opened == [os.path.join("images", "a.png")]
+
+    model.set_items(items[1:])
+    assert model.rowCount() == 1 and resets == [True]
+    assert model.data(model.index(1, 0), Qt.DisplayRole) is None
+
+
+def test_edit_config_item_toggles():
+    """Tests that toggling an edit config item changes its membership before the signal is emitted."""
+    item = EditConfigItemContainer(ImageItemContainer("images", "a.png", None), False)
+    added = []
+    item.item_added.connect(lambda label, container: added.append((label, container.is_in_current_config)))
+
+    item.toggle_visible()
+    assert added == [("a.png", True)]
+    assert item.save_to_config() == "a.png\n"
@@ -0,0 +1,76 @@
+import threading
+import time
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.inference_pipeline import InferencePipeline, LoadError
+
+
+def test_results_in_order():
+    """Tests that results are returned in the order the items were provided, even if loading finishes out of order."""
+    def load(item):
+        time.sleep(0.001 * (10 - item % 10))
+        return item * 2
+
+    pipeline = InferencePipeline(load, lambda inputs: [value + 1 for value in inputs], batch_size=3, workers=4)
+    results = list(pipeline.run(range(25)))
+
+    assert results == [(item, item * 2 + 1) for item in range(25)]
+    assert pipeline.timings.items == 25
+    assert pipeline.timings.batches == 9
+
+
+def test_loading_limited_ahead_of_model():
+    """Tests that loading pauses when the model falls behind, so only a limited number of items are held in memory."""
+    lock = threading.Lock()
+    state = {"loaded": 0, "predicted": 0, "most_ahead": 0}
+
+    def load(item):
+        with lock:
+            state["loaded"] += 1
+            state["most_ahead"] = max(state["most_ahead"], state["loaded"] - state["predicted"])
+        return item
+
+    def predict(inputs):
+        time.sleep(0.01)
+        with lock:
+            state["predicted"] += len(inputs)
+        return inputs
+
+    pipeline = InferencePipeline(load, predict, batch_size=2, workers=2, prefetch_batches=2)
+    assert len(list(pipeline.run(range(40)))) == 40
+    # Pending items, the batch being analysed and one item per worker can be loaded at once.
+    assert state["most_ahead"] <= pipeline.max_pending + pipeline.batch_size + pipeline.workers
+
+
+def test_load_error_raised():
+    """Tests that an error while loading an item is raised to the caller."""
+    def load(item):
+        if item == 3:
+            raise ValueError("Unable to read image")
+        return item
+
+    pipeline = InferencePipeline(load, lambda inputs: inputs, batch_size=2)
+    with pytest.raises(ValueError):
+        list(pipeline.run(range(10)))
+
+
+def test_load_errors_yielded():
+    """Tests that items which fail to load can be yielded as errors, without stopping the other items."""
+    batches = []
+
+    def load(item):
+        if item in (1, 2):
+            raise ValueError(f"Unable to read image: {item}")
+        return item
+
+    pipeline = InferencePipeline(load, lambda inputs: batches.append(inputs) or inputs, batch_size=2,
+                                 yield_load_errors=True)
+    results = list(pipeline.run(range(5)))
+
+    assert [item for item, _ in results] == [0, 1, 2, 3, 4]
+    assert [str(result) for _, result in results if isinstance(result, LoadError)] == ["Unable to read image: 1",
+                                                                                       "Unable to read image: 2"]
+    assert [result for _, result in results if not isinstance(result, LoadError)] == [0, 3, 4]
+    assert batches == [[0], [3], [4]]
@@ -0,0 +1,128 @@
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import inference_server
+from helpers.inference_server import InferenceServer, MicroBatcher
+
+
+def test_concurrent_requests_batched():
+    """Tests that requests submitted within the wait window are analysed in a single batch."""
+    batches = []
+    release = threading.Event()
+
+    def predict(model_key, images):
+        release.wait(5)
+        batches.append((model_key, list(images)))
+        return [image * 2 for image in images]
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit("model", number) for number in range(4)]
+    release.set()
+
+    assert [future.result(5) for future in futures] == [0, 2, 4, 6]
+    assert batches == [("model", [0, 1, 2, 3])]
+    batcher.stop()
+
+
+def test_batches_split_by_model():
+    """Tests that each model is only given the images requested for it."""
+    batches = []
+    batcher = MicroBatcher(lambda key, images: batches.append((key, images)) or images, max_wait_ms=200)
+
+    first = batcher.submit("a", 1)
+    second = batcher.submit("b", 2)
+    third = batcher.submit("a", 3)
+
+    assert (first.result(5), second.result(5), third.result(5)) == (1, 2, 3)
+    assert sorted(batches) == [("a", [1, 3]), ("b", [2])]
+    batcher.stop()
+
+
+def test_prediction_error_returned():
+    """Tests that an error analysing a batch is passed to each request in it."""
+    def predict(model_key, images):
+        raise RuntimeError("Model failed")
+
+    batcher = MicroBatcher(predict, max_wait_ms=1)
+    future = batcher.submit("model", 1)
+
+    assert isinstance(future.exception(5), RuntimeError)
+    batcher.stop()
+
+
+def test_server_endpoints(tmp_path):
+    """Tests the health and model endpoints, and that invalid uploads are rejected."""
+    os.makedirs(os.path.join(tmp_path, "model_1"))
+    with open(os.path.join(tmp_path, "model_1", "info.json"), "w") as file:
+        file.write("{}")
+
+    server = InferenceServer(("127.0.0.1", 0), models_dir=str(tmp_path))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        with urllib.request.urlopen(url + "/health") as response:
+            assert json.load(response) == {"status": "ok"}
+
+        with urllib.request.urlopen(url + "/models") as response:
+            assert json.load(response) == {"models": ["model_1"]}
+
+        for model, status in [("missing", 404), ("..", 400), ("../model_1", 400), ("model_1/info.json", 400),
+                              (urllib.parse.quote(str(tmp_path / "model_1" / "weights.pt")), 400)]:
+            request = urllib.request.Request(url + "/analyse?model=" + model, data=b"not an image")
+            try:
+                urllib.request.urlopen(request)
+                assert False, "Request should have failed"
+            except urllib.error.HTTPError as e:
+                assert e.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_only_model_names_accepted(tmp_path):
+    """Tests that requested models must be the name of a trained model folder, not a path to a file."""
+    os.makedirs(os.path.join(tmp_path, "model_1"))
+    with open(os.path.join(tmp_path, "model_1", "info.json"), "w") as file:
+        file.write("{}")
+    weights_path = os.path.join(tmp_path, "weights.pt")
+    with open(weights_path, "w") as file:
+        file.write("")
+
+    server = InferenceServer(("127.0.0.1", 0), models_dir=str(tmp_path))
+    try:
+        for model in [weights_path, "weights.pt", "..", ".", "model_1/..", "C:weights.pt"]:
+            try:
+                server.weights_path(model)
+                assert False, f"{model} should not be accepted"
+            except (ValueError, FileNotFoundError):
+                pass
+    finally:
+        server.server_close()
+
+
+def test_invalid_upload_length_rejected(tmp_path, monkeypatch):
+    """Tests that a malformed, negative or oversized Content-Length is rejected without reading the body."""
+    monkeypatch.setattr(inference_server, "MAX_UPLOAD_BYTES", 1024)
+    server = InferenceServer(("127.0.0.1", 0), models_dir=str(tmp_path), default_model="best.pt")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        for length, status in [("abc", 400), ("-5", 400), ("0", 400), ("2048", 413)]:
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+            connection.putrequest("POST", "/analyse")
+            connection.putheader("Content-Length", length)
+            connection.endheaders()
+            response = connection.getresponse()
+            assert response.status == status
+            assert "error" in json.load(response)
+            connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import metamorphic
+
+
+def find_box(image):
+    """Returns the YOLO box around the white pixels in the image."""
+    ys, xs = np.nonzero(image[:, :, 0] > 127)
+    height, width = image.shape[:2]
+    x1, x2, y1, y2 = xs.min(), xs.max() + 1, ys.min(), ys.max() + 1
+    return [0, (x1 + x2) / 2 / width, (y1 + y2) / 2 / height, (x2 - x1) / width, (y2 - y1) / height]
+
+
+@pytest.mark.parametrize("transform_name", metamorphic.DEFAULT_TRANSFORMS)
+def test_boxes_mapped_to_original(transform_name):
+    """Tests that a box found in a transformed image is mapped back to its position in the original image."""
+    image = np.zeros((120, 200, 3), dtype=np.uint8)
+    image[20:50, 40:100] = 255
+    original_box = find_box(image)
+
+    variant = metamorphic.create_variants(image, [transform_name])[0]
+    mapped_box = metamorphic.boxes_to_original(transform_name, [find_box(variant)])[0]
+
+    assert mapped_box == pytest.approx(original_box, abs=0.02)
+
+
+def test_rotate_clockwise_matches_previous_behaviour():
+    """Tests that rotating boxes clockwise gives the same result as the original rotation calculation."""
+    rotated = metamorphic.rotate_boxes_90_clockwise([[0, 0.2, 0.3, 0.1, 0.4]]).tolist()[0]
+    assert rotated == pytest.approx([0, 0.7, 0.2, 0.4, 0.1])
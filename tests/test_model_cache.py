@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import model_cache
+from helpers.model_cache import ModelCache
+
+
+def create_weights(folder, name, size=10):
+    """Creates a fake weights file of the provided size."""
+    path = os.path.join(folder, name)
+    with open(path, "wb") as file:
+        file.write(b"0" * size)
+    return path
+
+
+def test_model_loaded_once(tmp_path):
+    """Tests that requesting the same weights twice only loads them once."""
+    loaded = []
+    cache = ModelCache(loader=lambda path: loaded.append(path) or object())
+    weights = create_weights(tmp_path, "best.pt")
+
+    first = cache.get(weights)
+    second = cache.get(weights)
+
+    assert first is second
+    assert len(loaded) == 1
+
+
+def test_changed_weights_reloaded(tmp_path):
+    """Tests that replacing the weights on disk causes them to be reloaded."""
+    cache = ModelCache(loader=lambda path: object())
+    weights = create_weights(tmp_path, "best.pt")
+
+    first = cache.get(weights)
+    create_weights(tmp_path, "best.pt", size=20)
+    second = cache.get(weights)
+
+    assert first is not second
+    assert len(cache) == 1
+
+
+def test_least_recently_used_evicted(tmp_path):
+    """Tests that the least recently used model is evicted when the cache is full."""
+    cache = ModelCache(max_models=2, loader=lambda path: object())
+    weights_a = create_weights(tmp_path, "a.pt")
+    weights_b = create_weights(tmp_path, "b.pt")
+    weights_c = create_weights(tmp_path, "c.pt")
+
+    cache.get(weights_a)
+    cache.get(weights_b)
+    cache.get(weights_a)
+    cache.get(weights_c)
+
+    assert weights_a in cache
+    assert weights_b not in cache
+    assert weights_c in cache
+
+
+def test_memory_limit_evicts(tmp_path):
+    """Tests that models are evicted when the combined weight size is over the limit."""
+    cache = ModelCache(max_models=5, max_bytes=25, loader=lambda path: object())
+    weights_a = create_weights(tmp_path, "a.pt", size=20)
+    weights_b = create_weights(tmp_path, "b.pt", size=20)
+
+    cache.get(weights_a)
+    cache.get(weights_b)
+
+    assert weights_a not in cache
+    assert weights_b in cache
+
+
+def test_shared_model_calls_serialised(tmp_path):
+    """Tests that threads sharing a cached model take turns to call it, and its attributes are still available."""
+    class FakeModel:
+        names = {0: "defect"}
+        running = 0
+        overlapped = False
+
+        def __call__(self, images):
+            self.running += 1
+            self.overlapped = self.overlapped or self.running > 1
+            time.sleep(0.01)
+            self.running -= 1
+            return images
+
+    cache = ModelCache(loader=lambda path: FakeModel())
+    model = cache.get(create_weights(tmp_path, "best.pt"))
+    threads = [threading.Thread(target=model, args=([number],)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model([1]) == [1]
+    assert model.names == {0: "defect"}
+    assert not model.overlapped
+
+
+def test_loading_does_not_block_other_models(tmp_path):
+    """Tests that a cached model can be returned while another model is loading."""
+    release = threading.Event()
+    loaded = []
+
+    def loader(path):
+        if path.endswith("slow.pt"):
+            release.wait(5)
+        loaded.append(path)
+        return object()
+
+    cache = ModelCache(loader=loader)
+    fast = create_weights(tmp_path, "fast.pt")
+    slow = create_weights(tmp_path, "slow.pt")
+    cache.get(fast)
+
+    slow_threads = [threading.Thread(target=cache.get, args=(slow,)) for _ in range(2)]
+    for thread in slow_threads:
+        thread.start()
+    fast_thread = threading.Thread(target=cache.get, args=(fast,))
+    fast_thread.start()
+    fast_thread.join(2)
+    assert not fast_thread.is_alive()
+
+    release.set()
+    for thread in slow_threads:
+        thread.join(5)
+    assert sorted(loaded) == sorted([fast, slow])
+
+
+def test_failed_load_retried(tmp_path):
+    """Tests that weights which fail to load leave nothing behind, so a later request loads them again."""
+    attempts = []
+
+    def loader(path):
+        attempts.append(path)
+        if len(attempts) == 1:
+            raise RuntimeError("Weights are corrupt")
+        return object()
+
+    cache = ModelCache(loader=loader)
+    weights = create_weights(tmp_path, "best.pt")
+    with pytest.raises(RuntimeError):
+        cache.get(weights)
+    assert not cache._loading
+
+    assert cache.get(weights) is not None
+    assert len(attempts) == 2 and not cache._loading
+
+
+def test_exported_model_preferred(tmp_path, monkeypatch):
+    """Tests that an exported model recorded in info.json is used instead of the PyTorch weights on the CPU."""
+    torch = pytest.importorskip("torch")
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    monkeypatch.setattr(model_cache.importlib.util, "find_spec", lambda name: object())
+
+    os.makedirs(os.path.join(tmp_path, "weights"))
+    weights = create_weights(os.path.join(tmp_path, "weights"), "best.pt")
+    onnx_weights = create_weights(os.path.join(tmp_path, "weights"), "best.onnx")
+    with open(os.path.join(tmp_path, "info.json"), "w") as file:
+        json.dump({"exported_models": {"onnx": os.path.join("weights", "best.onnx")}}, file)
+
+    assert model_cache.fastest_weights_path(weights) == onnx_weights
+
+
+def test_no_exported_model(tmp_path):
+    """Tests that the PyTorch weights are used when the model has not been exported."""
+    os.makedirs(os.path.join(tmp_path, "weights"))
+    weights = create_weights(os.path.join(tmp_path, "weights"), "best.pt")
+    with open(os.path.join(tmp_path, "info.json"), "w") as file:
+        json.dump({"exported_models": {}}, file)
+
+    assert model_cache.fastest_weights_path(weights) == weights
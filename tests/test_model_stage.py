@@ -0,0 +1,182 @@
+import json
+import cv2
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import inference, model_cache
+from stages import test_model
+
+
+class FakeBox:
+    xywhn = np.array([[0.5, 0.5, 0.2, 0.2]])
+
+
+class FakeTensor:
+    def __init__(self, values):
+        self.values = np.array(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class FakeBoxes(list):
+    """A single box in the centre of a 64 x 64 image, in the same format as a YOLO result's boxes."""
+    data = FakeTensor([[25.6, 25.6, 38.4, 38.4, 0.9, 0.0]])
+
+
+class FakeResult:
+    boxes = FakeBoxes([FakeBox()])
+    orig_shape = (64, 64)
+
+
+class FakeModel:
+    """Records the number of images in each call, and finds one box in the centre of every image."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, images, verbose=True, conf=0.25):
+        images = images if isinstance(images, list) else [images]
+        self.calls.append(len(images))
+        return [FakeResult() for _ in images]
+
+
+class FakeModelInfo:
+    starting_model = ""
+    evaluation_result = ""
+    evaluation_metrics = {}
+    metamorphic_test_result = differential_test_result = fuzzing_test_result = ""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_best_pt_path(self):
+        return os.path.join(self.path, "weights", "best.pt")
+
+    def save_to_json(self):
+        pass
+
+
+def create_dataset(folder, image_count=10):
+    """Creates train, val and labels folders, with a centred box annotated in every image."""
+    for subfolder in ("train", "val", "all", "labels"):
+        os.makedirs(os.path.join(folder, subfolder))
+    for index in range(image_count):
+        for subfolder in ("train", "val", "all"):
+            cv2.imwrite(os.path.join(folder, subfolder, f"{subfolder}_{index}.png"),
+                        np.full((64, 64, 3), 100 + index, dtype=np.uint8))
+            with open(os.path.join(folder, "labels", f"{subfolder}_{index}.txt"), "w") as file:
+                file.write("0 0.5 0.5 0.2 0.2\n")
+
+
+def create_trained_model(models_dir, folder_name):
+    """Creates a trained model folder with an info file and fake weights, returning the weights path."""
+    os.makedirs(os.path.join(models_dir, folder_name, "weights"))
+    with open(os.path.join(models_dir, folder_name, "info.json"), "w") as file:
+        json.dump({"name": folder_name, "model": "yolov8n.pt", "date_time_trained": "", "total_training_time": "",
+                   "number_of_images": ""}, file)
+    weights_path = os.path.join(models_dir, folder_name, "weights", "best.pt")
+    with open(weights_path, "wb") as file:
+        file.write(folder_name.encode())
+    return weights_path
+
+
+class FakeFuzzingHarness:
+    """Passes every fuzzing test without starting any processes."""
+
+    def __init__(self, weights_path, mutations):
+        self.mutations = mutations
+        self.memory_limit_enforced = True
+
+    def run(self, image_paths, progress_callback=None, load_image=None):
+        for image_path in image_paths:
+            load_image(image_path)
+        return {mutation: {"tests": len(image_paths), "passed": len(image_paths), "crash": 0, "timeout": 0}
+                for mutation in self.mutations}
+
+
+class FailingFuzzingHarness(FakeFuzzingHarness):
+    """Fails before running any fuzzing tests."""
+
+    def run(self, image_paths, progress_callback=None, load_image=None):
+        raise RuntimeError("Unable to start worker")
+
+
+def run_stage(tmp_path, monkeypatch, models, fuzzing_harness=FakeFuzzingHarness):
+    """Runs the test stage on the newest model, using the provided fake models, and returns the model's info."""
+    loaded = []
+    monkeypatch.setattr(test_model, "FuzzingHarness", fuzzing_harness)
+    monkeypatch.setattr(test_model, "get_model", lambda path: loaded.append(path) or models[path])
+    monkeypatch.setattr(model_cache, "get_model", lambda path: loaded.append(path) or models[path])
+
+    models_dir = os.path.join(tmp_path, "models")
+    model_info = FakeModelInfo(os.path.join(models_dir, "model_2"))
+    stage = test_model.TestModelStage(model_info, str(tmp_path), os.path.join(tmp_path, "labels"),
+                                      os.path.join(tmp_path, "all"), models_dir)
+    progress = []
+    stage.model_testing_progress_bar_signal.connect(progress.append)
+    stage.run()
+
+    # The suites run at the same time, but their combined progress should only increase.
+    assert progress == sorted(progress) and progress[-1] == 100
+    # Each test and validation image is only read once, however many suites use it.
+    image_paths = stage.selected_test_images + inference.list_images(os.path.join(tmp_path, "val"))
+    assert stage.image_cache.read_count == len({os.path.abspath(path) for path in image_paths})
+    return model_info, loaded
+
+
+def test_models_loaded_once_and_batched(tmp_path, monkeypatch):
+    """Tests that each model is loaded once, and the test and validation images are analysed in batches."""
+    create_dataset(tmp_path)
+    previous_weights = create_trained_model(os.path.join(tmp_path, "models"), "model_1")
+    current_weights = create_trained_model(os.path.join(tmp_path, "models"), "model_2")
+    models = {current_weights: FakeModel(), previous_weights: FakeModel()}
+
+    model_info, loaded = run_stage(tmp_path, monkeypatch, models)
+
+    # 2 train, 2 val and 1 of the other images, in batches of 4 images with their 11 variants.
+    # Then the 10 validation images in batches of 8. The suites run at the same time, so the order can vary.
+    assert sorted(loaded) == [previous_weights, current_weights]
+    assert sorted(models[current_weights].calls) == [2, 8, 12, 48]
+    assert models[previous_weights].calls == [8, 2]
+    assert model_info.metamorphic_test_result.startswith("100.0% Matched")
+    assert model_info.evaluation_metrics["mAP_50"] == 1.0
+    assert os.path.exists(os.path.join(model_info.path, "evaluation_per_image.csv"))
+    assert model_info.differential_test_result.startswith("Change in recall of 0.0%")
+    assert model_info.fuzzing_test_result.startswith("100.0% Passed")
+
+
+def test_previous_predictions_reused(tmp_path, monkeypatch):
+    """Tests that the previous model's stored predictions are used, so it is not loaded when tested again."""
+    create_dataset(tmp_path)
+    previous_weights = create_trained_model(os.path.join(tmp_path, "models"), "model_1")
+    current_weights = create_trained_model(os.path.join(tmp_path, "models"), "model_2")
+
+    run_stage(tmp_path, monkeypatch, {current_weights: FakeModel(), previous_weights: FakeModel()})
+    models = {current_weights: FakeModel(), previous_weights: FakeModel()}
+    model_info, loaded = run_stage(tmp_path, monkeypatch, models)
+
+    assert loaded == [current_weights]
+    assert models[previous_weights].calls == []
+    assert model_info.differential_test_result.startswith("Change in recall of 0.0%")
+
+
+def test_failed_suite_recorded(tmp_path, monkeypatch):
+    """Tests that a suite that fails has the error saved as its result, and the other suites' results are kept."""
+    create_dataset(tmp_path)
+    previous_weights = create_trained_model(os.path.join(tmp_path, "models"), "model_1")
+    current_weights = create_trained_model(os.path.join(tmp_path, "models"), "model_2")
+    models = {current_weights: FakeModel(), previous_weights: FakeModel()}
+    saved = []
+    monkeypatch.setattr(FakeModelInfo, "save_to_json", lambda self: saved.append(True))
+
+    model_info, _ = run_stage(tmp_path, monkeypatch, models, FailingFuzzingHarness)
+
+    assert model_info.fuzzing_test_result == "Failed: RuntimeError: Unable to start worker"
+    assert model_info.metamorphic_test_result.startswith("100.0% Matched")
+    assert model_info.differential_test_result.startswith("Change in recall of 0.0%")
+    assert saved == [True]
@@ -0,0 +1,42 @@
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.prediction_store import PredictionStore
+
+
+def create_weights(folder, contents=b"weights"):
+    """Creates fake weights inside a trained model's weights folder."""
+    os.makedirs(os.path.join(folder, "weights"), exist_ok=True)
+    path = os.path.join(folder, "weights", "best.pt")
+    with open(path, "wb") as file:
+        file.write(contents)
+    return path
+
+
+def test_predictions_saved_and_loaded(tmp_path):
+    """Tests that saved predictions are loaded again for the same weights, including images without boxes."""
+    weights = create_weights(tmp_path)
+    store = PredictionStore(weights)
+    store.put("image_a", [[0.1, 0.1, 0.2, 0.2, 0.9, 0], [0.3, 0.3, 0.4, 0.4, 0.5, 1]])
+    store.put("image_b", np.zeros((0, 6)))
+    store.save()
+
+    loaded = PredictionStore(weights)
+
+    assert len(loaded) == 2
+    assert np.allclose(loaded.get("image_a")[:, 4], [0.9, 0.5])
+    assert loaded.get("image_b").shape == (0, 6)
+    assert loaded.get("image_c") is None
+
+
+def test_changed_weights_discard_predictions(tmp_path):
+    """Tests that predictions are discarded when the weights or settings change."""
+    weights = create_weights(tmp_path)
+    store = PredictionStore(weights, {"confidence": 0.001})
+    store.put("image_a", [[0.1, 0.1, 0.2, 0.2, 0.9, 0]])
+    store.save()
+
+    assert len(PredictionStore(weights, {"confidence": 0.25})) == 0
+    create_weights(tmp_path, b"retrained weights")
+    assert len(PredictionStore(weights, {"confidence": 0.001})) == 0
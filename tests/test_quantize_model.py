@@ -0,0 +1,74 @@
+import json
+import os
+import cv2
+import numpy as np
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_classes.model_info import ModelInfo
+from stages import quantize_model
+from stages.quantize_model import QuantizeModelStage
+
+
+def create_stage(tmp_path, exported_models, metrics):
+    """Creates a quantization stage for a model with the provided exports, where evaluating each weights file
+    returns the provided metrics and quantizing only creates an empty INT8 file."""
+    os.makedirs(os.path.join(tmp_path, "model", "weights"))
+    os.makedirs(os.path.join(tmp_path, "images", "val"))
+    cv2.imwrite(os.path.join(tmp_path, "images", "val", "image.png"), np.zeros((20, 20, 3), dtype=np.uint8))
+    for relative_path in exported_models.values():
+        open(os.path.join(tmp_path, "model", relative_path), "w").close()
+
+    model_info = ModelInfo("model", "yolov8n.pt", "", "", "", path=os.path.join(tmp_path, "model"),
+                           exported_models=dict(exported_models), quantize=True, quantization_tolerance=0.01)
+    stage = QuantizeModelStage(model_info, os.path.join(tmp_path, "images"), "dataset.yaml")
+    stage.quantize_onnx = lambda onnx_path, int8_path, images: open(int8_path, "w").close()
+    stage.evaluate = lambda weights_path: metrics[os.path.basename(weights_path)]
+    return stage, model_info
+
+
+def saved_info(model_info):
+    with open(os.path.join(model_info.path, "info.json"), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def test_quantized_model_kept(tmp_path):
+    """Tests that an INT8 model within the accuracy tolerance is recorded as an exported model."""
+    metrics = {"best.onnx": {"mAP_50": 0.9, "mAP_50_95": 0.6, "latency_ms": 40.0},
+               "best_int8.onnx": {"mAP_50": 0.895, "mAP_50_95": 0.59, "latency_ms": 15.0}}
+    stage, model_info = create_stage(tmp_path, {"onnx": os.path.join("weights", "best.onnx")}, metrics)
+
+    stage.run()
+
+    assert model_info.exported_models["onnx_int8"] == os.path.join("weights", "best_int8.onnx")
+    assert os.path.exists(model_info.get_exported_model_path("onnx_int8"))
+    assert model_info.quantization_metrics["kept"] is True
+    assert model_info.quantization_result.startswith("INT8 model kept.")
+    assert saved_info(model_info)["exported_models"]["onnx_int8"] == os.path.join("weights", "best_int8.onnx")
+
+
+def test_quantized_model_discarded(tmp_path):
+    """Tests that an INT8 model that loses too much accuracy is deleted, along with any older INT8 model's record."""
+    metrics = {"best.onnx": {"mAP_50": 0.9, "mAP_50_95": 0.6, "latency_ms": 40.0},
+               "best_int8.onnx": {"mAP_50": 0.85, "mAP_50_95": 0.5, "latency_ms": 15.0}}
+    stage, model_info = create_stage(tmp_path, {"onnx": os.path.join("weights", "best.onnx"),
+                                                "onnx_int8": os.path.join("weights", "best_int8.onnx")}, metrics)
+    int8_path = model_info.get_exported_model_path("onnx_int8")
+
+    stage.run()
+
+    assert "onnx_int8" not in model_info.exported_models
+    assert not os.path.exists(int8_path)
+    assert model_info.quantization_metrics["kept"] is False
+    assert model_info.quantization_result.startswith("INT8 model discarded. mAP50 dropped by 0.0500")
+
+
+def test_export_failed(tmp_path, monkeypatch):
+    """Tests that the failure is recorded and saved if the model cannot be exported to ONNX."""
+    stage, model_info = create_stage(tmp_path, {}, {})
+    monkeypatch.setattr(quantize_model, "export_model", lambda model_info, img_size: [])
+
+    stage.run()
+
+    assert model_info.quantization_result == "Quantization failed: The model could not be exported to ONNX."
+    assert model_info.quantization_metrics == {}
+    assert saved_info(model_info)["quantization_result"] == model_info.quantization_result
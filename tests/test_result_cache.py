@@ -0,0 +1,59 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers import result_cache
+from helpers.result_cache import ResultCache
+
+
+def create_file(folder, name, contents):
+    """Creates a file with the provided contents."""
+    path = os.path.join(folder, name)
+    with open(path, "wb") as file:
+        file.write(contents)
+    return path
+
+
+def test_result_returned_from_cache(tmp_path):
+    """Tests that a stored result is returned for the same image, model and settings."""
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    image = create_file(tmp_path, "image.png", b"image")
+    weights = create_file(tmp_path, "best.pt", b"weights")
+
+    key = cache.key(image, weights, {"tile_settings": None})
+    assert cache.get(key) is None
+
+    cache.put(key, [[1, 2, 3, 4, 0.5, 0]], (100, 200, 3), {0: "0"})
+    detections, orig_shape, names = cache.get(cache.key(image, weights, {"tile_settings": None}))
+
+    assert detections.tolist() == [[1, 2, 3, 4, 0.5, 0]]
+    assert orig_shape == (100, 200)
+    assert names == {0: "0"}
+
+
+def test_key_changes_with_inputs(tmp_path):
+    """Tests that changing the weights, image contents or settings invalidates the cached result."""
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    image = create_file(tmp_path, "image.png", b"image")
+    weights = create_file(tmp_path, "best.pt", b"weights")
+    key = cache.key(image, weights)
+
+    assert cache.key(image, weights, {"tile_settings": {"tile_size": 640}}) != key
+
+    create_file(tmp_path, "best.pt", b"retrained weights")
+    assert cache.key(image, weights) != key
+
+    weights_key = cache.key(image, weights)
+    create_file(tmp_path, "image.png", b"different image")
+    assert cache.key(image, weights) != weights_key
+
+
+def test_model_hashes_limited(tmp_path, monkeypatch):
+    """Tests that only the most recently used model hashes are kept."""
+    monkeypatch.setattr(result_cache, "MAX_MODEL_HASHES", 2)
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    weights = [create_file(tmp_path, f"{name}.pt", name.encode()) for name in ("a", "b", "c")]
+
+    for path in (weights[0], weights[1], weights[0], weights[2]):
+        cache.model_fingerprint(path)
+
+    assert [stat_key[0][0] for stat_key in cache._model_hashes] == [weights[0], weights[2]]
@@ -0,0 +1,40 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.search_index import SearchIndex
+
+
+NAMES = ["Weld_001.png", "weld_002.PNG", "crack_010.jpg", "ok_weld.jpg", "unread.png"]
+DETAILS = {"Weld_001.png": {"label_count": 2}, "weld_002.PNG": {"label_count": 0},
+           "crack_010.jpg": {"label_count": 5}, "ok_weld.jpg": {"label_count": None}}
+
+
+def test_matches_substring_search():
+    """Tests that the index finds the same names as a case insensitive substring search, in the original order."""
+    index = SearchIndex(NAMES)
+
+    for query in ["", "w", "we", "weld", "WELD_00", "eld_0", "010.", ".png", "missing", "d_001.png"]:
+        expected = [position for position, name in enumerate(NAMES) if query.lower() in name.lower()]
+        assert index.search(query) == expected
+
+
+def test_extended_search_narrows_results():
+    """Tests that typing further narrows the previous results, and removing text widens them again."""
+    index = SearchIndex(NAMES)
+
+    assert index.search("wel") == [0, 1, 3]
+    assert index.search("weld_") == [0, 1]
+    assert index.search("weld_00") == [0, 1]
+    assert index.search("wel") == [0, 1, 3]
+
+
+def test_filters_on_details():
+    """Tests that box count and defect filters use the catalog details, and images without details do not match."""
+    index = SearchIndex(NAMES, DETAILS)
+
+    assert index.search("defects:yes") == [0, 2]
+    assert index.search("defects:no") == [1]
+    assert index.search("boxes:>1") == [0, 2]
+    assert index.search("weld boxes:2") == [0]
+    assert index.search("boxes:<5 weld") == [0, 1]
+    assert index.search("boxes:many") == []
@@ -0,0 +1,39 @@
+import os
+import cv2
+import numpy as np
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.thumbnail_cache import ThumbnailCache
+
+
+def test_thumbnails_cached_until_image_changes(tmp_path):
+    """Tests that thumbnails fit the thumbnail size, are stored on disk, and are replaced when the image changes."""
+    image_path = os.path.join(tmp_path, "image.jpg")
+    cv2.imwrite(image_path, np.zeros((300, 400, 3), dtype=np.uint8))
+    cache = ThumbnailCache(os.path.join(tmp_path, "thumbnails"), size=100)
+
+    thumbnail = cache.get(image_path)
+    assert (thumbnail.width(), thumbnail.height()) == (100, 75)
+    first_path = cache.path_for_key(cache.key(image_path))
+    assert os.path.exists(first_path)
+    assert cache.get(image_path).size() == thumbnail.size()
+
+    cv2.imwrite(image_path, np.zeros((400, 200, 3), dtype=np.uint8))
+    thumbnail = cache.get(image_path)
+    assert (thumbnail.width(), thumbnail.height()) == (50, 100)
+    assert cache.path_for_key(cache.key(image_path)) != first_path
+
+    cache.clear()
+    assert not os.path.exists(first_path)
+
+
+def test_unreadable_image(tmp_path):
+    """Tests that unreadable and missing images give a null thumbnail and are not stored."""
+    image_path = os.path.join(tmp_path, "broken.png")
+    with open(image_path, "wb") as file:
+        file.write(b"not an image")
+    cache = ThumbnailCache(os.path.join(tmp_path, "thumbnails"))
+
+    assert cache.get(image_path).isNull()
+    assert cache.get(os.path.join(tmp_path, "missing.png")).isNull()
+    assert not os.path.exists(os.path.join(tmp_path, "thumbnails"))
@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.tiled_inference import detection_settings, generate_tiles, merge_detections, non_max_suppression
+
+
+def test_tiles_cover_image():
+    """Tests that the generated tiles cover every pixel of the image, without extending past its edge."""
+    width, height = 1500, 1000
+    tiles = generate_tiles(width, height, tile_size=640, overlap=0.2)
+
+    covered = [[False] * width for _ in range(height)]
+    for x1, y1, x2, y2 in tiles:
+        assert 0 <= x1 < x2 <= width
+        assert 0 <= y1 < y2 <= height
+        assert x2 - x1 == 640 and y2 - y1 == 640
+        for y in range(y1, y2):
+            covered[y][x1:x2] = [True] * (x2 - x1)
+
+    assert all(all(row) for row in covered)
+
+
+def test_small_image_single_tile():
+    """Tests that an image smaller than the tile size is analysed as a single tile."""
+    assert generate_tiles(300, 200, tile_size=640) == [(0, 0, 300, 200)]
+
+
+def test_non_max_suppression_keeps_highest_score():
+    """Tests that overlapping boxes are reduced to the box with the highest score."""
+    boxes = [[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]]
+    scores = [0.5, 0.9, 0.4]
+
+    assert non_max_suppression(boxes, scores, 0.5, metric="iou") == [1, 2]
+
+
+def test_seam_duplicates_merged():
+    """Tests that a partial box cut by a tile seam is merged into the full box of the same class."""
+    detections = [
+        [100, 100, 200, 200, 0.9, 0],  # Full flaw
+        [150, 100, 200, 200, 0.6, 0],  # The half of the flaw found in the neighbouring tile
+        [150, 100, 200, 200, 0.6, 1],  # A different class is never merged
+    ]
+
+    merged = merge_detections(detections)
+
+    assert len(merged) == 2
+    assert merged[0][4] == 0.9 and merged[0][5] == 0
+    assert merged[1][5] == 1
+
+
+def test_detection_settings_ignore_batch_size():
+    """Tests that the settings used to key cached results do not change with the tile batch size."""
+    settings = {"tile_size": 640, "overlap": 0.2, "batch_size": 8}
+
+    assert detection_settings(settings) == detection_settings({**settings, "batch_size": 32})
+    assert detection_settings(settings) != detection_settings({**settings, "overlap": 0.3})
+    assert detection_settings(None) is None
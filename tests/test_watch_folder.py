@@ -0,0 +1,83 @@
+import json
+import time
+import cv2
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from helpers.watch_folder import FolderWatcher, WatchFolderInspector
+
+
+class FakeBoxes:
+    """Boxes in the same format as a YOLO result, containing a single flaw."""
+    cls = np.array([0.0])
+    conf = np.array([0.9])
+    xywhn = np.array([[0.5, 0.5, 0.2, 0.2]])
+
+
+class FakeResult:
+    boxes = FakeBoxes()
+
+    def __init__(self, image):
+        self.image = image
+
+    def plot(self):
+        return self.image
+
+
+def create_image(folder, name, age_seconds=0):
+    """Saves a small image, with its modification time set age_seconds in the past."""
+    path = os.path.join(folder, name)
+    cv2.imwrite(path, np.zeros((8, 8, 3), dtype=np.uint8))
+    modified = time.time() - age_seconds
+    os.utime(path, (modified, modified))
+    return path
+
+
+def test_existing_images_ready(tmp_path):
+    """Tests that images already in the folder are ready straight away, and are only returned once."""
+    older = create_image(tmp_path, "older.png", age_seconds=20)
+    newer = create_image(tmp_path, "newer.png", age_seconds=10)
+    watcher = FolderWatcher(str(tmp_path), settle_seconds=5)
+
+    assert watcher.poll() == [older, newer]
+    assert watcher.poll() == []
+
+
+def test_changing_image_waits(tmp_path):
+    """Tests that an image is not ready until it has stopped changing for the settle time."""
+    watcher = FolderWatcher(str(tmp_path), settle_seconds=0.2)
+    path = create_image(tmp_path, "arriving.png")
+
+    assert watcher.poll() == []
+    with open(path, "ab") as file:
+        file.write(b"0")
+    assert watcher.poll() == []
+
+    time.sleep(0.3)
+    assert watcher.poll() == [path]
+
+
+def test_inspected_images_skipped(tmp_path):
+    """Tests that verdicts and overlays are written, and images with a verdict are not inspected again."""
+    input_dir = os.path.join(tmp_path, "incoming")
+    output_dir = os.path.join(tmp_path, "inspected")
+    os.makedirs(input_dir)
+    create_image(input_dir, "part.png", age_seconds=10)
+    analysed = []
+
+    def model(images, verbose=False):
+        analysed.extend(images)
+        return [FakeResult(image) for image in images]
+
+    summaries = WatchFolderInspector(model, input_dir, output_dir, settle_seconds=1).inspect_ready_images()
+
+    assert [summary["verdict"] for summary in summaries] == ["Fault Detected"]
+    with open(os.path.join(output_dir, "part.png.json")) as file:
+        assert json.load(file)["box_count"] == 1
+    assert os.path.exists(os.path.join(output_dir, "part_overlay.png"))
+    assert os.path.exists(os.path.join(output_dir, "verdicts.csv"))
+
+    restarted = WatchFolderInspector(model, input_dir, output_dir, settle_seconds=1)
+    assert restarted.inspect_ready_images() == []
+    assert len(analysed) == 1
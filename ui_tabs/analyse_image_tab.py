@@ -1,9 +1,11 @@
 from pathlib import Path
-from PySide6.QtWidgets import QWidget, QLabel, QGridLayout, QPushButton, QMessageBox, QStackedLayout
+from PySide6.QtWidgets import (QWidget, QLabel, QGridLayout, QPushButton, QMessageBox, QStackedLayout,
+                               QLineEdit, QProgressBar, QFrame, QCheckBox, QHBoxLayout)
 from PySide6.QtCore import Signal
+from PySide6.QtGui import QIntValidator
 
 from helpers import file_helpers
-from helpers.image_analysis import ImageAnalysisWorker
+from helpers.image_analysis import ImageAnalysisWorker, BatchImageAnalysisWorker
 from ui_tabs.select_ai_page import SelectAiPage
 from ui_tabs.view_results_page import ViewResultsPage
 
@@ -34,10 +36,63 @@ class AnalyseImageTab(QWidget):
         start_analyse_image_layout.addWidget(selectAIModelButton, 1, 2)
         selectAIModelButton.clicked.connect(self.update_selected_model)
 
+        # Tiled analysis, large images are analysed in overlapping tiles at their native resolution.
+        self.tiled_analysis_checkbox = QCheckBox("Tiled Analysis (Large Images)")
+        self.tiled_analysis_checkbox.toggled.connect(self.toggle_tile_settings)
+        start_analyse_image_layout.addWidget(self.tiled_analysis_checkbox, 2, 0)
+
+        self.tile_size_input = QLineEdit()
+        self.tile_size_input.setValidator(QIntValidator(64, 8192))  # Only allows integers
+        self.tile_size_input.setText("640")
+        self.tile_overlap_input = QLineEdit()
+        self.tile_overlap_input.setValidator(QIntValidator(0, 90))  # Only allows integers
+        self.tile_overlap_input.setText("20")
+
+        tile_settings_layout = QHBoxLayout()
+        tile_settings_layout.setContentsMargins(0, 0, 0, 0)
+        tile_settings_layout.addWidget(QLabel("Tile Size (px)"))
+        tile_settings_layout.addWidget(self.tile_size_input)
+        tile_settings_layout.addWidget(QLabel("Overlap (%)"))
+        tile_settings_layout.addWidget(self.tile_overlap_input)
+        self.tile_settings_widget = QWidget()
+        self.tile_settings_widget.setLayout(tile_settings_layout)
+        self.tile_settings_widget.setDisabled(True)
+        start_analyse_image_layout.addWidget(self.tile_settings_widget, 2, 1, 1, 2)
+
         self.analyseImageButton = QPushButton("Analyse")
-        start_analyse_image_layout.addWidget(self.analyseImageButton, 2, 0, 1, 3)
+        start_analyse_image_layout.addWidget(self.analyseImageButton, 3, 0, 1, 3)
         self.analyseImageButton.clicked.connect(self.start_image_analysis)
 
+        # Divider between single image and folder analysis
+        separator = QFrame()
+        separator.setFrameShape(QFrame.Shape.HLine)
+        separator.setFrameShadow(QFrame.Shadow.Sunken)
+        start_analyse_image_layout.addWidget(separator, 4, 0, 1, 3)
+
+        # Folder analysis, every image in the folder is analysed with the selected model.
+        start_analyse_image_layout.addWidget(QLabel("Batch Size"), 5, 0)
+        self.batch_size_input = QLineEdit()
+        self.batch_size_input.setValidator(QIntValidator(1, 256))  # Only allows integers
+        self.batch_size_input.setText("8")
+        start_analyse_image_layout.addWidget(self.batch_size_input, 5, 1, 1, 2)
+
+        self.analyseFolderButton = QPushButton("Analyse Folder...")
+        start_analyse_image_layout.addWidget(self.analyseFolderButton, 6, 0, 1, 2)
+        self.analyseFolderButton.clicked.connect(self.start_folder_analysis)
+
+        self.cancelFolderButton = QPushButton("Cancel")
+        self.cancelFolderButton.setDisabled(True)
+        start_analyse_image_layout.addWidget(self.cancelFolderButton, 6, 2)
+        self.cancelFolderButton.clicked.connect(self.cancel_folder_analysis)
+
+        self.folder_analysis_progress_bar = QProgressBar()
+        self.folder_analysis_progress_bar.setValue(0)
+        self.folder_analysis_progress_bar.setHidden(True)
+        start_analyse_image_layout.addWidget(self.folder_analysis_progress_bar, 7, 0, 1, 3)
+
+        self.folder_analysis_label = QLabel("")
+        start_analyse_image_layout.addWidget(self.folder_analysis_label, 8, 0, 1, 3)
+
         self.stacked_layout = QStackedLayout()
         start_analyse_image_layout_wrapper_widget = QWidget()
         start_analyse_image_layout_wrapper_widget.setLayout(start_analyse_image_layout)
@@ -75,12 +130,7 @@ class AnalyseImageTab(QWidget):
         self.analyseImageButton.setDisabled(True)
         self.analyseImageButton.setText("Analysing...")
 
-        if (self.selectedAIModelPath == "" or Path(self.selectedAIModelPath).suffix != ".pt"):
-            errorMessage = QMessageBox()
-            errorMessage.setIcon(QMessageBox.Critical)
-            errorMessage.setWindowTitle("Error")
-            errorMessage.setText("Please select a valid AI model.")
-            errorMessage.exec()
+        if not self.is_valid_model_selected():
             self.analyseImageButton.setDisabled(False)
             self.analyseImageButton.setText("Analyse")
             return
@@ -97,10 +147,131 @@ class AnalyseImageTab(QWidget):
             return
 
         # Setup worker and thread
-        self.analyse_image_thread = ImageAnalysisWorker(self.selectedAIModelPath, self.selectedImage)
+        self.analyse_image_thread = ImageAnalysisWorker(self.selectedAIModelPath, self.selectedImage,
+                                                        self.get_tile_settings())
         self.analyse_image_thread.finished_signal.connect(self.analysis_finished)
         self.analyse_image_thread.start()
 
+    def toggle_tile_settings(self, checked):
+        """ Enables the tile settings when tiled analysis is selected. """
+        self.tile_settings_widget.setDisabled(not checked)
+
+    def get_tile_settings(self):
+        """ Returns the tile settings to analyse images with, or None if tiled analysis is not selected.
+            Tiles are analysed in batches of the provided batch size. """
+        if not self.tiled_analysis_checkbox.isChecked():
+            return None
+
+        tile_size = int(self.tile_size_input.text()) if self.tile_size_input.text().isdigit() else 640
+        overlap = int(self.tile_overlap_input.text()) if self.tile_overlap_input.text().isdigit() else 20
+        batch_size = int(self.batch_size_input.text()) if self.batch_size_input.text().isdigit() else 8
+        return {
+            "tile_size": max(64, tile_size),
+            "overlap": min(90, overlap) / 100,
+            "batch_size": max(1, batch_size)
+        }
+
+    def is_valid_model_selected(self):
+        """ Checks for a valid AI path, displaying an error message if one has not been selected. """
+        if (self.selectedAIModelPath == "" or Path(self.selectedAIModelPath).suffix != ".pt"):
+            errorMessage = QMessageBox()
+            errorMessage.setIcon(QMessageBox.Critical)
+            errorMessage.setWindowTitle("Error")
+            errorMessage.setText("Please select a valid AI model.")
+            errorMessage.exec()
+            return False
+        return True
+
+    def start_folder_analysis(self):
+        """ Analyses every image in a selected folder using the selected model, in batches. """
+        if not self.is_valid_model_selected():
+            return
+
+        if not self.batch_size_input.text().isdigit() or int(self.batch_size_input.text()) <= 0:
+            errorMessage = QMessageBox()
+            errorMessage.setIcon(QMessageBox.Critical)
+            errorMessage.setWindowTitle("Error")
+            errorMessage.setText("Please enter a valid batch size.")
+            errorMessage.exec()
+            return
+
+        folder = file_helpers.browse_folder(self, "")
+        if folder == "":
+            return
+
+        self.analyseFolderButton.setDisabled(True)
+        self.analyseFolderButton.setText("Analysing Folder...")
+        self.cancelFolderButton.setDisabled(False)
+        self.cancelFolderButton.setText("Cancel")
+        self.folder_analysis_progress_bar.setValue(0)
+        self.folder_analysis_progress_bar.setHidden(False)
+        self.folder_analysis_label.setText("Loading model...")
+
+        # Setup worker and thread
+        self.analyse_folder_thread = BatchImageAnalysisWorker(self.selectedAIModelPath, folder,
+                                                              int(self.batch_size_input.text()),
+                                                              self.get_tile_settings())
+        self.analyse_folder_thread.progress_signal.connect(self.folder_analysis_progress)
+        self.analyse_folder_thread.finished_signal.connect(self.folder_analysis_finished)
+        self.analyse_folder_thread.start()
+
+    def cancel_folder_analysis(self):
+        """ Stops the folder analysis after the current batch. The images already analysed are still saved. """
+        if hasattr(self, "analyse_folder_thread") and self.analyse_folder_thread.isRunning():
+            self.cancelFolderButton.setDisabled(True)
+            self.cancelFolderButton.setText("Cancelling...")
+            self.analyse_folder_thread.stop()
+
+    def stop_folder_analysis(self):
+        """ Stops the folder analysis and waits for it to finish, without displaying the outcome, e.g. when the
+            program closes. """
+        if hasattr(self, "analyse_folder_thread") and self.analyse_folder_thread.isRunning():
+            self.analyse_folder_thread.finished_signal.disconnect(self.folder_analysis_finished)
+            self.analyse_folder_thread.stop()
+            self.analyse_folder_thread.wait()
+
+    def folder_analysis_progress(self, analysed, total, images_per_second):
+        """ Updates the progress bar and throughput of the folder analysis. """
+        self.folder_analysis_progress_bar.setValue(int(analysed / total * 100) if total else 100)
+        self.folder_analysis_label.setText(f"Analysed {analysed}/{total} images ({images_per_second:.2f} images/s)")
+
+    def folder_analysis_finished(self, summary_path, summaries, error):
+        """ Displays the outcome of the folder analysis and where the summary has been saved.
+            If the analysis stopped because of an error, the error is displayed instead. """
+        self.analyseFolderButton.setDisabled(False)
+        self.analyseFolderButton.setText("Analyse Folder...")
+        self.cancelFolderButton.setDisabled(True)
+        self.cancelFolderButton.setText("Cancel")
+        self.folder_analysis_progress_bar.setHidden(True)
+
+        fault_count = sum(1 for summary in summaries if summary["box_count"] > 0)
+        unreadable_count = sum(1 for summary in summaries if summary["verdict"].startswith("Error"))
+        outcome = f"Faults detected in {fault_count}/{len(summaries)} images."
+        if unreadable_count:
+            outcome += f" {unreadable_count} images could not be read."
+        self.folder_analysis_label.setText(outcome if error == "" else "Folder analysis failed.")
+
+        finishedMessage = QMessageBox()
+        if error == "" and self.analyse_folder_thread.is_cancelled():
+            self.folder_analysis_label.setText(f"Folder analysis cancelled. {outcome}")
+            finishedMessage.setIcon(QMessageBox.Information)
+            finishedMessage.setWindowTitle("Folder Analysis Cancelled")
+            finishedMessage.setText(f"The folder analysis was cancelled.\n{outcome}\nSummary saved to {summary_path}"
+                                    if summary_path != "" else "The folder analysis was cancelled.")
+        elif error == "":
+            finishedMessage.setIcon(QMessageBox.Information)
+            finishedMessage.setWindowTitle("Folder Analysed")
+            finishedMessage.setText(f"{outcome}\nSummary saved to {summary_path}" if summary_path != ""
+                                    else "No images were found in the folder.")
+        else:
+            finishedMessage.setIcon(QMessageBox.Critical)
+            finishedMessage.setWindowTitle("Error")
+            message = f"The folder analysis stopped because of an error:\n{error}"
+            if summary_path != "":
+                message += f"\n\nThe {len(summaries)} images analysed are saved in {summary_path}"
+            finishedMessage.setText(message)
+        finishedMessage.exec()
+
     def analysis_finished(self, results):
         """ Displays the view results page. """
         self.analyseImageButton.setDisabled(False)
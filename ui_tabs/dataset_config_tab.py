@@ -4,6 +4,7 @@ from PySide6.QtWidgets import (QWidget, QGridLayout,
 import os
 from data_classes.image_item_container import ImageItemContainer
 from helpers import file_helpers
+from helpers.catalog import Catalog
 from ui_tabs.create_dataset import CreateDatasetConfig
 from ui_tabs.edit_config import EditConfig
 from ui_tabs.view_dataset import ViewDataset
@@ -24,6 +25,7 @@ class DatasetConfigTab(QWidget):
         self.dataset_config_dir = os.path.join(data_dir, "datasets")
         self.image_dir = os.path.join(data_dir, "images", "raw")
         self.annotation_dir = os.path.join(data_dir, "labels", "raw")
+        self.catalog = Catalog(data_dir)
 
         # Init values
         self.image_files = []
@@ -69,6 +71,10 @@ class DatasetConfigTab(QWidget):
         self.view_config_stacked_layout.setCurrentIndex(0)
         self.main_stacked_layout.setCurrentIndex(0)
 
+    def close_catalog(self):
+        """ Closes the catalog's database connection, when the program closes. """
+        self.catalog.close()
+
     def set_column_count(self, count):
         """ Updates the grid view to the current width of the window. """
         if count != self.column_count:
@@ -84,7 +90,9 @@ class DatasetConfigTab(QWidget):
         if self.dataset_config_combobox.count() != 0:
             self.dataset_config_combobox.clear()
 
-        datasets = [os.path.splitext(f)[0] for f in os.listdir(dataset_dir) if f.endswith(".txt")]
+        # Configs created or edited since they were last loaded are imported into the catalog.
+        self.catalog.import_configs()
+        datasets = self.catalog.config_names()
         self.combobox_items = ["All Images"]
         self.combobox_items.extend(datasets)
         self.dataset_config_combobox.addItems(self.combobox_items)
@@ -92,7 +100,9 @@ class DatasetConfigTab(QWidget):
 
     def load_images(self):
         """ Loads the images to be added to the list of item containers """
-        self.image_files = [f for f in os.listdir(self.image_dir) if f.endswith(('.jpg', '.png', '.PNG', '.JPG'))]
+        self.catalog.refresh()
+        self.image_files = self.catalog.image_names()
+        self.image_details = self.catalog.all_image_details()
 
         self.list_of_item_containers = []
         self.filtered_list = []
@@ -115,6 +125,8 @@ class DatasetConfigTab(QWidget):
         backButton.pressed.connect(self.reset_layout)
         self.view_image_layout.addWidget(backButton, 0, 0)
         self.img_viewer_widget = ImageViewer(img_path, annotation_path, file_name)
+        # The catalog only reads the folders again when files are added or removed, so edits are recorded here.
+        self.img_viewer_widget.save_finished_signal.connect(lambda: self.catalog.add_image(os.path.basename(img_path)))
         self.img_viewer_widget.save_finished_signal.connect(self.reset_layout)
         self.img_viewer_widget.delete_image_signal.connect(self.delete_image)
         self.view_image_layout.addWidget(self.img_viewer_widget)
@@ -177,7 +189,8 @@ class DatasetConfigTab(QWidget):
                 file_helpers.delete_file(annotation_path)
                 if colour_path != "":
                     file_helpers.delete_file(colour_path)
-                file_helpers.remove_filename_from_configs(img_name, self.dataset_config_dir)
+                # Only the configs containing the image are changed.
+                self.catalog.remove_image(img_name)
                 break
 
         if self.current_config:
@@ -221,7 +234,8 @@ class DatasetConfigTab(QWidget):
             if index == 0:
                 self.edit_config_button.setHidden(True)
                 self.delete_config_button.setHidden(True)
-                self.current_config = ViewDataset(self.list_of_item_containers, annotation_dir=self.annotation_dir)
+                self.current_config = ViewDataset(self.list_of_item_containers, annotation_dir=self.annotation_dir,
+                                                  image_details=self.image_details)
             # Display items from selected config
             else:
                 self.edit_config_button.setHidden(False)
@@ -229,7 +243,8 @@ class DatasetConfigTab(QWidget):
                 selected_file = self.combobox_items[index]
                 config_path = os.path.join(self.dataset_config_dir, selected_file + ".txt")
                 self.current_config = ViewDataset(self.list_of_item_containers,
-                                                  annotation_dir=self.annotation_dir, dataset_file_path=config_path)
+                                                  annotation_dir=self.annotation_dir, dataset_file_path=config_path,
+                                                  image_details=self.image_details)
 
             self.current_config.set_column_count(self.column_count)
             self.view_config_stacked_layout.addWidget(self.current_config)
@@ -263,8 +278,10 @@ class DatasetConfigTab(QWidget):
 
             file_helpers.create_file_empty_txt(txt_destination_path)
 
+        self.catalog.add_image(safe_image_file_name)
+        self.image_details[safe_image_file_name] = self.catalog.image_details(safe_image_file_name)
         if path_to_config != "":
-            file_helpers.add_new_img(path_to_config, file_name_without_ext)
+            self.catalog.add_to_config(os.path.splitext(os.path.basename(path_to_config))[0], safe_image_file_name)
 
         self.append_images(safe_image_file_name)
         self.current_config.update_images(self.list_of_item_containers)
@@ -299,7 +316,6 @@ class DatasetConfigTab(QWidget):
                 return
 
             config_to_be_delete_name = self.combobox_items[combo_box_current_index]
-            config_to_be_delete_path = os.path.join(self.dataset_config_dir, config_to_be_delete_name + ".txt")
-            file_helpers.delete_file(config_to_be_delete_path)
+            self.catalog.delete_config(config_to_be_delete_name)
 
             self.update_dataset_configs(self.dataset_config_dir)
@@ -3,6 +3,7 @@ from PySide6.QtCore import Signal
 from data_classes.edit_config_item_container import EditConfigItemContainer
 from data_classes.image_item_container import ImageItemContainer
 from helpers import file_helpers
+from helpers.dataset_index import DatasetConfigIndex
 
 from ui_tabs.view_dataset import ViewDataset
 
@@ -19,12 +20,12 @@ class EditConfig(QWidget):
         self.list_of_image_containers = list_of_image_containers
         self.unsaved_changes = False
 
-        self.selected_files = file_helpers.read_config_file(self.path_to_config)
+        self.config_index = DatasetConfigIndex.from_file(self.path_to_config)
 
         # Converted images feature an add and remove button as well as the original image.
         self.converted_image_containers = [
             EditConfigItemContainer(
-                item, item.get_label_text() in self.selected_files
+                item, item.get_label_text() in self.config_index
             )
             for item in self.list_of_image_containers
         ]
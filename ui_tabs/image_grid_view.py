@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize
+from PySide6.QtGui import QColor, QPixmap
+from helpers.thumbnail_cache import ThumbnailLoader, THUMBNAIL_SIZE
+
+FRAME_SIZE = 110
+CELL_WIDTH = 130
+NAME_HEIGHT = 20
+BUTTON_HEIGHT = 26
+MAX_CACHED_THUMBNAILS = 1000
+PLACEHOLDER_COLOUR = "#d0d0d0"
+
+
+class ImageListModel(QAbstractListModel):
+    """ Provides a list of image item containers to an ImageGridView. Thumbnails are only requested when an image is
+        drawn, and are loaded in the background, with a placeholder shown until they arrive. The most recently
+        drawn thumbnails are kept in memory, so memory use does not depend on the number of images. """
+    ItemRole = Qt.UserRole + 1
+
+    def __init__(self, items=None, parent=None, thumbnail_loader=None):
+        super().__init__(parent)
+        self.items = []
+        self.rows = {}  # image path -> row, to update an image when its thumbnail arrives
+        self.thumbnails = OrderedDict()  # image path -> scaled QPixmap
+        self.placeholder = None
+        self.thumbnail_loader = thumbnail_loader or ThumbnailLoader(parent=self)
+        self.thumbnail_loader.thumbnail_ready.connect(self.thumbnail_ready)
+        self.set_items(items or [])
+
+    def set_items(self, items):
+        """ Replaces the displayed items. Thumbnails requested for the previous items which have not started loading
+            are dropped. """
+        self.thumbnail_loader.cancel()
+        self.beginResetModel()
+        self.items = list(items)
+        self.rows = {item.img_path: row for row, item in enumerate(self.items)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.items):
+            return None
+        item = self.items[index.row()]
+        if role == Qt.DisplayRole:
+            return item.get_label_text()
+        if role == Qt.DecorationRole:
+            return self.thumbnail(item.img_path)
+        if role == self.ItemRole:
+            return item
+        return None
+
+    def thumbnail(self, image_path):
+        """ Returns the image's thumbnail, or a placeholder while it is loaded. """
+        pixmap = self.thumbnails.get(image_path)
+        if pixmap is not None:
+            self.thumbnails.move_to_end(image_path)
+            return pixmap
+
+        self.thumbnail_loader.request(image_path)
+        if self.placeholder is None:
+            self.placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+            self.placeholder.fill(QColor(PLACEHOLDER_COLOUR))
+        return self.placeholder
+
+    def thumbnail_ready(self, image_path, image):
+        """ Stores a loaded thumbnail and redraws its image. Images which could not be read are shown empty. """
+        self.thumbnails[image_path] = QPixmap.fromImage(image)
+        if len(self.thumbnails) > MAX_CACHED_THUMBNAILS:
+            self.thumbnails.popitem(last=False)
+
+        row = self.rows.get(image_path)
+        if row is not None:
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class ImageItemDelegate(QStyledItemDelegate):
+    """ Draws an image's thumbnail in a box with its file name below it. Items being added to or removed from a
+        config also have an add or remove button below the name. """
+
+    def has_button(self, index):
+        return getattr(index.data(ImageListModel.ItemRole), "is_in_current_config", None) is not None
+
+    def sizeHint(self, option, index):
+        return QSize(CELL_WIDTH, FRAME_SIZE + NAME_HEIGHT + (BUTTON_HEIGHT if self.has_button(index) else 0) + 10)
+
+    @staticmethod
+    def frame_rect(cell_rect):
+        return QRect(cell_rect.x() + (cell_rect.width() - FRAME_SIZE) // 2, cell_rect.y() + 4, FRAME_SIZE,
+                     FRAME_SIZE)
+
+    @staticmethod
+    def button_rect(cell_rect):
+        return QRect(cell_rect.x() + (cell_rect.width() - FRAME_SIZE) // 2,
+                     cell_rect.y() + 4 + FRAME_SIZE + NAME_HEIGHT, FRAME_SIZE, BUTTON_HEIGHT - 4)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        frame = self.frame_rect(option.rect)
+        if option.state & QStyle.State_MouseOver:
+            painter.fillRect(frame, option.palette.alternateBase())
+        painter.setPen(option.palette.text().color())
+        painter.drawRect(frame.adjusted(0, 0, -1, -1))
+
+        pixmap = index.data(Qt.DecorationRole)
+        if pixmap is not None and not pixmap.isNull():
+            painter.drawPixmap(frame.x() + (FRAME_SIZE - pixmap.width()) // 2,
+                               frame.y() + (FRAME_SIZE - pixmap.height()) // 2, pixmap)
+
+        name_rect = QRect(frame.x(), frame.bottom() + 1, FRAME_SIZE, NAME_HEIGHT)
+        name = option.fontMetrics.elidedText(index.data(Qt.DisplayRole), Qt.ElideMiddle, FRAME_SIZE)
+        painter.drawText(name_rect, Qt.AlignCenter, name)
+
+        if self.has_button(index):
+            in_config = index.data(ImageListModel.ItemRole).is_in_current_config
+            button = self.button_rect(option.rect)
+            painter.fillRect(button, QColor("red") if in_config else QColor("green"))
+            painter.setPen(QColor("white"))
+            painter.drawText(button, Qt.AlignCenter, "Remove" if in_config else "Add")
+        painter.restore()
+
+
+class ImageGridView(QListView):
+    """ A scrollable grid of image thumbnails, which only draws the images on screen.
+        Clicking an image opens it, and clicking an add or remove button toggles the image's config membership. """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image_model = ImageListModel(parent=self)
+        self.delegate = ImageItemDelegate(self)
+        self.setModel(self.image_model)
+        self.setItemDelegate(self.delegate)
+
+        self.setViewMode(QListView.IconMode)
+        self.setResizeMode(QListView.Adjust)  # Wraps the images to the width of the view
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)  # Only the first item is measured, so layout does not depend on image count
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setMouseTracking(True)
+        self.setSpacing(4)
+
+    def set_items(self, items):
+        self.image_model.set_items(items)
+
+    def mouseReleaseEvent(self, event):
+        position = event.position().toPoint()
+        index = self.indexAt(position)
+        if index.isValid() and event.button() == Qt.LeftButton:
+            item = index.data(ImageListModel.ItemRole)
+            cell = self.visualRect(index)
+            if self.delegate.has_button(index) and self.delegate.button_rect(cell).contains(position):
+                item.toggle_visible()
+            elif self.delegate.frame_rect(cell).contains(position):
+                item.open()
+            event.accept()
+            return
+        super().mouseReleaseEvent(event)
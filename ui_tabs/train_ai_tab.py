@@ -2,9 +2,9 @@ import re
 import threading
 from PySide6.QtWidgets import (QWidget, QVBoxLayout,
                                QLabel, QGridLayout, QPushButton, QLineEdit, QComboBox,
-                               QStackedLayout, QFrame, QMessageBox, QProgressBar, QTextEdit)
+                               QStackedLayout, QFrame, QMessageBox, QProgressBar, QTextEdit, QCheckBox)
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QIntValidator
+from PySide6.QtGui import QIntValidator, QDoubleValidator
 from data_classes.model_info import ModelInfo
 from stages.main_train_pipeline import MainTrainPipeline
 from helpers import file_helpers
@@ -99,6 +99,14 @@ class TrainAiTab(QWidget):
         self.epoch_num_input.setValidator(QIntValidator())  # Only allows integers
         self.epoch_num_input.setText("50")
 
+        # Quantization
+        self.quantize_checkbox = QCheckBox("Create INT8 Model for Faster CPU Analysis")
+        self.quantization_tolerance_input = QLineEdit()
+        self.quantization_tolerance_input.setValidator(QDoubleValidator(0.0, 1.0, 4))  # Only allows decimals
+        self.quantization_tolerance_input.setText("0.01")
+
+        self.reshuffle_checkbox = QCheckBox("Reshuffle Training and Validation Images")
+
         # Layouts
         new_ai_model_layout = QGridLayout()
         start_train_ai_layout = QGridLayout()
@@ -129,6 +137,15 @@ class TrainAiTab(QWidget):
         new_ai_model_layout.addWidget(QLabel("Epoch:"), 5, 0)
         new_ai_model_layout.addWidget(self.epoch_num_input, 5, 1)
 
+        new_ai_model_layout.addWidget(QLabel("Quantization:"), 6, 0)
+        new_ai_model_layout.addWidget(self.quantize_checkbox, 6, 1)
+
+        new_ai_model_layout.addWidget(QLabel("Max mAP50 Drop When Quantizing:"), 7, 0)
+        new_ai_model_layout.addWidget(self.quantization_tolerance_input, 7, 1)
+
+        new_ai_model_layout.addWidget(QLabel("Data Split:"), 8, 0)
+        new_ai_model_layout.addWidget(self.reshuffle_checkbox, 8, 1)
+
         # Init main layout
         start_train_ai_layout.addWidget(QLabel("Train New AI"), 0, 0, 1, 2, Qt.AlignmentFlag.AlignHCenter)
         start_train_ai_layout.addLayout(new_ai_model_layout, 1, 0, new_ai_model_layout.rowCount(), 2)
@@ -293,7 +310,12 @@ class TrainAiTab(QWidget):
     def start_ai_train(self):
         """ Starts the AI training process. """
         # Check for valid parameters.
-        if (self.ai_name_input.text() == "" or not
+        try:
+            quantization_tolerance = float(self.quantization_tolerance_input.text())
+        except ValueError:
+            quantization_tolerance = -1
+
+        if (self.ai_name_input.text() == "" or quantization_tolerance < 0 or not
                 self.epoch_num_input.text().isdigit() or int(self.epoch_num_input.text()) <= 0):
 
             error_message = QMessageBox()
@@ -328,7 +350,10 @@ class TrainAiTab(QWidget):
                                     epoch=self.epoch_num_input.text(),
                                     dataset_config=self.config_combobox_items[
                                         self.config_selector_combobox.currentIndex()],
-                                    starting_model=self.selected_starting_model)
+                                    starting_model=self.selected_starting_model,
+                                    quantize=self.quantize_checkbox.isChecked(),
+                                    quantization_tolerance=quantization_tolerance,
+                                    reshuffle_dataset=self.reshuffle_checkbox.isChecked())
 
         # Create the training pipeline and its connections.
         self.pipeline = MainTrainPipeline(self, self.model_info)
@@ -1,18 +1,23 @@
 from typing import List
 from PySide6.QtWidgets import (QWidget, QGridLayout,
-                               QScrollArea, QStackedLayout, QPushButton,
+                               QStackedLayout, QPushButton,
                                QLineEdit)
-from PySide6.QtCore import Signal
+from PySide6.QtCore import Signal, QTimer
 from data_classes.image_item_container import ImageItemContainer
-from helpers import file_helpers
+from helpers.dataset_index import DatasetConfigIndex
+from helpers.search_index import SearchIndex
+from ui_tabs.image_grid_view import ImageGridView
+
+SEARCH_DELAY_MS = 150  # The search waits until typing pauses for this long.
 
 
 class ViewDataset(QWidget):
     add_image_signal = Signal(str)
 
     def __init__(self, image_item_containers: List[ImageItemContainer], editable=True, annotation_dir=None,
-                 dataset_file_path=None, column_count=3):
-        """ View to browse and edit YOLO dataset """
+                 dataset_file_path=None, column_count=3, image_details=None):
+        """ View to browse and edit YOLO dataset.
+            image_details are the catalog's details of each image, by name, which can be used to filter the search. """
 
         super().__init__()
         self.stacked_layout = QStackedLayout()
@@ -21,21 +26,24 @@ class ViewDataset(QWidget):
         self.annotation_dir = annotation_dir
         self.list_of_item_containers = image_item_containers
         self.column_count = column_count
+        self.image_details = image_details
+        self.search_index = None  # Built when it is first needed, and whenever the images change.
 
         # Dataset filtering
         self.dataset_file_path = dataset_file_path
 
-        # Scrollable Thumbnail Grid
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)  # Ensures the content resizes properly
-        self.grid_container = QWidget()
-        self.grid_layout = QGridLayout(self.grid_container)
-        self.scroll_area.setWidget(self.grid_container)
+        # Scrollable Thumbnail Grid, which only draws the images on screen
+        self.image_grid = ImageGridView()
 
         # Search Function
         self.search_bar = QLineEdit()
-        self.search_bar.setPlaceholderText("Search...")
-        self.search_bar.textChanged.connect(self.filter_images)
+        self.search_bar.setPlaceholderText("Search... (e.g. boxes:>2 or defects:no)" if image_details is not None
+                                           else "Search...")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.filter_images)
+        self.search_bar.textChanged.connect(self.search_timer.start)
 
         # Buttons
         self.add_new_image_button = QPushButton("Add New Image")
@@ -48,7 +56,7 @@ class ViewDataset(QWidget):
         self.images_grid_layout.addWidget(self.search_bar, 0, 0)
         self.images_grid_layout.addWidget(self.add_new_image_button, 0, 1)
         self.images_grid_layout.addWidget(self.refresh_button, 0, 2)
-        self.images_grid_layout.addWidget(self.scroll_area, 1, 0, 1, 3)
+        self.images_grid_layout.addWidget(self.image_grid, 1, 0, 1, 3)
         self.images_grid_layout_wrapper = QWidget()
         self.images_grid_layout_wrapper.setLayout(self.images_grid_layout)
 
@@ -70,45 +78,30 @@ class ViewDataset(QWidget):
     def filter_images_for_config(self):
         """ If a config has been provided, it is loaded and used to filter the loaded images. """
         if self.dataset_file_path is not None:
-            self.selected_files = file_helpers.read_config_file(self.dataset_file_path)
-            self.filtered_list = [
-                img for img in self.all_containers
-                if any(self.compare_name_to_search(img, filename)
-                       for filename in self.selected_files)
-            ]
+            self.config_index = DatasetConfigIndex.from_file(self.dataset_file_path)
+            self.filtered_list = self.config_index.filter(self.all_containers, key=lambda img: img.get_label_text())
 
             self.list_of_item_containers = self.filtered_list
+        self.search_index = None
 
     def filter_images(self):
         """Filters the images based on the contents of the search box"""
-        self.filtered_list = []
+        self.search_timer.stop()
+        if self.search_index is None:
+            self.search_index = SearchIndex([img.get_label_text() for img in self.list_of_item_containers],
+                                            self.image_details)
 
-        self.filtered_list = [img for img in self.list_of_item_containers
-                              if self.compare_name_to_search(img, self.search_bar.text())]
+        self.filtered_list = [self.list_of_item_containers[index]
+                              for index in self.search_index.search(self.search_bar.text())]
         self.update_grid()
 
-    def compare_name_to_search(self, img, search_string):
-        """Check if the last item is a QLabel and contains the provided string."""
-        img_label = img.get_label_text()
-        return search_string.lower() in img_label.lower()  # Check contains the search string
-
     def set_column_count(self, count):
-        """Update column count and refresh the grid."""
-        if count != self.column_count:
-            self.column_count = max(1, count)
-            self.update_grid()
+        """Update column count. The grid wraps the images to its width, so it does not need to be rebuilt."""
+        self.column_count = max(1, count)
 
     def update_grid(self):
-        """Clear and repopulate the grid with images based on current column count."""
-        # Clear previous items
-        for i in reversed(range(self.grid_layout.count())):
-            self.grid_layout.itemAt(i).widget().setParent(None)
-
-        # Re-add images based on new column count
-        for index, widget in enumerate(self.filtered_list):
-            row = index // self.column_count
-            col = index % self.column_count
-            self.grid_layout.addWidget(widget, row, col)
+        """Shows the filtered images in the grid."""
+        self.image_grid.set_items(self.filtered_list)
 
     def add_image(self):
         """ Emits the add image signal """
@@ -117,6 +110,7 @@ class ViewDataset(QWidget):
     def refresh(self):
         """ Refreshes the images on the page. """
         self.search_bar.setText("")
+        self.search_index = None
         if self.dataset_file_path is not None:
             self.filter_images_for_config()
         self.filter_images()
@@ -124,5 +118,6 @@ class ViewDataset(QWidget):
     def update_images(self, list_of_item_containers):
         """ Updates the images on the page with the provided images. """
         self.all_containers = list_of_item_containers
+        self.search_index = None
         self.filter_images_for_config()
         self.filter_images()
@@ -76,13 +76,21 @@ class ViewModelsTab(QWidget):
         self.fuzzing_test_result_label = QLabel("")
         self.setup_details_grid(details_layout, "Fuzzing Test Results: ", self.fuzzing_test_result_label, 17)
 
+        self.evaluation_result_label = QLabel("")
+        self.evaluation_result_label.setWordWrap(True)
+        self.setup_details_grid(details_layout, "Validation Set Evaluation: ", self.evaluation_result_label, 18)
+
+        self.quantization_result_label = QLabel("")
+        self.quantization_result_label.setWordWrap(True)
+        self.setup_details_grid(details_layout, "Quantization Results: ", self.quantization_result_label, 19)
+
         self.results_image = QLabel(self)
-        details_layout.addWidget(QLabel("Results Image: "), 18, 0, 1, 2)
-        details_layout.addWidget(self.results_image, 18, 0, 1, 2)
+        details_layout.addWidget(QLabel("Results Image: "), 20, 0, 1, 2)
+        details_layout.addWidget(self.results_image, 20, 0, 1, 2)
 
         self.delete_model_button = QPushButton("Delete Selected Model")
         self.delete_model_button.pressed.connect(self.delete_selected_model)
-        details_layout.addWidget(self.delete_model_button, 19, 0, 1, 2)
+        details_layout.addWidget(self.delete_model_button, 21, 0, 1, 2)
 
         details_layout.setAlignment(Qt.AlignHCenter)
 
@@ -128,6 +136,8 @@ class ViewModelsTab(QWidget):
         self.metamorphic_test_result_label.setText(str(model.metamorphic_test_result))
         self.differential_test_result_label.setText(str(model.differential_test_result))
         self.fuzzing_test_result_label.setText(str(model.fuzzing_test_result))
+        self.evaluation_result_label.setText(str(model.evaluation_result))
+        self.quantization_result_label.setText(str(model.quantization_result))
 
         pixmap = model.get_results_png().scaled(800, 400)
         self.results_image.setPixmap(pixmap)
@@ -151,6 +161,8 @@ class ViewModelsTab(QWidget):
         self.metamorphic_test_result_label.setText("")
         self.differential_test_result_label.setText("")
         self.fuzzing_test_result_label.setText("")
+        self.evaluation_result_label.setText("")
+        self.quantization_result_label.setText("")
         self.results_image.clear()
 
         self.selected_model = ""
@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import sys
+
+"""
+Xray is the headless command line interface to the system. It runs the same analysis as the GUI,
+without creating a QApplication or importing any of the UI, so it can be used on servers, in scheduled jobs
+and in shell pipelines.
+
+Examples:
+    python -m xray analyse --model model_20250101_120000 images/ extra_image.png "more/**/*.jpg"
+    python -m xray watch --model model_20250101_120000 incoming/ inspected/
+    python -m xray serve --port 8000 --max_batch_size 8 --max_wait_ms 20
+"""
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from helpers import inference
+
+
+def analyse_command(args):
+    """ Analyses the provided images, and writes the results as JSON or CSV. """
+    image_paths = inference.collect_images(args.inputs)
+    if not image_paths:
+        print("No images found.", file=sys.stderr)
+        return 1
+
+    # The model is only loaded once the inputs are known to be valid, as importing YOLO is slow.
+    from helpers.model_cache import get_model
+    model = get_model(inference.resolve_weights_path(args.model))
+
+    tile_settings = None
+    if args.tiled:
+        tile_settings = {"tile_size": args.tile_size, "overlap": args.overlap, "batch_size": args.batch_size}
+
+    from helpers.inference_pipeline import LoadError, StageTimings
+    timings = StageTimings()
+    results = []
+    failed = 0
+    for image_path, result in inference.analyse_images(model, image_paths, args.batch_size, tile_settings,
+                                                       workers=args.workers, timings=timings):
+        # Images that cannot be read are reported, and listed in the results with an error verdict.
+        if isinstance(result, LoadError):
+            failed += 1
+            print(f"Error: {result}", file=sys.stderr)
+        results.append(inference.result_to_dict(image_path, result))
+
+    if args.timings:
+        print(json.dumps(timings.summary()), file=sys.stderr)
+
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            inference.write_summary_rows(results, output)
+        else:
+            json.dump(results, output, indent=4)
+            output.write("\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if failed else 0
+
+
+def serve_command(args):
+    """ Starts the local HTTP inference server. """
+    from helpers.inference_server import serve
+    serve(args.host, args.port, models_dir=args.models_dir, max_batch_size=args.max_batch_size,
+          max_wait_ms=args.max_wait_ms, default_model=args.model)
+    return 0
+
+
+def watch_command(args):
+    """ Inspects images as they are saved into the input folder, until interrupted. """
+    if not os.path.isdir(args.input_dir):
+        raise FileNotFoundError(f"Folder not found: {args.input_dir}")
+
+    from helpers.model_cache import get_model
+    from helpers.watch_folder import WatchFolderInspector
+    model = get_model(inference.resolve_weights_path(args.model))
+
+    tile_settings = None
+    if args.tiled:
+        tile_settings = {"tile_size": args.tile_size, "overlap": args.overlap, "batch_size": args.batch_size}
+
+    inspector = WatchFolderInspector(model, args.input_dir, args.output_dir, args.batch_size, tile_settings,
+                                     settle_seconds=args.settle_seconds, poll_interval=args.poll_interval)
+
+    def report(summary):
+        print(f"{summary['image']}: {summary['verdict']} ({summary['box_count']} flaws, "
+              f"highest confidence {summary['max_confidence']})", flush=True)
+
+    print(f"Watching {args.input_dir} for images. Press Ctrl+C to stop.", flush=True)
+    try:
+        inspector.run(report)
+    except KeyboardInterrupt:
+        print("Stopping...")
+    return 0
+
+
+def positive_int(value):
+    """ Argument type for sizes, which must be a whole number above 0. """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value} is not a whole number")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} must be greater than 0")
+    return number
+
+
+def overlap_fraction(value):
+    """ Argument type for the tile overlap, which must be at least 0 and less than 1, so tiles always move forward. """
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value} is not a number")
+    if not 0 <= number < 1:
+        raise argparse.ArgumentTypeError(f"{value} must be at least 0 and less than 1")
+    return number
+
+
+def create_parser():
+    """ Creates the argument parser for each of the commands. """
+    parser = argparse.ArgumentParser(prog="xray", description="Headless X-Ray image analysis.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyse_parser = subparsers.add_parser("analyse", help="Analyse images for faults.")
+    analyse_parser.add_argument("inputs", nargs="+", help="Image files, glob patterns or directories.")
+    analyse_parser.add_argument("--model", required=True,
+                                help="Weights file, trained model folder or trained model folder name.")
+    analyse_parser.add_argument("--format", choices=["json", "csv"], default="json")
+    analyse_parser.add_argument("--output", help="File to write the results to. Defaults to stdout.")
+    analyse_parser.add_argument("--batch_size", type=int, default=8)
+    analyse_parser.add_argument("--tiled", action="store_true",
+                                help="Analyse images in tiles at their native resolution.")
+    analyse_parser.add_argument("--tile_size", type=positive_int, default=640)
+    analyse_parser.add_argument("--overlap", type=overlap_fraction, default=0.2,
+                                help="Fraction of each tile shared with the next, at least 0 and less than 1.")
+    analyse_parser.add_argument("--workers", type=int, default=None,
+                                help="Number of threads decoding images while the model runs.")
+    analyse_parser.add_argument("--timings", action="store_true",
+                                help="Print the time spent in each stage of the analysis to stderr.")
+    analyse_parser.set_defaults(func=analyse_command)
+
+    watch_parser = subparsers.add_parser("watch", help="Analyse images as they are saved into a folder.")
+    watch_parser.add_argument("input_dir", help="Folder the X-Ray machine saves images into.")
+    watch_parser.add_argument("output_dir", help="Folder to write the verdicts and annotated images to.")
+    watch_parser.add_argument("--model", required=True,
+                              help="Weights file, trained model folder or trained model folder name.")
+    watch_parser.add_argument("--batch_size", type=int, default=8)
+    watch_parser.add_argument("--tiled", action="store_true",
+                              help="Analyse images in tiles at their native resolution.")
+    watch_parser.add_argument("--tile_size", type=positive_int, default=640)
+    watch_parser.add_argument("--overlap", type=overlap_fraction, default=0.2,
+                              help="Fraction of each tile shared with the next, at least 0 and less than 1.")
+    watch_parser.add_argument("--settle_seconds", type=float, default=1.0,
+                              help="How long an image must be unchanged before it is analysed.")
+    watch_parser.add_argument("--poll_interval", type=float, default=0.5,
+                              help="Seconds between checks for new images.")
+    watch_parser.set_defaults(func=watch_command)
+
+    serve_parser = subparsers.add_parser("serve", help="Run a local HTTP server that analyses uploaded images.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--model", default="", help="Model used when a request does not name one.")
+    serve_parser.add_argument("--models_dir", default="trained_models")
+    serve_parser.add_argument("--max_batch_size", type=int, default=8,
+                              help="Most images analysed together in one batch.")
+    serve_parser.add_argument("--max_wait_ms", type=float, default=20,
+                              help="Longest time a request waits for others to join its batch.")
+    serve_parser.set_defaults(func=serve_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())